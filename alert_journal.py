@@ -0,0 +1,253 @@
+"""
+Durable alert journal
+Append-only NDJSON segments with size/age rotation and retention, an in-memory
+time + device index rebuilt from the segments on start, and group commit: the
+caller only appends to a pending list, a writer thread writes and fsyncs each
+batch with one write() and one fsync().
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+SEGMENT_MAX_AGE_SECONDS = 24 * 3600
+MAX_SEGMENTS = 30
+COMMIT_INTERVAL_SECONDS = 0.05
+COMMIT_BATCH = 256  # wake the writer early once this many alerts are pending
+
+
+class _Columns:
+    """Parallel, time-ordered (ts, id, offset) lists for binary search."""
+
+    __slots__ = ("ts", "ids", "offsets")
+
+    def __init__(self):
+        self.ts, self.ids, self.offsets = [], [], []
+
+    def add(self, ts, alert_id, offset):
+        self.ts.append(ts)
+        self.ids.append(alert_id)
+        self.offsets.append(offset)
+
+    def select(self, t0, t1, after_id):
+        """Offsets of rows with t0 <= ts <= t1 and id > after_id, oldest first."""
+        lo = bisect_left(self.ts, t0) if t0 is not None else 0
+        hi = bisect_right(self.ts, t1) if t1 is not None else len(self.ts)
+        if after_id is not None:
+            lo = max(lo, bisect_right(self.ids, after_id))
+        return [(self.ids[i], self.offsets[i]) for i in range(lo, hi)]
+
+
+class _Segment:
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.created = None
+        self.all = _Columns()
+        self.by_device = {}
+
+    def index(self, entry, offset):
+        ts, alert_id = entry["epoch"], entry["id"]
+        if self.created is None:
+            self.created = ts
+        self.all.add(ts, alert_id, offset)
+        cols = self.by_device.get(entry.get("device"))
+        if cols is None:
+            cols = self.by_device[entry.get("device")] = _Columns()
+        cols.add(ts, alert_id, offset)
+
+    def overlaps(self, t0, t1, after_id):
+        if not self.all.ts:
+            return False
+        return ((t0 is None or self.all.ts[-1] >= t0) and (t1 is None or self.all.ts[0] <= t1)
+                and (after_id is None or self.all.ids[-1] > after_id))
+
+
+class AlertJournal:
+    """Thread-safe append-only alert log; append() never touches the disk."""
+
+    def __init__(self, directory, max_bytes=SEGMENT_MAX_BYTES, max_age=SEGMENT_MAX_AGE_SECONDS,
+                 max_segments=MAX_SEGMENTS, commit_interval=COMMIT_INTERVAL_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_segments = max_segments
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()      # id allocation and the pending list
+        self.io_lock = threading.Lock()   # segment files and the index
+        self.pending = []
+        self.next_id = 1
+        self.last_epoch = 0.0
+        self.segments = []
+        self.commits = 0
+        self.committed = 0
+        self.commit_seconds = 0.0
+        self._file = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        for path in sorted(glob.glob(os.path.join(self.directory, "alerts-*.ndjson"))):
+            segment = _Segment(path)
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final write after a crash; later appends go to a new segment
+                    segment.index(entry, offset)
+                    offset += len(line)
+                    self.next_id = max(self.next_id, entry["id"] + 1)
+                    self.last_epoch = max(self.last_epoch, entry["epoch"])
+            segment.size = offset
+            self.segments.append(segment)
+
+    # ---------------- writes ----------------
+
+    def append(self, entry):
+        """Assign id + epoch, queue for the next group commit and return the stored entry."""
+        with self.lock:
+            epoch = max(time.time(), self.last_epoch)  # keeps the time index sorted
+            self.last_epoch = epoch
+            stored = {"id": self.next_id, "epoch": epoch, **entry}
+            self.next_id += 1
+            self.pending.append(stored)
+            wake = len(self.pending) >= COMMIT_BATCH
+        if wake:
+            self._wakeup.set()
+        return stored
+
+    def flush(self, sync=False):
+        """Write everything pending as one batch; fsync if `sync`."""
+        with self.io_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if batch:
+                started = time.perf_counter()
+                segment, lines = self._writable_segment(batch[0]), []
+                for entry in batch:
+                    if lines and segment.size >= self.max_bytes:
+                        self._file.write(b"".join(lines))
+                        segment, lines = self._writable_segment(entry), []
+                    line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+                    segment.index(entry, segment.size)
+                    segment.size += len(line)
+                    lines.append(line)
+                self._file.write(b"".join(lines))
+                self._file.flush()
+                if sync:
+                    os.fsync(self._file.fileno())
+                self.commits += 1
+                self.committed += len(batch)
+                self.commit_seconds += time.perf_counter() - started
+
+    def _writable_segment(self, first):
+        epoch = first["epoch"]
+        segment = self.segments[-1] if self.segments else None
+        if (self._file is None or segment is None or segment.size >= self.max_bytes
+                or (segment.created is not None and epoch - segment.created >= self.max_age)):
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            segment = _Segment(os.path.join(self.directory, f"alerts-{first['id']:012d}.ndjson"))
+            self.segments.append(segment)
+            self._file = open(segment.path, "ab")
+            self._enforce_retention()
+        return segment
+
+    def _enforce_retention(self):
+        while len(self.segments) > self.max_segments:
+            old = self.segments.pop(0)
+            try:
+                os.remove(old.path)
+            except OSError:
+                pass
+
+    def start(self):
+        """Start the group-commit writer thread (idempotent)."""
+        if self._thread is not None:
+            return self._thread
+
+        def loop():
+            while True:
+                self._wakeup.wait(self.commit_interval)
+                self._wakeup.clear()
+                try:
+                    self.flush(sync=True)
+                except Exception as e:
+                    print(f"Alert journal commit failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="AlertJournalWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self._thread
+
+    def close(self):
+        self.flush(sync=True)
+        with self.io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---------------- reads ----------------
+
+    def query(self, device=None, t0=None, t1=None, cursor=None, limit=100):
+        """Alerts oldest first with t0 <= epoch <= t1 and id > cursor.
+
+        Returns (alerts, next_cursor); next_cursor is None once the range is exhausted.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.flush()  # make pending alerts visible; the writer thread does the fsync
+        picks = []
+        with self.io_lock:
+            for segment in self.segments:
+                if len(picks) > limit:
+                    break
+                if not segment.overlaps(t0, t1, cursor):
+                    continue
+                cols = segment.all if device is None else segment.by_device.get(device)
+                if cols is None:
+                    continue
+                for alert_id, offset in cols.select(t0, t1, cursor)[:limit + 1 - len(picks)]:
+                    picks.append((segment.path, offset))
+            more = len(picks) > limit
+            picks = picks[:limit]
+            alerts = self._read(picks)
+        return alerts, (alerts[-1]["id"] if more else None)
+
+    @staticmethod
+    def _read(picks):
+        alerts, handles = [], {}
+        try:
+            for path, offset in picks:
+                f = handles.get(path)
+                if f is None:
+                    f = handles[path] = open(path, "rb")
+                f.seek(offset)
+                alerts.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return alerts
+
+    def stats(self):
+        with self.io_lock:
+            return {
+                "segments": len(self.segments),
+                "bytes": sum(s.size for s in self.segments),
+                "alerts": sum(len(s.all.ids) for s in self.segments),
+                "pending": len(self.pending),
+                "commits": self.commits,
+                "mean_commit_batch": round(self.committed / self.commits, 2) if self.commits else None,
+                "mean_commit_ms": round(self.commit_seconds / self.commits * 1000, 3) if self.commits else None,
+            }
@@ -0,0 +1,101 @@
+"""
+Alert coalescing and rate limiting
+Many dashboards watching the same child POST the same alert; the coalescer maps
+repeats of a (device, episode) within a window onto one canonical alert, and a
+token bucket per source caps how fast genuinely new alerts can be created.
+Alerts raised by the server's own monitors pass source=None: they are
+coalesced but never rate limited.
+"""
+
+import threading
+import time
+
+COALESCE_WINDOW_SECONDS = 300.0
+RATE_PER_SECOND = 0.2   # sustained new alerts per source
+RATE_BURST = 5
+
+
+class TokenBucket:
+    """Classic token bucket; take() is O(1) and never sleeps."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        """Return 0.0 if a token was taken, else the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class AlertPolicy:
+    """Decides whether an alert is new, a repeat of a canonical alert, or rate limited."""
+
+    def __init__(self, window=COALESCE_WINDOW_SECONDS, rate=RATE_PER_SECOND, burst=RATE_BURST):
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.canonical = {}   # (device, episode) -> [alert, last_seen, repeats]
+        self.buckets = {}     # source -> TokenBucket
+        self.created = 0
+        self.coalesced = 0
+        self.limited = 0
+        self._last_prune = time.monotonic()
+
+    def submit(self, key, source, create):
+        """Coalesce on `key` or call create() to log a new alert.
+
+        Returns (alert, coalesced, retry_after). alert is None only when the
+        source is rate limited, in which case retry_after is in seconds; a
+        None source is never limited.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+            found = self.canonical.get(key)
+            if found is not None and now - found[1] < self.window:
+                found[1] = now
+                found[2] += 1
+                self.coalesced += 1
+                return found[0], True, 0.0
+            if source is not None:
+                bucket = self.buckets.get(source)
+                if bucket is None:
+                    bucket = self.buckets[source] = TokenBucket(self.rate, self.burst, now)
+                retry_after = bucket.take(now)
+                if retry_after:
+                    self.limited += 1
+                    return None, False, retry_after
+            # create() runs under the lock so concurrent repeats wait for the canonical alert
+            alert = create()
+            self.canonical[key] = [alert, now, 0]
+            self.created += 1
+            return alert, False, 0.0
+
+    def _prune(self, now):
+        if now - self._last_prune < self.window:
+            return
+        self._last_prune = now
+        self.canonical = {k: v for k, v in self.canonical.items() if now - v[1] < self.window}
+        idle = self.burst / self.rate  # a bucket idle this long is full again
+        self.buckets = {s: b for s, b in self.buckets.items() if now - b.updated < idle}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "created": self.created,
+                "coalesced": self.coalesced,
+                "rate_limited": self.limited,
+                "open_keys": len(self.canonical),
+                "sources": len(self.buckets),
+                "window_s": self.window,
+            }
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+BLE advertisement recorder and replay harness
+Records advertisement streams to a compact file and replays them (or synthetic
+scenarios) through RSSIStream without a radio, at real time or N x speed.
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+MAGIC = b"BLEREC1\n"
+CHUNK_HEADER = struct.Struct("<II")  # tag-table JSON bytes, record count
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("tag", "<u4"), ("rssi", "i1")])  # 13 bytes per advertisement
+
+
+class Recording:
+    """An advertisement stream: parallel ts/tag/rssi arrays plus a (address, name) tag table."""
+
+    def __init__(self, ts, tag, rssi, tags, truth=None):
+        self.ts = np.asarray(ts, dtype=np.float64)
+        self.tag = np.asarray(tag, dtype=np.uint32)
+        self.rssi = np.asarray(rssi, dtype=np.int8)
+        self.tags = [tuple(t) for t in tags]
+        # Synthetic scenarios: tag name -> seconds from start when it truly left range
+        self.truth = truth or {}
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def duration(self):
+        return float(self.ts[-1] - self.ts[0]) if len(self.ts) else 0.0
+
+    def names(self):
+        return [name for _, name in self.tags]
+
+    def save(self, path):
+        with AdvertisementRecorder(path) as rec:
+            rec.write_arrays(self.ts, self.tag, self.rssi, self.tags)
+            if self.truth:
+                rec.write_truth(self.truth)
+
+
+def load_recording(path):
+    """Read a file written by AdvertisementRecorder."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a BLE recording")
+        tags, chunks, truth = [], [], {}
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                break
+            table_len, count = CHUNK_HEADER.unpack(header)
+            table = f.read(table_len)
+            body = f.read(count * RECORD_DTYPE.itemsize)
+            if len(table) < table_len or len(body) < count * RECORD_DTYPE.itemsize:
+                break  # truncated final chunk (recorder was killed mid-write)
+            if table_len:
+                meta = json.loads(table)
+                if isinstance(meta, dict):
+                    truth.update(meta.get("truth", {}))
+                else:
+                    tags.extend(meta)
+            chunks.append(np.frombuffer(body, dtype=RECORD_DTYPE))
+    records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE)
+    return Recording(records["ts"], records["tag"], records["rssi"], tags, truth)
+
+
+class AdvertisementRecorder:
+    """Append advertisements to a chunked binary file.
+
+    Each chunk holds the tags first seen in it (as JSON) followed by packed
+    13-byte records, so a crash loses at most the unflushed chunk. A chunk
+    whose JSON is an object instead of a list carries metadata (ground truth).
+    Use as a RSSIStream advertisement subscriber:
+
+        stream.subscribe_advertisements(recorder)
+    """
+
+    def __init__(self, path, flush_every=1024):
+        self.path = path
+        self.flush_every = flush_every
+        self.tag_ids = {}
+        self._new_tags = []
+        self._pending = []
+        self.count = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def __call__(self, device, advertisement_data):
+        self.record(time.time(), device.address, device.name, advertisement_data.rssi)
+
+    def _tag_id(self, address, name):
+        key = (address, name or "")
+        tag_id = self.tag_ids.get(key)
+        if tag_id is None:
+            tag_id = len(self.tag_ids)
+            self.tag_ids[key] = tag_id
+            self._new_tags.append(list(key))
+        return tag_id
+
+    def record(self, ts, address, name, rssi):
+        self._pending.append((ts, self._tag_id(address, name), rssi))
+        self.count += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def write_arrays(self, ts, tag, rssi, tags):
+        """Write a whole pre-built stream (tag ids index into `tags`) as one chunk."""
+        for address, name in tags:
+            self._tag_id(address, name)
+        records = np.zeros(len(ts), dtype=RECORD_DTYPE)
+        records["ts"], records["tag"], records["rssi"] = ts, tag, rssi
+        self._write_chunk(records)
+        self.count += len(records)
+
+    def write_truth(self, truth):
+        """Store scenario ground truth as a record-less chunk whose table is a JSON object."""
+        self.flush()
+        table = json.dumps({"truth": truth}).encode()
+        self._file.write(CHUNK_HEADER.pack(len(table), 0))
+        self._file.write(table)
+        self._file.flush()
+
+    def flush(self):
+        if not self._pending and not self._new_tags:
+            return
+        self._write_chunk(np.array(self._pending, dtype=RECORD_DTYPE))
+        self._pending = []
+
+    def _write_chunk(self, records):
+        table = json.dumps(self._new_tags).encode() if self._new_tags else b""
+        self._file.write(CHUNK_HEADER.pack(len(table), len(records)))
+        self._file.write(table)
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self._new_tags = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayScanner:
+    """Drop-in for BleakScanner that plays a Recording into the detection callback.
+
+    speed=1.0 is real time, 10.0 is ten times faster, 0 replays as fast as possible.
+    """
+
+    def __init__(self, detection_callback, recording, speed=1.0, loop=False, **kwargs):
+        self.detection_callback = detection_callback
+        self.recording = recording
+        self.speed = speed
+        self.loop = loop
+        self.finished = asyncio.Event()
+        self.delivered = 0
+        self._task = None
+        self._devices = [SimpleNamespace(address=a, name=n or None) for a, n in recording.tags]
+
+    async def start(self):
+        self.finished.clear()
+        self._task = asyncio.create_task(self._play())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _play(self):
+        rec = self.recording
+        ts = rec.ts - rec.ts[0] if len(rec) else rec.ts
+        tags = rec.tag.tolist()
+        rssi = rec.rssi.tolist()
+        while True:
+            started = time.monotonic()
+            for i in range(len(tags)):
+                if self.speed:
+                    delay = started + ts[i] / self.speed - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif i % 256 == 0:
+                    await asyncio.sleep(0)
+                self.detection_callback(self._devices[tags[i]], SimpleNamespace(rssi=rssi[i]))
+                self.delivered += 1
+            if not self.loop:
+                break
+        self.finished.set()
+
+
+def replay_scanner_factory(recording, speed=1.0, loop=False):
+    """scanner_factory for RSSIStream that replays `recording`."""
+    return lambda callback, **kwargs: ReplayScanner(callback, recording, speed=speed, loop=loop)
+
+
+# ---------------- Synthetic scenarios ----------------
+
+def _emit(rng, num_tags, duration, rate_hz, rssi_fn, present_fn=None, jitter=0.2):
+    """Sample advertisements for each tag at ~rate_hz; rssi_fn(tag, t) gives the mean RSSI."""
+    ts, tag, rssi = [], [], []
+    n = int(duration * rate_hz)
+    for i in range(num_tags):
+        t = np.arange(n) / rate_hz + rng.uniform(0, 1.0 / rate_hz) + rng.uniform(-jitter, jitter, n) / rate_hz
+        t = t[(t >= 0) & (t < duration)]
+        if present_fn is not None:
+            t = t[present_fn(i, t)]
+        ts.append(t)
+        tag.append(np.full(t.size, i))
+        rssi.append(rssi_fn(i, t) + rng.normal(0, 4.0, t.size))
+    ts, tag, rssi = np.concatenate(ts), np.concatenate(tag), np.concatenate(rssi)
+    order = np.argsort(ts, kind="stable")
+    return ts[order], tag[order], np.clip(np.rint(rssi[order]), -127, 0)
+
+
+def _child_tags(num_tags):
+    return [(f"AA:BB:CC:00:{i // 256:02X}:{i % 256:02X}", f"Child-{i + 1:02d}") for i in range(num_tags)]
+
+
+def scenario_walk_away(num_tags=10, duration=120.0, rate_hz=5.0, leave_fraction=0.3,
+                       threshold=-80, tx_power=-59.0, exponent=2.0, seed=0):
+    """Tags idle 1-3 m from the scanner; a fraction walk away at 1 m/s from a random time.
+
+    truth[name] is when the walker's mean RSSI crossed `threshold`.
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(1.0, 3.0, num_tags)
+    leaves = rng.random(num_tags) < leave_fraction
+    leave_at = rng.uniform(0.2 * duration, 0.5 * duration, num_tags)
+    threshold_m = 10 ** ((tx_power - threshold) / (10 * exponent))
+
+    def distance(i, t):
+        d = np.full(t.shape, base[i])
+        if leaves[i]:
+            d = d + np.maximum(t - leave_at[i], 0.0)
+        return d
+
+    def mean_rssi(i, t):
+        return tx_power - 10 * exponent * np.log10(distance(i, t))
+
+    ts, tag, rssi = _emit(rng, num_tags, duration, rate_hz, mean_rssi)
+    tags = _child_tags(num_tags)
+    truth = {}
+    for i in np.flatnonzero(leaves):
+        crossing = leave_at[i] + max(threshold_m - base[i], 0.0)
+        if crossing < duration:
+            truth[tags[i][1]] = float(crossing)
+    return Recording(ts, tag, rssi, tags, truth)
+
+
+def scenario_signal_loss(num_tags=10, duration=120.0, rate_hz=5.0, loss_fraction=0.3, seed=0):
+    """Tags sit in range; a fraction stop advertising abruptly (battery pulled, out of radio reach)."""
+    rng = np.random.default_rng(seed)
+    mean = rng.uniform(-70.0, -55.0, num_tags)
+    lost = rng.random(num_tags) < loss_fraction
+    lost_at = np.where(lost, rng.uniform(0.2 * duration, 0.6 * duration, num_tags), np.inf)
+
+    ts, tag, rssi = _emit(
+        rng, num_tags, duration, rate_hz,
+        rssi_fn=lambda i, t: np.full(t.shape, mean[i]),
+        present_fn=lambda i, t: t < lost_at[i],
+    )
+    tags = _child_tags(num_tags)
+    truth = {tags[i][1]: float(lost_at[i]) for i in np.flatnonzero(lost)}
+    return Recording(ts, tag, rssi, tags, truth)
+
+
+def scenario_crowd(num_tags=5, num_background=500, duration=60.0, rate_hz=5.0, seed=0):
+    """A few child tags among many unrelated phones/beacons (stresses name/address filtering)."""
+    rng = np.random.default_rng(seed)
+    total = num_tags + num_background
+    mean = rng.uniform(-95.0, -50.0, total)
+    ts, tag, rssi = _emit(rng, total, duration, rate_hz, rssi_fn=lambda i, t: np.full(t.shape, mean[i]))
+    tags = _child_tags(num_tags) + [
+        (f"11:22:33:{i // 65536:02X}:{i // 256 % 256:02X}:{i % 256:02X}", rng.choice(["", "Phone", "Buds", "Beacon"]))
+        for i in range(num_background)
+    ]
+    return Recording(ts, tag, rssi, tags)
+
+
+SCENARIOS = {
+    "walk_away": scenario_walk_away,
+    "signal_loss": scenario_signal_loss,
+    "crowd": scenario_crowd,
+}
+
+
+# ---------------- Deterministic benchmark ----------------
+
+def benchmark_recording(recording, step=0.5, name_prefix="Child-", **analyzer_kwargs):
+    """Feed a recording through MultiTagRSSIAnalyzer + AlertStateMachine in `step`-second slices.
+
+    Uses recording time throughout, so alert latency is deterministic; returns
+    throughput (wall clock) and alert latency versus the scenario's ground truth.
+    """
+    from rssi_analyzer import AlertStateMachine, MultiTagRSSIAnalyzer
+
+    names = recording.names()
+    keep = np.array([n.startswith(name_prefix) for n in names])[recording.tag]
+    ts = recording.ts[keep] - recording.ts[0]
+    tag = recording.tag[keep].astype(np.int64)
+    rssi = recording.rssi[keep]
+
+    analyzer = MultiTagRSSIAnalyzer(alerts=AlertStateMachine(), **{"filter": "kalman", **analyzer_kwargs})
+    for i, name in enumerate(names):
+        analyzer.register(name)
+
+    alerts = {}
+    bounds = np.searchsorted(ts, np.arange(0.0, (ts[-1] if ts.size else 0.0) + step, step), side="right")
+    started = time.perf_counter()
+    for k in range(1, len(bounds)):
+        lo, hi = bounds[k - 1], bounds[k]
+        now = k * step
+        if hi > lo:
+            analyzer.update_indices(tag[lo:hi], rssi[lo:hi], now=now)
+        for event in analyzer.step_alerts(now=now):
+            if event["alert"]:
+                alerts.setdefault(event["tag"], now)
+    elapsed = time.perf_counter() - started
+
+    latencies = [alerts[t] - truth for t, truth in recording.truth.items() if t in alerts]
+    false_alerts = [t for t in alerts if t not in recording.truth]
+    return {
+        "readings": int(ts.size),
+        "wall_s": round(elapsed, 4),
+        "readings_per_s": round(ts.size / elapsed) if elapsed > 0 else None,
+        "true_exits": len(recording.truth),
+        "detected": len(latencies),
+        "missed": len(recording.truth) - len(latencies),
+        "false_alerts": len(false_alerts),
+        "latency_mean_s": round(float(np.mean(latencies)), 2) if latencies else None,
+        "latency_max_s": round(float(np.max(latencies)), 2) if latencies else None,
+    }
+
+
+async def _record(path, seconds):
+    from ble_scanner import RSSIStream
+
+    stream = RSSIStream()
+    with AdvertisementRecorder(path) as recorder:
+        stream.subscribe_advertisements(recorder)
+        try:
+            await asyncio.wait_for(stream.start_stream(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        print(f"Recorded {recorder.count} advertisements to {path}")
+
+
+async def _play(recording, speed):
+    from ble_scanner import RSSIStream
+    from rssi_analyzer import RSSIAnalyzer, handle_rssi
+
+    scanners = []
+
+    def factory(callback, **kwargs):
+        scanners.append(ReplayScanner(callback, recording, speed=speed))
+        return scanners[-1]
+
+    stream = RSSIStream(scanner_factory=factory)
+    analyzer = RSSIAnalyzer(threshold=-80)
+    stream.subscribe(lambda rssi: handle_rssi(rssi, analyzer))
+    task = asyncio.create_task(stream.start_stream())
+    while not scanners:
+        await asyncio.sleep(0.01)
+    await scanners[0].finished.wait()
+    task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BLE advertisement recorder and replay harness')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('record', help='Record live advertisements')
+    p.add_argument('output', help='Recording file to write')
+    p.add_argument('--seconds', type=float, default=60.0, help='How long to record')
+
+    p = sub.add_parser('generate', help='Write a synthetic scenario')
+    p.add_argument('scenario', choices=sorted(SCENARIOS))
+    p.add_argument('output', help='Recording file to write')
+    p.add_argument('--tags', type=int, default=10, help='Number of child tags')
+    p.add_argument('--duration', type=float, default=120.0, help='Scenario length (seconds)')
+    p.add_argument('--seed', type=int, default=0)
+
+    p = sub.add_parser('play', help='Replay a recording through RSSIStream + RSSIAnalyzer')
+    p.add_argument('input', help='Recording file')
+    p.add_argument('--speed', type=float, default=1.0, help='Playback speed (0 = as fast as possible)')
+
+    p = sub.add_parser('bench', help='Analyzer throughput and alert latency on a recording or scenario')
+    p.add_argument('input', nargs='?', help='Recording file (default: generate --scenario)')
+    p.add_argument('--scenario', choices=sorted(SCENARIOS), default='walk_away')
+    p.add_argument('--tags', type=int, default=1000, help='Number of child tags for generated scenarios')
+    p.add_argument('--duration', type=float, default=120.0)
+    p.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        asyncio.run(_record(args.output, args.seconds))
+    elif args.command == 'generate':
+        rec = SCENARIOS[args.scenario](num_tags=args.tags, duration=args.duration, seed=args.seed)
+        rec.save(args.output)
+        print(f"Wrote {len(rec)} advertisements ({rec.duration:.0f}s, {len(rec.tags)} devices) to {args.output}")
+    elif args.command == 'play':
+        asyncio.run(_play(load_recording(args.input), args.speed))
+    elif args.command == 'bench':
+        if args.input:
+            rec = load_recording(args.input)
+            if not rec.truth:
+                print(f"⚠️ {args.input} has no ground truth; every alert is counted as false")
+        else:
+            rec = SCENARIOS[args.scenario](num_tags=args.tags, duration=args.duration, seed=args.seed)
+        print(json.dumps(benchmark_recording(rec), indent=2))
+
+
+if __name__ == "__main__":
+    main()
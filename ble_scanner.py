@@ -1,39 +1,427 @@
 import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque
 from bleak import BleakScanner
 
 TARGET_TAG_NAME = "Child-01"
 RSSI_THRESHOLD = -80
 
-class RSSIStream:
+# Scan modes
+SCAN_MODE_CONTINUOUS = "continuous"  # one long-lived scanner session, restarted only on error
+SCAN_MODE_CYCLED = "cycled"          # legacy start / sleep / stop loop (has a blind window per cycle)
+
+CYCLE_SCAN_SECONDS = 8
+RESTART_BACKOFF_INITIAL = 1.0
+RESTART_BACKOFF_MAX = 30.0
+STALL_TIMEOUT_SECONDS = 60.0  # no advertisements at all for this long is treated as a scanner error
+
+DISPATCH_QUEUE_SIZE = 4096
+DISPATCH_BATCH_SIZE = 64
+
+# Advertising data types used for BlueZ passive-scan patterns
+AD_UUID16_COMPLETE = 0x03
+AD_UUID128_COMPLETE = 0x07
+AD_COMPLETE_LOCAL_NAME = 0x09
+AD_MANUFACTURER_DATA = 0xFF
+BLUETOOTH_BASE_UUID_SUFFIX = "-0000-1000-8000-00805f9b34fb"
+
+
+class ScanStats:
+    """Advertisement rate and detection latency for the current scanner session."""
+
     def __init__(self):
+        self.started_at = time.monotonic()
+        self.session_started_at = None
+        self.adverts_total = 0
+        self.filtered = 0
+        self.target_adverts = 0
+        self.first_detection_latency = None
+        self.last_advert_at = None
+        self.last_target_at = None
+        self.last_gap = None
+        self.max_gap = 0.0
+        self.gap_total = 0.0
+        self.gap_count = 0
+        self.blind_time = 0.0
+        self.restarts = 0
+        self.errors = 0
+        self.last_error = None
+
+    def session_started(self):
+        self.session_started_at = time.monotonic()
+        self.first_detection_latency = None
+
+    def advert(self, is_target, now=None):
+        now = time.monotonic() if now is None else now
+        self.adverts_total += 1
+        self.last_advert_at = now
+        if not is_target:
+            return
+        self.target_adverts += 1
+        if self.first_detection_latency is None and self.session_started_at is not None:
+            self.first_detection_latency = now - self.session_started_at
+        if self.last_target_at is not None:
+            gap = now - self.last_target_at
+            self.last_gap = gap
+            self.max_gap = max(self.max_gap, gap)
+            self.gap_total += gap
+            self.gap_count += 1
+        self.last_target_at = now
+
+    def error(self, exc):
+        self.errors += 1
+        self.last_error = str(exc)
+
+    def as_dict(self):
+        uptime = time.monotonic() - self.started_at
+        return {
+            "uptime_s": round(uptime, 3),
+            "adverts_total": self.adverts_total,
+            "filtered": self.filtered,
+            "target_adverts": self.target_adverts,
+            "advert_rate_hz": round(self.adverts_total / uptime, 3) if uptime > 0 else 0.0,
+            "target_rate_hz": round(self.target_adverts / uptime, 3) if uptime > 0 else 0.0,
+            "first_detection_latency_s": None if self.first_detection_latency is None else round(self.first_detection_latency, 3),
+            "last_gap_s": None if self.last_gap is None else round(self.last_gap, 3),
+            "mean_gap_s": round(self.gap_total / self.gap_count, 3) if self.gap_count else None,
+            "max_gap_s": round(self.max_gap, 3),
+            "blind_time_s": round(self.blind_time, 3),
+            "restarts": self.restarts,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class ScanProfile:
+    """Which advertisements the scanner should deliver, and how to scan for them.
+
+    service_uuids and (for passive scans) name / manufacturer patterns are handed
+    to the OS so unrelated devices never wake the Python callback. The address
+    allow-list and manufacturer ids are checked first thing in the callback,
+    before any other work. A tag is a target if its name contains one of `names`
+    or its address is on the allow-list (passive scans often carry no name).
+    """
+
+    def __init__(self, names=(TARGET_TAG_NAME,), addresses=(), service_uuids=(), manufacturer_ids=(), passive=False):
+        self.names = tuple(names)
+        self.addresses = {a.upper() for a in addresses}
+        self.service_uuids = [str(u).lower() for u in service_uuids]
+        self.manufacturer_ids = frozenset(int(m) for m in manufacturer_ids)
+        self.passive = passive
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from {"passive": .., "service_uuids": [..], "manufacturer_ids": [..],
+        "tags": {"Child-01": {"address": "AA:BB:.."}}}; tag names and addresses become the allow-list."""
+        tags = config.get("tags", {})
+        names = list(tags) or [TARGET_TAG_NAME]
+        addresses = [t["address"] for t in tags.values() if t.get("address")]
+        return cls(names, addresses, config.get("service_uuids", ()), config.get("manufacturer_ids", ()),
+                   config.get("passive", False))
+
+    def allow(self, address):
+        """Add a registered tag's address to the allow-list."""
+        self.addresses.add(address.upper())
+
+    @property
+    def filters_in_os(self):
+        """True when unrelated adverts are dropped below Python, so silence is expected."""
+        return bool(self.passive or self.service_uuids)
+
+    @property
+    def restricts(self):
+        """True when the callback should reject adverts outside the allow-list / manufacturer ids."""
+        return bool(self.addresses or self.manufacturer_ids)
+
+    def accepts(self, device, advertisement_data):
+        if self.addresses and device.address.upper() in self.addresses:
+            return True
+        if self.manufacturer_ids:
+            data = getattr(advertisement_data, "manufacturer_data", None) or {}
+            if not self.manufacturer_ids.isdisjoint(data):
+                return True
+        return self.is_target(device)
+
+    def is_target(self, device):
+        name = device.name
+        if name and any(n in name for n in self.names):
+            return True
+        return bool(self.addresses) and device.address.upper() in self.addresses
+
+    def _or_patterns(self):
+        patterns = [(0, AD_MANUFACTURER_DATA, m.to_bytes(2, "little")) for m in sorted(self.manufacturer_ids)]
+        for u in self.service_uuids:
+            if u.startswith("0000") and u.endswith(BLUETOOTH_BASE_UUID_SUFFIX):
+                patterns.append((0, AD_UUID16_COMPLETE, int(u[4:8], 16).to_bytes(2, "little")))
+            else:
+                patterns.append((0, AD_UUID128_COMPLETE, uuid.UUID(u).bytes[::-1]))
+        patterns += [(0, AD_COMPLETE_LOCAL_NAME, n.encode()) for n in self.names]
+        return patterns
+
+    def scanner_kwargs(self):
+        """Keyword arguments for BleakScanner(callback, **kwargs)."""
+        if not self.passive:
+            return {"service_uuids": self.service_uuids or None}
+        # BlueZ only supports passive scanning through advertisement monitor
+        # patterns, and rejects service_uuids in that mode
+        patterns = self._or_patterns()
+        if not patterns:
+            raise ValueError("passive scanning needs at least one name, service UUID or manufacturer id")
+        return {"scanning_mode": "passive", "bluez": {"or_patterns": patterns}}
+
+    def as_dict(self):
+        return {
+            "passive": self.passive,
+            "names": list(self.names),
+            "addresses": sorted(self.addresses),
+            "service_uuids": self.service_uuids,
+            "manufacturer_ids": sorted(self.manufacturer_ids),
+        }
+
+
+def load_scan_profile(path):
+    with open(path) as f:
+        return ScanProfile.from_config(json.load(f))
+
+
+class ReadingDispatcher:
+    """Hands advertisements from the BLE callback to subscribers on a separate thread.
+
+    put() is an append to a bounded deque (atomic, no lock) plus an Event.set(),
+    so bleak's event loop is never held up by subscriber work. When the queue
+    is full the oldest reading is dropped. A consumer thread (not an asyncio
+    task, so slow synchronous subscribers cannot stall the event loop) drains
+    the queue in micro-batches of up to batch_size.
+    """
+
+    def __init__(self, handler, maxsize=DISPATCH_QUEUE_SIZE, batch_size=DISPATCH_BATCH_SIZE):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.queue = deque(maxlen=maxsize)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.dispatched = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.callbacks = 0
+        self.callback_ns_total = 0
+        self.callback_ns_max = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="BLEDispatchThread", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop after draining what is already queued; wait up to `timeout` if given."""
+        self._stopped.set()
+        self._wakeup.set()
+        if timeout is not None and self._thread is not None:
+            self._thread.join(timeout)
+
+    def put(self, item):
+        depth = len(self.queue)
+        if depth >= self.maxsize:
+            self.dropped += 1
+        self.queue.append(item)
+        self.enqueued += 1
+        if depth >= self.max_depth:
+            self.max_depth = min(depth + 1, self.maxsize)
+        self._wakeup.set()
+
+    def record_callback(self, ns):
+        self.callbacks += 1
+        self.callback_ns_total += ns
+        if ns > self.callback_ns_max:
+            self.callback_ns_max = ns
+
+    def _run(self):
+        queue = self.queue
+        while True:
+            self._wakeup.wait(0.5)
+            self._wakeup.clear()
+            stopping = self._stopped.is_set()
+            while queue:
+                batch = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(queue.popleft())
+                except IndexError:
+                    pass
+                now = time.monotonic()
+                lag = now - batch[0][0]
+                self.lag_total += lag * len(batch)
+                self.lag_max = max(self.lag_max, lag)
+                try:
+                    self.handler(batch)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ BLE subscriber error: {e}")
+                self.dispatched += len(batch)
+                self.batches += 1
+            if stopping:
+                return
+
+    def stats(self):
+        return {
+            "queue_depth": len(self.queue),
+            "queue_max_depth": self.max_depth,
+            "queue_size": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+            "mean_batch": round(self.dispatched / self.batches, 2) if self.batches else None,
+            "subscriber_errors": self.errors,
+            "callback_mean_us": round(self.callback_ns_total / self.callbacks / 1000, 2) if self.callbacks else None,
+            "callback_max_us": round(self.callback_ns_max / 1000, 2),
+            "dispatch_lag_mean_ms": round(self.lag_total / self.dispatched * 1000, 3) if self.dispatched else None,
+            "dispatch_lag_max_ms": round(self.lag_max * 1000, 3),
+        }
+
+
+class RSSIStream:
+    def __init__(self, scan_mode=SCAN_MODE_CONTINUOUS, stall_timeout=STALL_TIMEOUT_SECONDS, scanner_factory=BleakScanner,
+                 queue_size=DISPATCH_QUEUE_SIZE, batch_size=DISPATCH_BATCH_SIZE, verbose=True, profile=None):
         self.latest_rssi = None
         self.subscribers = []
+        self.batch_subscribers = []
+        self.advertisement_subscribers = []
+        self.scan_mode = scan_mode
+        self.stall_timeout = stall_timeout
+        # Anything called like BleakScanner(callback) with async start()/stop(),
+        # e.g. ble_replay.ReplayScanner for hardware-free runs
+        self.scanner_factory = scanner_factory
+        self.verbose = verbose
+        self.profile = profile or ScanProfile()
+        self.stats = ScanStats()
+        self.dispatcher = ReadingDispatcher(self._dispatch, maxsize=queue_size, batch_size=batch_size)
 
     def detection_callback(self, device, advertisement_data):
-        if device.name and TARGET_TAG_NAME in device.name:
-            rssi = advertisement_data.rssi
-            self.latest_rssi = rssi
-            print(f"✅ {device.name} RSSI: {rssi} dBm")
+        # Runs inside bleak's event loop: only classify and enqueue
+        started = time.perf_counter_ns()
+        profile = self.profile
+        if profile.restricts and not profile.accepts(device, advertisement_data):
+            self.stats.filtered += 1
+            self.stats.last_advert_at = time.monotonic()  # the radio is still alive
+            return
+        is_target = profile.is_target(device)
+        self.stats.advert(is_target)
+        if is_target or self.advertisement_subscribers:
+            self.dispatcher.put((time.monotonic(), device, advertisement_data, is_target))
+        self.dispatcher.record_callback(time.perf_counter_ns() - started)
+
+    def _dispatch(self, batch):
+        """Deliver a micro-batch to subscribers (runs on the dispatcher thread)."""
+        if self.advertisement_subscribers:
+            for _, device, advertisement_data, _ in batch:
+                for callback in self.advertisement_subscribers:
+                    callback(device, advertisement_data)
 
-            # Notify subscribers (like your analyzer)
+        readings = [(ts, device.name or device.address, device.address, adv.rssi) for ts, device, adv, is_target in batch if is_target]
+        if not readings:
+            return
+        self.latest_rssi = readings[-1][3]
+        if self.verbose:
+            for _, name, _, rssi in readings:
+                print(f"✅ {name} RSSI: {rssi} dBm")
+
+        for callback in self.batch_subscribers:
+            callback(readings)
+        # Notify subscribers (like your analyzer)
+        for _, _, _, rssi in readings:
             for callback in self.subscribers:
                 callback(rssi)
 
     async def start_stream(self):
-        scanner = BleakScanner(self.detection_callback)
         print("🔍 Scanning for nearby BLE devices...")
+        self.dispatcher.start()
+        try:
+            if self.scan_mode == SCAN_MODE_CYCLED:
+                await self._run_cycled()
+            else:
+                await self._run_continuous()
+        finally:
+            self.dispatcher.stop()
+
+    async def _run_cycled(self):
+        scanner = self.scanner_factory(self.detection_callback, **self.profile.scanner_kwargs())
+        self.stats.session_started()
+        stopped_at = None
 
         while True:
             await scanner.start()
-            await asyncio.sleep(8)
+            if stopped_at is not None:
+                # Time between stop() and the next start() returning is blind
+                self.stats.blind_time += time.monotonic() - stopped_at
+                self.stats.restarts += 1
+            await asyncio.sleep(CYCLE_SCAN_SECONDS)
             await scanner.stop()
+            stopped_at = time.monotonic()
+
+    async def _run_continuous(self):
+        """Keep one scanner session open; restart with exponential backoff only on error."""
+        backoff = RESTART_BACKOFF_INITIAL
+        while True:
+            scanner = self.scanner_factory(self.detection_callback, **self.profile.scanner_kwargs())
+            try:
+                await scanner.start()
+                self.stats.session_started()
+                backoff = RESTART_BACKOFF_INITIAL
+                await self._watch_session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.error(e)
+                print(f"⚠️ BLE scanner error: {e} (restarting in {backoff:.0f}s)")
+            finally:
+                try:
+                    await scanner.stop()
+                except Exception:
+                    pass
+
+            down_at = time.monotonic()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+            self.stats.restarts += 1
+            self.stats.blind_time += time.monotonic() - down_at
+
+    async def _watch_session(self):
+        """Return only by raising: a session with no advertisements for stall_timeout is broken."""
+        started = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            if not self.stall_timeout or self.profile.filters_in_os:
+                continue
+            last = self.stats.last_advert_at or 0.0
+            if time.monotonic() - max(last, started) > self.stall_timeout:
+                raise RuntimeError(f"no advertisements for {self.stall_timeout:.0f}s")
 
     def subscribe(self, callback):
         """Register a callback that receives RSSI values live."""
         self.subscribers.append(callback)
 
+    def subscribe_batch(self, callback):
+        """Register a callback that receives lists of (monotonic_ts, name, address, rssi)."""
+        self.batch_subscribers.append(callback)
+
+    def subscribe_advertisements(self, callback):
+        """Register a callback(device, advertisement_data) for every advertisement seen."""
+        self.advertisement_subscribers.append(callback)
+
 
 # Run directly for testing
 if __name__ == "__main__":
     stream = RSSIStream()
-    asyncio.run(stream.start_stream())
\ No newline at end of file
+    asyncio.run(stream.start_stream())
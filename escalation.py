@@ -0,0 +1,247 @@
+"""
+Escalation pipeline: out-of-range alert -> incident -> prioritized CCTV scans
+Listens on the event bus "alert" topic. A confirmed out_of_range alert opens one
+incident per (device, episode) and queues scans of every camera, ordered by
+closeness to the tag's last-seen zone; worker threads run the scans and the
+first match closes the remaining queue for that incident. Every stage is
+timestamped so /api/escalation/stats shows where signal-loss-to-match time goes.
+"""
+
+import itertools
+import json
+import math
+import queue
+import threading
+import time
+
+# Stages in pipeline order; durations are reported between consecutive stages
+STAGES = ("signal_lost", "confirmed", "incident_created", "scans_queued", "first_scan_started", "first_match")
+SCAN_WORKERS = 2
+DURATION_SAMPLES = 500
+
+
+def load_cameras(path):
+    """Camera config: {"CAM_GATE_3": {"zone": "Main gate", "x": 0, "y": 0, "source": "gate3.mp4"}, ...}"""
+    with open(path) as f:
+        return json.load(f)
+
+
+class CameraRegistry:
+    def __init__(self, cameras=None):
+        self.cameras = dict(cameras or {})
+
+    def prioritize(self, zone=None, xy=None):
+        """Camera ids, cameras in `zone` first, then nearest to `xy`, then the rest."""
+        def rank(item):
+            cam_id, cam = item
+            same_zone = zone is not None and cam.get("zone") == zone
+            if xy is not None and cam.get("x") is not None and cam.get("y") is not None:
+                dist = math.hypot(cam["x"] - xy[0], cam["y"] - xy[1])
+            else:
+                dist = math.inf
+            return (not same_zone, dist, cam_id)
+        return [cam_id for cam_id, _ in sorted(self.cameras.items(), key=rank)]
+
+
+class Incident:
+    def __init__(self, incident_id, device, episode, zone=None, xy=None):
+        self.id = incident_id
+        self.device = device
+        self.episode = episode
+        self.zone = zone
+        self.xy = xy
+        self.status = "open"
+        self.stages = dict.fromkeys(STAGES)
+        self.scans = {}   # camera_id -> scan record
+        self.match = None
+
+    def stamp(self, stage, ts=None):
+        """Record a stage once; later calls keep the first timestamp."""
+        if self.stages[stage] is None:
+            self.stages[stage] = time.time() if ts is None else ts
+
+    def durations(self):
+        out, previous = {}, None
+        for stage in STAGES:
+            ts = self.stages[stage]
+            if ts is None:
+                continue
+            if previous is not None:
+                out[f"{previous[0]}->{stage}"] = round(ts - previous[1], 3)
+            previous = (stage, ts)
+        lost, matched = self.stages["signal_lost"], self.stages["first_match"]
+        if lost is not None and matched is not None:
+            out["signal_lost->first_match"] = round(matched - lost, 3)
+        return out
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "device": self.device,
+            "episode": self.episode,
+            "status": self.status,
+            "zone": self.zone,
+            "stages": dict(self.stages),
+            "durations_s": self.durations(),
+            "scans": list(self.scans.values()),
+            "match": self.match,
+        }
+
+
+class EscalationPipeline:
+    """scan(incident, camera_id, camera) returns a match dict ({"confidence", ...}) or None.
+    locate(device) returns (zone, (x, y) or None) for the tag's last-seen position.
+    Incident fields (status, scans, match) change only under self.lock."""
+
+    def __init__(self, bus, cameras, scan, locate=None, workers=SCAN_WORKERS):
+        self.bus = bus
+        self.cameras = cameras if isinstance(cameras, CameraRegistry) else CameraRegistry(cameras)
+        self.scan = scan
+        self.locate = locate or (lambda device: (None, None))
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.incidents = {}
+        self.by_episode = {}
+        self.scan_queue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self.durations = {}   # "a->b" -> recent samples
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        alerts = self.bus.subscribe("alert")
+        self._spawn(lambda: self._alert_loop(alerts), "EscalationAlerts")
+        for i in range(self.workers):
+            self._spawn(self._scan_loop, f"EscalationScan-{i}")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _alert_loop(self, subscription):
+        while True:
+            for event in subscription.get(timeout=1.0):
+                try:
+                    self.handle_alert(event.data)
+                except Exception as e:
+                    print(f"Escalation failed for alert {event.data.get('id')}: {e}")
+
+    def handle_alert(self, alert):
+        if alert.get("alert_state") != "out_of_range":
+            return None
+        return self.open_incident(alert.get("device"), alert.get("episode"),
+                                  signal_lost_at=alert.get("signal_lost_at"), confirmed_at=alert.get("epoch"))
+
+    def open_incident(self, device, episode, signal_lost_at=None, confirmed_at=None):
+        """Create the incident for (device, episode) once and queue its camera scans."""
+        with self.lock:
+            existing = self.by_episode.get((device, episode))
+            if existing is not None:
+                return existing
+            zone, xy = self.locate(device)
+            incident = Incident(f"INC-{next(self._ids):05d}", device, episode, zone, xy)
+            self.incidents[incident.id] = incident
+            self.by_episode[(device, episode)] = incident
+            incident.stamp("confirmed", confirmed_at)
+            incident.stamp("signal_lost", signal_lost_at if signal_lost_at is not None else incident.stages["confirmed"])
+            incident.stamp("incident_created")
+            snapshot = incident.as_dict()
+        self.bus.publish("incident", snapshot, key=incident.id)
+
+        now = time.time()
+        with self.lock:
+            for priority, cam_id in enumerate(self.cameras.prioritize(zone, xy)):
+                incident.scans[cam_id] = {"camera_id": cam_id, "priority": priority, "queued": now, "started": None,
+                                          "finished": None, "status": "queued", "confidence": None, "error": None}
+                self.scan_queue.put((priority, next(self._order), incident.id, cam_id))
+            incident.stamp("scans_queued")
+        return incident
+
+    def _scan_loop(self):
+        while True:
+            priority, _, incident_id, cam_id = self.scan_queue.get()
+            incident = self.incidents.get(incident_id)
+            if incident is None:
+                continue
+            with self.lock:
+                scan = incident.scans[cam_id]
+                if incident.status != "open":
+                    scan["status"] = "skipped"
+                    continue
+                scan["started"] = time.time()
+                scan["status"] = "running"
+                incident.stamp("first_scan_started", scan["started"])
+            error = None
+            try:
+                match = self.scan(incident, cam_id, self.cameras.cameras[cam_id])
+            except Exception as e:
+                error, match = str(e), None
+            with self.lock:
+                scan["finished"] = time.time()
+                scan["error"] = error
+                scan["status"] = "error" if error else ("matched" if match else "no_match")
+                if match:
+                    scan["confidence"] = match.get("confidence")
+            if match:
+                self.record_match(incident_id, cam_id, match.get("confidence"), match.get("frame_ts"))
+
+    def record_match(self, incident_id, camera_id, confidence=None, frame_ts=None):
+        """First camera match for an incident (from a pipeline scan or an external simulator)."""
+        incident = self.incidents.get(incident_id)
+        if incident is None:
+            return None
+        with self.lock:
+            first = incident.match is None
+            if first:
+                incident.match = {"camera_id": camera_id, "confidence": confidence, "frame_ts": frame_ts}
+                incident.stamp("first_match")
+                incident.status = "matched"
+                for name, value in incident.durations().items():
+                    samples = self.durations.setdefault(name, [])
+                    samples.append(value)
+                    del samples[:-DURATION_SAMPLES]
+            snapshot = incident.as_dict()
+        if first:
+            self.bus.publish("incident", snapshot, key=incident.id)
+        return incident
+
+    def resolve(self, incident_id):
+        incident = self.incidents.get(incident_id)
+        if incident is not None:
+            with self.lock:
+                incident.status = "resolved"
+                snapshot = incident.as_dict()
+            self.bus.publish("incident", snapshot, key=incident.id)
+        return incident
+
+    def snapshot(self, incident_id):
+        """as_dict() of one incident, or None if unknown."""
+        incident = self.incidents.get(incident_id)
+        if incident is None:
+            return None
+        with self.lock:
+            return incident.as_dict()
+
+    def list(self):
+        with self.lock:
+            return [i.as_dict() for i in sorted(self.incidents.values(), key=lambda i: i.id, reverse=True)]
+
+    def stats(self):
+        with self.lock:
+            stages = {}
+            for name, samples in self.durations.items():
+                ordered = sorted(samples)
+                stages[name] = {
+                    "n": len(ordered),
+                    "mean_s": round(sum(ordered) / len(ordered), 3),
+                    "p50_s": ordered[len(ordered) // 2],
+                    "max_s": ordered[-1],
+                }
+            statuses = {}
+            for incident in self.incidents.values():
+                statuses[incident.status] = statuses.get(incident.status, 0) + 1
+        return {"incidents": statuses, "scan_queue": self.scan_queue.qsize(), "cameras": len(self.cameras.cameras),
+                "durations": stages}
@@ -0,0 +1,165 @@
+"""
+In-process publish/subscribe event bus
+Shared between the BLE thread, background workers and Flask request threads.
+The latest event per (topic, key) is kept as an immutable snapshot that is
+swapped in with a single reference assignment, so readers never see a
+half-updated state; subscribers get bounded drop-oldest queues.
+"""
+
+import threading
+import time
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+
+class Event(NamedTuple):
+    seq: int
+    topic: str
+    key: Optional[str]
+    ts: float
+    data: Mapping[str, Any]
+
+
+def _freeze(data: Mapping[str, Any]) -> Mapping[str, Any]:
+    return data if isinstance(data, MappingProxyType) else MappingProxyType(dict(data))
+
+
+class Subscription:
+    """Bounded queue of events for one consumer; when full the oldest event is dropped."""
+
+    def __init__(self, bus: "EventBus", topics: Iterable[str], key: Optional[str], maxsize: int) -> None:
+        self.bus = bus
+        self.topics = frozenset(topics)
+        self.key = key
+        self.queue: deque = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+
+    def matches(self, event: Event) -> bool:
+        return event.topic in self.topics and (self.key is None or event.key == self.key)
+
+    def _offer(self, event: Event) -> bool:
+        with self.cond:
+            dropped = len(self.queue) == self.queue.maxlen
+            if dropped:
+                self.dropped += 1
+            self.queue.append(event)
+            self.cond.notify()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> List[Event]:
+        """Drain everything queued, waiting up to `timeout` if the queue is empty."""
+        with self.cond:
+            if not self.queue and not self.closed:
+                self.cond.wait(timeout)
+            events = list(self.queue)
+            self.queue.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class _TopicCounters:
+    __slots__ = ("published", "deduplicated", "dropped", "first_ts", "last_ts")
+
+    def __init__(self) -> None:
+        self.published = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+
+class EventBus:
+    def __init__(self, default_queue_size: int = 256) -> None:
+        self.default_queue_size = default_queue_size
+        self._lock = threading.Lock()
+        self._seq = 0
+        # Distinguishes this process's seq numbers from a previous run's (SSE ids are "<epoch>-<seq>")
+        self.epoch = format(time.time_ns() // 1000, "x")
+        self._snapshots: Dict[tuple, Event] = {}
+        self._subscribers: tuple = ()  # replaced, never mutated, so publish can iterate without the lock
+        self._counters: Dict[str, _TopicCounters] = {}
+
+    def publish(self, topic: str, data: Mapping[str, Any], key: Optional[str] = None, dedupe: bool = False) -> Event:
+        """Store `data` as the latest (topic, key) snapshot and fan it out to subscribers.
+
+        With dedupe=True an update equal to the current snapshot is dropped and
+        the existing event is returned.
+        """
+        frozen = _freeze(data)
+        now = time.time()
+        with self._lock:
+            counters = self._counters.get(topic)
+            if counters is None:
+                counters = self._counters[topic] = _TopicCounters()
+            previous = self._snapshots.get((topic, key))
+            if dedupe and previous is not None and previous.data == frozen:
+                counters.deduplicated += 1
+                return previous
+            self._seq += 1
+            event = Event(self._seq, topic, key, now, frozen)
+            self._snapshots[(topic, key)] = event
+            counters.published += 1
+            counters.first_ts = counters.first_ts or now
+            counters.last_ts = now
+            subscribers = self._subscribers
+        dropped = 0
+        for sub in subscribers:
+            if sub.matches(event) and sub._offer(event):
+                dropped += 1
+        if dropped:
+            with self._lock:
+                counters.dropped += dropped
+        return event
+
+    def snapshot(self, topic: str, key: Optional[str] = None) -> Optional[Event]:
+        """Latest event for (topic, key); a single dict read, safe from any thread."""
+        return self._snapshots.get((topic, key))
+
+    def snapshots(self, topic: str) -> Dict[Optional[str], Event]:
+        return {k: e for (t, k), e in list(self._snapshots.items()) if t == topic}
+
+    def subscribe(self, topics: Iterable[str], key: Optional[str] = None, maxsize: Optional[int] = None) -> Subscription:
+        sub = Subscription(self, [topics] if isinstance(topics, str) else topics, key, maxsize or self.default_queue_size)
+        with self._lock:
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-topic throughput counters plus subscriber queue depth and drops."""
+        now = time.time()
+        with self._lock:
+            topics = {}
+            for topic, c in self._counters.items():
+                elapsed = (now - c.first_ts) if c.first_ts else 0.0
+                topics[topic] = {
+                    "published": c.published,
+                    "deduplicated": c.deduplicated,
+                    "dropped": c.dropped,
+                    "rate_per_s": round(c.published / elapsed, 3) if elapsed > 0 else 0.0,
+                    "last_ts": c.last_ts,
+                }
+            subscribers = [
+                {"topics": sorted(s.topics), "key": s.key, "depth": len(s.queue), "dropped": s.dropped, "delivered": s.delivered}
+                for s in self._subscribers
+            ]
+            return {"seq": self._seq, "topics": topics, "subscribers": subscribers}
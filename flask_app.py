@@ -2,16 +2,19 @@ from __future__ import annotations
 
 import os
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Mapping
+import sys
 import threading
 import time
 import asyncio
+from types import MappingProxyType
 
 import pandas as pd
 from flask import Flask, jsonify, render_template_string, request, send_file, url_for, session, redirect, flash
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
-import os
+
+from event_bus import EventBus
 
 
 app = Flask(__name__)
@@ -21,30 +24,56 @@ app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in p
 CSV_PATH = os.path.join(os.path.dirname(__file__), "missing_children_dataset_10000.csv")
 VIDEO_PATH = os.path.join(os.path.dirname(__file__), "model", "result.mp4")
 USERS_DB_PATH = os.path.join(os.path.dirname(__file__), "users.json")
+GATEWAYS_PATH = os.path.join(os.path.dirname(__file__), "gateways.json")
+RSSI_HISTORY_PATH = os.path.join(os.path.dirname(__file__), "rssi_history.npz")
+SCAN_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "scan_profile.json")
+ALERTS_DIR = os.path.join(os.path.dirname(__file__), "alerts")
+NOTIFICATIONS_PATH = os.path.join(os.path.dirname(__file__), "notifications.json")
+NOTIFIER_DB_PATH = os.path.join(os.path.dirname(__file__), "notifications.db")
+CAMERAS_PATH = os.path.join(os.path.dirname(__file__), "cameras.json")
+CCTV_MODEL_PATHS = [
+    os.path.join(os.path.dirname(__file__), "model", "runs", "train", "child_detection", "weights", "best.pt"),
+    os.path.join(os.path.dirname(__file__), "model", "yolov8n.pt"),
+]
+DETECTION_CACHE_PATH = os.path.join(os.path.dirname(__file__), "detection_cache.sqlite")
+FOOTAGE_INDEX_PATH = os.path.join(os.path.dirname(__file__), "model", "footage_index.sqlite")
+FOOTAGE_LOOKBACK_SECONDS = 120  # index hits this long before signal loss still count for an incident
+CCTV_RUNTIME = "auto"  # "onnx"/"openvino" use the INT8 export from model/export_model.py on CPU-only boxes
 
 # Simple user database
+def default_tag_name(device_id):
+    """BLE name the ESP32 tag advertises for a device id (TT0001 -> Child-01, see esp32_tag/child_tag.ino)."""
+    return f"Child-{int(device_id[2:]):02d}"
+
 def load_users():
     if os.path.exists(USERS_DB_PATH):
         with open(USERS_DB_PATH, 'r') as f:
-            return json.load(f)
+            users = json.load(f)
+        for user in users.values():
+            # Accounts created before tags were mapped
+            if not user.get('tag_name') and user.get('device_id'):
+                user['tag_name'] = default_tag_name(user['device_id'])
+        return users
     return {}
 
 def save_users(users):
     with open(USERS_DB_PATH, 'w') as f:
         json.dump(users, f, indent=2)
 
-def register_user(email, password, name, phone, child_name, child_age):
+def register_user(email, password, name, phone, child_name, child_age, tag_name=None):
     users = load_users()
     if email in users:
         return False, "Email already registered"
     
+    device_id = f"TT{len(users)+1:04d}"  # Generate device ID
     users[email] = {
         'password_hash': generate_password_hash(password),
         'name': name,
         'phone': phone,
         'child_name': child_name,
         'child_age': child_age,
-        'device_id': f"TT{len(users)+1:04d}",  # Generate device ID
+        'device_id': device_id,
+        'tag_name': tag_name or default_tag_name(device_id),  # BLE name alerts are filed under
         'registered_date': time.strftime("%Y-%m-%d %H:%M:%S")
     }
     save_users(users)
@@ -88,8 +117,15 @@ def authenticate_admin(email, password):
         }
     return False, None
 
+# ---------------- EVENT BUS ----------------
+# Single path for RSSI, alert and CCTV events between the BLE thread,
+# background workers and request threads.
+BUS = EventBus()
+
+
 # ---------------- BLE/RSSI MONITOR (Background) ----------------
-RSSI_STATE: Dict[str, Any] = {
+# Immutable snapshot; _update_rssi_state() swaps in a new one atomically
+RSSI_STATE: Mapping[str, Any] = MappingProxyType({
     "enabled": False,
     "status": "unknown",  # safe | warning | unknown
     "latest_rssi": None,
@@ -98,64 +134,213 @@ RSSI_STATE: Dict[str, Any] = {
     "threshold": -80,
     "last_update": None,
     "error": None,
-}
+    "scan_mode": "continuous",
+    "filter": "kalman",  # none | ema | kalman
+    "filtered_rssi": None,
+    "distance_m": None,
+    "distance_low_m": None,
+    "distance_high_m": None,
+    "alert_state": "unknown",  # safe | suspect | out_of_range | recovered
+    "alert_episode": 0,
+    "signal_lost_at": None,  # epoch of the last good reading before the current episode
+    "device": "Child-01",
+})
+
+SSE_HEARTBEAT_SECONDS = 15.0
+_RSSI_WRITE_LOCK = threading.Lock()
+_RSSI_DEFAULTS = RSSI_STATE
+# Snapshots for every other monitored tag; RSSI_STATE stays the primary (dashboard) tag
+_TAG_STATES: Dict[str, Mapping[str, Any]] = {}
+_TAG_SETTINGS = ("enabled", "window_size", "threshold", "scan_mode", "filter")
+
+
+def _update_rssi_state(fields: Dict[str, Any], device: str | None = None) -> None:
+    """Publish the next RSSI snapshot; readers see either the old or the new state, never a mix."""
+    global RSSI_STATE
+    with _RSSI_WRITE_LOCK:
+        if device is None or device == RSSI_STATE["device"]:
+            state = {**RSSI_STATE, **fields}
+            RSSI_STATE = BUS.publish("rssi", state, key=state["device"], dedupe=True).data
+            return
+        base = _TAG_STATES.get(device) or {**_RSSI_DEFAULTS, **{k: RSSI_STATE[k] for k in _TAG_SETTINGS}}
+        state = {**base, **fields, "device": device}
+        _TAG_STATES[device] = BUS.publish("rssi", state, key=device, dedupe=True).data
+
+
+def _rssi_state(device: str | None = None) -> Mapping[str, Any] | None:
+    if device is None or device == RSSI_STATE["device"]:
+        return RSSI_STATE
+    return _TAG_STATES.get(device)
+
+
+BUS.publish("rssi", RSSI_STATE, key=RSSI_STATE["device"])
+
+
+_BLE_STREAM: Any = None
+_BLE_ANALYZER: Any = None
+_RSSI_HISTORY: Any = None
+
+
+def get_rssi_history() -> Any:
+    global _RSSI_HISTORY
+    if _RSSI_HISTORY is None:
+        from rssi_history import RSSIHistoryStore  # type: ignore
+        _RSSI_HISTORY = RSSIHistoryStore(path=RSSI_HISTORY_PATH)
+    return _RSSI_HISTORY
+
+
+def _build_tag_monitor(new_analyzer: Any, history: Any, alert_exc: type) -> tuple[Any, Any, Any]:
+    """Per-tag analyzers fed from RSSIStream batches, keyed by the reading's name (or address).
+
+    Returns (on_readings, tick_all, analyzer_for): on_readings is a
+    subscribe_batch callback, tick_all advances every tag's state machine.
+    """
+    analyzers: Dict[str, Any] = {}
+    last_good: Dict[str, float] = {}
+    # Readings arrive on the scanner's dispatch thread, ticks on the asyncio loop
+    lock = threading.Lock()
+
+    def analyzer_for(tag: str) -> Any:
+        analyzer = analyzers.get(tag)
+        if analyzer is None:
+            analyzer = analyzers[tag] = new_analyzer()
+        return analyzer
+
+    def publish(tag: str, analyzer: Any, alert_state: str, rssi: int | None = None) -> None:
+        state = _rssi_state(tag) or {}
+        if alert_state in ("safe", "recovered"):
+            signal_lost_at = None
+        else:
+            signal_lost_at = state.get("signal_lost_at") or last_good.get(tag) or time.time()
+        update = {
+            "signal_lost_at": signal_lost_at,
+            "status": "warning" if alert_state == "out_of_range" else "safe",
+            "alert_state": alert_state,
+            "alert_episode": analyzer.episode,
+            "average_rssi": analyzer.average,
+            "filtered_rssi": analyzer.filtered,
+            **(analyzer.distance() or {}),
+            "error": None,
+        }
+        if rssi is not None:
+            update.update({"latest_rssi": rssi, "last_update": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        _update_rssi_state(update, device=tag)
+
+    def advance(tag: str, step: Any, rssi: int | None = None) -> None:
+        analyzer = analyzer_for(tag)
+        try:
+            with lock:
+                try:
+                    alert_state, entered = step(analyzer), False
+                except alert_exc:
+                    alert_state, entered = analyzer.state, True
+                publish(tag, analyzer, alert_state, rssi)
+            if entered:
+                # A child leaving range must always reach the journal; only coalescing applies
+                alert, _, _ = _log_alert("rssi_monitor", "Child possibly out of range", episode=analyzer.episode,
+                                         device=tag, rate_limit=False)
+                if alert is None:
+                    print(f"⚠️ Out-of-range alert for {tag} (episode {analyzer.episode}) was dropped")
+        except Exception as e:
+            _update_rssi_state({"status": "unknown", "error": str(e)}, device=tag)
+
+    def on_readings(readings: list) -> None:
+        for _, name, address, rssi in readings:
+            tag = name or address
+            if rssi >= analyzer_for(tag).threshold:
+                last_good[tag] = time.time()
+            advance(tag, lambda a: a.analyze(rssi), rssi)
+            history.append(tag, rssi)
+
+    def tick_all() -> None:
+        for tag, analyzer in list(analyzers.items()):
+            if analyzer.rssi_history:
+                advance(tag, lambda a: a.tick())
+
+    return on_readings, tick_all, analyzer_for
 
 
 def start_ble_monitor_background() -> None:
+    global _BLE_STREAM, _BLE_ANALYZER
     try:
-        from rssi_analyzer import RSSIAnalyzer, MissingChildIdentification  # type: ignore
-        from ble_scanner import RSSIStream  # type: ignore
+        from rssi_analyzer import RSSIAnalyzer, MissingChildIdentification, PathLossModel  # type: ignore
+        from ble_scanner import RSSIStream, load_scan_profile  # type: ignore
+        history = get_rssi_history()
+        profile = load_scan_profile(SCAN_PROFILE_PATH) if os.path.exists(SCAN_PROFILE_PATH) else None
     except Exception as e:  # optional: environment may lack BLE
-        RSSI_STATE.update({
+        _update_rssi_state({
             "enabled": False,
             "status": "unknown",
             "error": f"BLE modules not available: {e}",
         })
         return
 
-    analyzer = RSSIAnalyzer(threshold=RSSI_STATE["threshold"], window_size=RSSI_STATE["window_size"])  # type: ignore
-    stream = RSSIStream()  # type: ignore
+    stream = RSSIStream(scan_mode=RSSI_STATE["scan_mode"], profile=profile)  # type: ignore
+    _BLE_STREAM = stream
+    _update_rssi_state({"device": stream.profile.names[0]})
+    history.start_autosave()
 
-    def subscriber(rssi: int) -> None:
-        try:
-            analyzer.analyze(rssi)
-            RSSI_STATE.update({
-                "status": "safe",
-                "latest_rssi": rssi,
-                "average_rssi": (sum(analyzer.rssi_history) / len(analyzer.rssi_history)) if analyzer.rssi_history else None,
-                "last_update": time.strftime("%Y-%m-%dT%H:%M:%S"),
-                "error": None,
-            })
-        except MissingChildIdentification:
-            RSSI_STATE.update({
-                "status": "warning",
-                "latest_rssi": rssi,
-                "average_rssi": (sum(analyzer.rssi_history) / len(analyzer.rssi_history)) if analyzer.rssi_history else None,
-                "last_update": time.strftime("%Y-%m-%dT%H:%M:%S"),
-                "error": None,
-            })
-        except Exception as e:
-            RSSI_STATE.update({"status": "unknown", "error": str(e)})
+    def new_analyzer() -> Any:
+        return RSSIAnalyzer(  # type: ignore
+            threshold=RSSI_STATE["threshold"],
+            window_size=RSSI_STATE["window_size"],
+            filter=RSSI_STATE["filter"],
+            path_loss=PathLossModel(),  # type: ignore
+        )
 
-    stream.subscribe(subscriber)
+    on_readings, tick_all, analyzers = _build_tag_monitor(new_analyzer, history, MissingChildIdentification)
+    _BLE_ANALYZER = analyzers(RSSI_STATE["device"])
+
+    async def tick_loop():
+        # Lets the state machines notice a tag that has gone silent
+        while True:
+            await asyncio.sleep(1.0)
+            tick_all()
+
+    stream.subscribe_batch(on_readings)
 
     async def run_loop():
         try:
-            RSSI_STATE.update({"enabled": True})
-            await stream.start_stream()
+            _update_rssi_state({"enabled": True})
+            ticker = asyncio.create_task(tick_loop())
+            try:
+                await stream.start_stream()
+            finally:
+                ticker.cancel()
         except Exception as e:
-            RSSI_STATE.update({"enabled": False, "status": "unknown", "error": str(e)})
+            _update_rssi_state({"enabled": False, "status": "unknown", "error": str(e)})
 
     def thread_target():
         try:
             asyncio.run(run_loop())
         except Exception as e:
-            RSSI_STATE.update({"enabled": False, "status": "unknown", "error": str(e)})
+            _update_rssi_state({"enabled": False, "status": "unknown", "error": str(e)})
 
     t = threading.Thread(target=thread_target, name="BLEMonitorThread", daemon=True)
     t.start()
 
 
+# ---------------- MULTI-GATEWAY INGESTION ----------------
+_GATEWAY_FUSION: Any = None
+
+
+def get_gateway_fusion() -> Any:
+    global _GATEWAY_FUSION
+    if _GATEWAY_FUSION is None:
+        from gateway_ingest import GatewayFusion, load_gateways  # type: ignore
+        gateways = load_gateways(GATEWAYS_PATH) if os.path.exists(GATEWAYS_PATH) else {}
+        _GATEWAY_FUSION = GatewayFusion(gateways=gateways)
+    return _GATEWAY_FUSION
+
+
+def start_gateway_listener_background() -> None:
+    try:
+        from gateway_ingest import GatewayUDPListener  # type: ignore
+        GatewayUDPListener(get_gateway_fusion()).start()
+    except Exception as e:  # optional: port may be taken or numpy missing
+        print(f"Gateway UDP listener not started: {e}")
+
+
 def _safe_parse_date(series: pd.Series) -> pd.Series:
     return pd.to_datetime(series, errors="coerce")
 
@@ -307,25 +492,383 @@ def api_stats():
 
 @app.route("/api/rssi")
 def api_rssi():
-    return jsonify(RSSI_STATE)
+    state = _rssi_state(request.args.get("device"))
+    if state is None:
+        return jsonify({"error": f"unknown device {request.args.get('device')}"}), 404
+    payload = dict(state)
+    if _BLE_STREAM is not None:
+        payload["scanner"] = _BLE_STREAM.stats.as_dict()
+        payload["dispatch"] = _BLE_STREAM.dispatcher.stats()
+        payload["scan_profile"] = _BLE_STREAM.profile.as_dict()
+    if _BLE_ANALYZER is not None and _BLE_ANALYZER.path_loss is not None:
+        payload["path_loss"] = _BLE_ANALYZER.path_loss.as_dict()
+    return jsonify(payload)
+
+
+@app.route("/api/rssi/stream")
+def api_rssi_stream():
+    """Server-Sent Events: pushes the device's RSSI state whenever it changes."""
+    device = request.args.get("device") or RSSI_STATE["device"]
+    # Ids from a previous server process (different epoch) are stale: start over with a full snapshot
+    epoch, _, seq = (request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or "").partition("-")
+    after = int(seq) if epoch == BUS.epoch and seq.isdigit() else 0
+
+    def format_event(event: Any) -> str:
+        return f"id: {BUS.epoch}-{event.seq}\nevent: rssi\ndata: {json.dumps(dict(event.data))}\n\n"
+
+    def events():
+        yield "retry: 3000\n\n"
+        # Subscribe before reading the snapshot so no change can slip in between
+        with BUS.subscribe("rssi", key=device, maxsize=8) as sub:
+            last = after
+            current = BUS.snapshot("rssi", device)
+            if current is not None and current.seq > last:
+                last = current.seq
+                yield format_event(current)
+            while True:
+                fresh = [e for e in sub.get(timeout=SSE_HEARTBEAT_SECONDS) if e.seq > last]
+                if fresh:
+                    # Only the newest state matters to the page
+                    last = fresh[-1].seq
+                    yield format_event(fresh[-1])
+                else:
+                    yield ": heartbeat\n\n"
+
+    return app.response_class(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-_ALERT_LOG: list[Dict[str, Any]] = []
+def _parse_ts(value: str | None) -> float | None:
+    """Epoch seconds or ISO-8601 (local time) query parameter."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
 
 
-@app.route("/api/alert", methods=["POST"])
-def api_alert():
-    payload = request.get_json(silent=True) or {}
+@app.route("/api/rssi/history")
+def api_rssi_history():
+    try:
+        t0 = _parse_ts(request.args.get("from"))
+        t1 = _parse_ts(request.args.get("to"))
+    except ValueError:
+        return jsonify({"error": "from/to must be epoch seconds or ISO-8601"}), 400
+    device = request.args.get("device") or RSSI_STATE["device"]
+    resolution = request.args.get("resolution", "auto")
+    try:
+        result = get_rssi_history().query(device, t0, t1, resolution)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if result is None:
+        return jsonify({"error": f"no history for device {device}"}), 404
+    return jsonify(result)
+
+
+_ALERT_JOURNAL: Any = None
+_ALERT_JOURNAL_LOCK = threading.Lock()
+
+
+def get_alert_journal() -> Any:
+    global _ALERT_JOURNAL
+    with _ALERT_JOURNAL_LOCK:
+        if _ALERT_JOURNAL is None:
+            from alert_journal import AlertJournal  # type: ignore
+            journal = AlertJournal(ALERTS_DIR)
+            journal.start()
+            _ALERT_JOURNAL = journal
+    return _ALERT_JOURNAL
+
+
+@app.route("/api/gateway/ingest", methods=["POST"])
+def api_gateway_ingest():
+    from gateway_ingest import BatchDecodeError  # type: ignore
+    fusion = get_gateway_fusion()
+    try:
+        if request.mimetype == "application/octet-stream":
+            accepted = fusion.ingest_bytes(request.get_data())
+        else:
+            payload = request.get_json(silent=True) or {}
+            if "gateway_id" not in payload:
+                return jsonify({"ok": False, "error": "gateway_id is required"}), 400
+            accepted = fusion.ingest_json(payload)
+    except (BatchDecodeError, ValueError, TypeError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "accepted": accepted}), 202
+
+
+@app.route("/api/zones")
+def api_zones():
+    fusion = get_gateway_fusion()
+    return jsonify({
+        "tags": fusion.view(device=request.args.get("device")),
+        "stats": fusion.stats(),
+    })
+
+
+_ALERT_POLICY: Any = None
+
+
+def get_alert_policy() -> Any:
+    global _ALERT_POLICY
+    if _ALERT_POLICY is None:
+        from alert_policy import AlertPolicy  # type: ignore
+        _ALERT_POLICY = AlertPolicy()
+    return _ALERT_POLICY
+
+
+_NOTIFIER: Any = None
+_NOTIFIER_LOCK = threading.Lock()
+
+
+def _alert_contacts(device: str | None, guards: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """Parents whose device_id (or BLE tag_name) matches the alerting device, plus configured guards."""
+    parents = [
+        {"name": u.get("name"), "phone": u.get("phone"), "email": email}
+        for email, u in load_users().items()
+        if device and device in (u.get("device_id"), u.get("tag_name"))
+    ]
+    return parents + guards
+
+
+def get_notifier() -> Any:
+    global _NOTIFIER
+    with _NOTIFIER_LOCK:
+        if _NOTIFIER is None:
+            from notifier import Notifier, make_channels  # type: ignore
+            config: Dict[str, Any] = {"channels": {"log": {"type": "stub"}}}
+            if os.path.exists(NOTIFICATIONS_PATH):
+                with open(NOTIFICATIONS_PATH) as f:
+                    config = json.load(f)
+            guards = config.get("guards", [])
+            notifier = Notifier(NOTIFIER_DB_PATH, make_channels(config.get("channels", {})),
+                                resolve_contacts=lambda device: _alert_contacts(device, guards))
+            notifier.start()
+            _NOTIFIER = notifier
+    return _NOTIFIER
+
+
+def _log_alert(source: str, note: str, episode: int | None = None, limiter_key: str | None = None,
+               device: str | None = None, rate_limit: bool = True) -> tuple[Dict[str, Any] | None, bool, float]:
+    """Log an alert unless it repeats an open (device, status, episode) alert.
+
+    Returns (canonical alert, coalesced, retry_after); the alert is None when
+    `limiter_key` (default: source) has exceeded its rate. rate_limit=False
+    (server-side monitors) only coalesces. `device` defaults to the primary
+    monitored tag, `episode` to its current alert episode.
+    """
+    state = _rssi_state(device) or {**_RSSI_DEFAULTS, "device": device}  # one consistent snapshot
     entry = {
         "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
-        "source": payload.get("source", "web"),
-        "note": payload.get("note", ""),
-        "rssi": RSSI_STATE.get("latest_rssi"),
-        "avg_rssi": RSSI_STATE.get("average_rssi"),
-        "status": RSSI_STATE.get("status"),
+        "source": source,
+        "note": note,
+        "device": state.get("device"),
+        "rssi": state.get("latest_rssi"),
+        "avg_rssi": state.get("average_rssi"),
+        "status": state.get("status"),
+        "alert_state": state.get("alert_state"),
+        "episode": state.get("alert_episode") if episode is None else episode,
+        "signal_lost_at": state.get("signal_lost_at"),
     }
-    _ALERT_LOG.append(entry)
-    return jsonify({"ok": True, "logged": entry}), 201
+
+    def create() -> Dict[str, Any]:
+        stored = get_alert_journal().append(entry)
+        BUS.publish("alert", stored, key=stored["device"])
+        get_notifier().submit(stored)
+        return stored
+
+    key = (entry["device"], entry["status"], entry["episode"])
+    return get_alert_policy().submit(key, (limiter_key or source) if rate_limit else None, create)
+
+
+@app.route("/api/alert", methods=["POST"])
+def api_alert():
+    payload = request.get_json(silent=True) or {}
+    source = payload.get("source", "web")
+    # source and episode are client-controlled: the address picks the rate-limit bucket and
+    # the monitored tag's own episode the coalescing key, so repeats can't open new incidents
+    entry, coalesced, retry_after = _log_alert(source, payload.get("note", ""),
+                                               limiter_key=f"client|{request.remote_addr}")
+    if entry is None:
+        response = jsonify({"ok": False, "error": "rate limited", "retry_after": round(retry_after, 1)})
+        response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+        return response, 429
+    body = {"ok": True, "alert_id": entry["id"], "coalesced": coalesced, "logged": entry}
+    return jsonify(body), (200 if coalesced else 201)
+
+
+@app.route("/api/alerts")
+def api_alerts():
+    try:
+        t0 = _parse_ts(request.args.get("from"))
+        t1 = _parse_ts(request.args.get("to"))
+        cursor = request.args.get("cursor", type=int)
+        limit = min(request.args.get("limit", 100, type=int), 1000)
+    except ValueError:
+        return jsonify({"ok": False, "error": "from/to must be epoch seconds or ISO-8601"}), 400
+    if limit < 1:
+        return jsonify({"ok": False, "error": "limit must be at least 1"}), 400
+    journal = get_alert_journal()
+    alerts, next_cursor = journal.query(request.args.get("device"), t0, t1, cursor, limit)
+    return jsonify({"alerts": alerts, "next_cursor": next_cursor, "journal": journal.stats(),
+                    "policy": get_alert_policy().stats()})
+
+# ---------------- ESCALATION (alert -> incident -> CCTV) ----------------
+_ESCALATION: Any = None
+_ESCALATION_LOCK = threading.Lock()
+_CCTV_SIMULATOR_LOCK = threading.Lock()
+_CCTV_LOCAL = threading.local()
+_DETECTION_CACHE: Any = None
+
+
+def _get_cctv_simulator() -> Any:
+    """This thread's simulator: YOLO predictors keep per-call state, so each scan worker loads its own model."""
+    global _DETECTION_CACHE
+    simulator = getattr(_CCTV_LOCAL, "simulator", None)
+    if simulator is None:
+        with _CCTV_SIMULATOR_LOCK:
+            model_path = next((p for p in CCTV_MODEL_PATHS if os.path.exists(p)), None)
+            if model_path is None:
+                raise RuntimeError("no CCTV model weights found")
+            sys.path.insert(0, os.path.join(os.path.dirname(__file__), "model"))
+            from cctv_simulation import CCTVSIMULATOR  # type: ignore
+            from detection_cache import DetectionCache  # type: ignore
+            if _DETECTION_CACHE is None:
+                _DETECTION_CACHE = DetectionCache(DETECTION_CACHE_PATH)
+        # Incidents on the same footage reuse each other's detections
+        simulator = _CCTV_LOCAL.simulator = CCTVSIMULATOR(model_path, runtime=CCTV_RUNTIME, cache=_DETECTION_CACHE)
+    return simulator
+
+
+_FOOTAGE_INDEX: Any = None
+
+
+def get_footage_index() -> Any:
+    """Index written by model/footage_index.py; None until that job has created it."""
+    global _FOOTAGE_INDEX
+    with _CCTV_SIMULATOR_LOCK:
+        if _FOOTAGE_INDEX is None and os.path.exists(FOOTAGE_INDEX_PATH):
+            sys.path.insert(0, os.path.join(os.path.dirname(__file__), "model"))
+            from footage_index import FootageIndex  # type: ignore
+            _FOOTAGE_INDEX = FootageIndex(FOOTAGE_INDEX_PATH)
+    return _FOOTAGE_INDEX
+
+
+def _cctv_scan(incident: Any, camera_id: str, camera: Dict[str, Any]) -> Dict[str, Any] | None:
+    index = get_footage_index()
+    if index is not None:
+        since = (incident.stages.get("signal_lost") or time.time()) - FOOTAGE_LOOKBACK_SECONDS
+        found = index.query([camera_id], since, time.time(), min_conf=camera.get("conf", 0.5))
+        best = found["cameras"][camera_id]["best"]
+        if best is not None:
+            return {"confidence": best["confidence"], "source": "index",
+                    "frame_ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(best["t"]))}
+        if found["cameras"][camera_id]["covered_s"] >= 0.95 * (time.time() - since):
+            return None  # the whole window is indexed and has no child; no need to run YOLO
+    result = _get_cctv_simulator().scan_video_pipelined(camera.get("source") or VIDEO_PATH, camera.get("conf", 0.5))
+    if result is None:
+        raise RuntimeError(f"could not open {camera.get('source')}")
+    if not result["detected"]:
+        return None
+    return {"confidence": result["confidence"], "frame_ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "frame_index": result["frame_index"]}
+
+
+def _locate_tag(device: str) -> tuple[str | None, tuple[float, float] | None]:
+    """Zone and x/y where gateways last heard the tag (position at its last_seen time)."""
+    view = get_gateway_fusion().view(device=device).get(device)
+    if view and view.get("zone") is None and view.get("last_seen"):
+        view = get_gateway_fusion().view(now=view["last_seen"], device=device).get(device)
+    if not view:
+        return None, None
+    xy = (view["x"], view["y"]) if view.get("x") is not None else None
+    return view.get("zone"), xy
+
+
+def get_escalation() -> Any:
+    global _ESCALATION
+    with _ESCALATION_LOCK:
+        if _ESCALATION is None:
+            from escalation import EscalationPipeline, load_cameras  # type: ignore
+            cameras = load_cameras(CAMERAS_PATH) if os.path.exists(CAMERAS_PATH) else {
+                "CAM_GATE_3": {"zone": None, "source": VIDEO_PATH},
+            }
+            pipeline = EscalationPipeline(BUS, cameras, _cctv_scan, locate=_locate_tag)
+            pipeline.start()
+            _ESCALATION = pipeline
+    return _ESCALATION
+
+
+@app.route("/incidents")
+def api_incidents():
+    """Incident list, newest first (also polled by model/cctv_simulation.py)."""
+    return jsonify(get_escalation().list())
+
+
+@app.route("/api/incidents/<incident_id>")
+def api_incident(incident_id: str):
+    incident = get_escalation().snapshot(incident_id)
+    if incident is None:
+        return jsonify({"ok": False, "error": "unknown incident"}), 404
+    return jsonify(incident)
+
+
+@app.route("/api/incidents/<incident_id>/resolve", methods=["POST"])
+def api_incident_resolve(incident_id: str):
+    if get_escalation().resolve(incident_id) is None:
+        return jsonify({"ok": False, "error": "unknown incident"}), 404
+    return jsonify(get_escalation().snapshot(incident_id))
+
+
+@app.route("/api/footage/query")
+def api_footage_query():
+    """Indexed detections, e.g. ?cameras=CAM_GATE_3,CAM_HALL_1&t0=1717000000&t1=1717003600&min_conf=0.5"""
+    index = get_footage_index()
+    if index is None:
+        return jsonify({"error": "footage index not built; run model/footage_index.py run"}), 503
+    cameras = request.args.get("cameras")
+    t0, t1 = request.args.get("t0", type=float), request.args.get("t1", type=float)
+    result = index.query(cameras.split(",") if cameras else None, t0, t1,
+                         request.args.get("min_conf", 0.0, type=float), request.args.get("limit", 1000, type=int))
+    return jsonify(result)
+
+
+@app.route("/api/escalation/stats")
+def api_escalation_stats():
+    stats = get_escalation().stats()
+    stats["detection_cache"] = _DETECTION_CACHE.stats() if _DETECTION_CACHE is not None else None
+    return jsonify(stats)
+
+
+@app.route("/incident/<incident_id>/cctv_match", methods=["POST"])
+def api_cctv_match(incident_id: str):
+    """Receives matches from model/cctv_simulation.py (run with --backend pointing here)."""
+    payload = request.get_json(silent=True) or {}
+    event = BUS.publish("cctv", {
+        "incident_id": incident_id,
+        "camera_id": payload.get("camera_id"),
+        "confidence": payload.get("confidence"),
+        "frame_ts": payload.get("frame_ts"),
+        "track": payload.get("track"),  # entry/exit/best frame when the simulator runs with --track
+        "received": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }, key=incident_id)
+    get_escalation().record_match(incident_id, payload.get("camera_id"), payload.get("confidence"),
+                                  payload.get("frame_ts"))
+    return jsonify({"ok": True, "seq": event.seq}), 202
+
+
+@app.route("/api/notifications/stats")
+def api_notification_stats():
+    return jsonify(get_notifier().stats())
+
+
+@app.route("/api/events/stats")
+def api_event_stats():
+    return jsonify(BUS.stats())
 
 def get_navbar_html():
     """Generate navbar HTML based on current session state"""
@@ -439,24 +982,38 @@ HOME_HTML = """
     </div>
 
     <script>
-      async function pollRSSI() {
-        try {
-          const res = await fetch('/api/rssi');
-          const data = await res.json();
+      // The warning banner (and its notify button) is built once per alert episode
+      let shownEpisode = null;
+
+      function renderRSSI(data) {
           const banner = document.getElementById('rssi-banner');
           if (data.status === 'warning') {
+            if (shownEpisode === data.alert_episode) return;
+            shownEpisode = data.alert_episode;
             banner.className = 'alert alert-danger';
             banner.innerHTML = `🚨 Possible out-of-range detected. Latest RSSI: ${data.latest_rssi} dBm (avg ${Math.round((data.average_rssi ?? 0) * 10) / 10}). <button id=\"notifyBtn\" class=\"btn btn-sm btn-light ms-2\">Notify Response Team</button>`;
             banner.classList.remove('d-none');
             const btn = document.getElementById('notifyBtn');
             if (btn) {
               btn.onclick = async () => {
-                await fetch('/api/alert', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({source: 'dashboard', note: 'RSSI warning triggered'})});
-                btn.textContent = 'Notified';
                 btn.disabled = true;
+                const res = await fetch('/api/alert', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({source: 'dashboard', note: 'RSSI warning triggered', episode: data.alert_episode})});
+                const body = await res.json().catch(() => ({}));
+                if (body.alert_id) {
+                  btn.textContent = body.coalesced ? `Already notified (#${body.alert_id})` : `Notified (#${body.alert_id})`;
+                } else {
+                  btn.textContent = 'Try again shortly';
+                  setTimeout(() => { btn.textContent = 'Notify Response Team'; btn.disabled = false; }, (body.retry_after || 5) * 1000);
+                }
               };
             }
+          } else if (data.alert_state === 'suspect') {
+            shownEpisode = null;
+            banner.className = 'alert alert-warning';
+            banner.textContent = `⚠️ Weak signal, watching. Latest RSSI: ${data.latest_rssi} dBm.`;
+            banner.classList.remove('d-none');
           } else if (data.status === 'safe') {
+            shownEpisode = null;
             banner.className = 'alert alert-success';
             banner.textContent = `✅ Safe zone. Latest RSSI: ${data.latest_rssi} dBm (avg ${Math.round((data.average_rssi ?? 0) * 10) / 10}).`;
             banner.classList.remove('d-none');
@@ -465,9 +1022,44 @@ HOME_HTML = """
             banner.textContent = 'BLE/RSSI monitoring not active or initializing...';
             banner.classList.remove('d-none');
           }
+      }
+
+      async function pollRSSI() {
+        try {
+          const res = await fetch('/api/rssi');
+          renderRSSI(await res.json());
         } catch {}
       }
 
+      // Live RSSI: server push (SSE) with 3-second polling as a fallback
+      let pollTimer = null;
+
+      function startPolling() {
+        if (pollTimer) return;
+        pollRSSI();
+        pollTimer = setInterval(pollRSSI, 3000);
+      }
+
+      function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+      }
+
+      function connectRSSI() {
+        if (!window.EventSource) { startPolling(); return; }
+        const source = new EventSource('/api/rssi/stream');
+        let failures = 0;
+        source.addEventListener('rssi', (e) => {
+          failures = 0;
+          stopPolling();
+          renderRSSI(JSON.parse(e.data));
+        });
+        source.onerror = () => {
+          // EventSource reconnects (resuming via Last-Event-ID) by itself; poll meanwhile
+          startPolling();
+          if (++failures >= 5 || source.readyState === EventSource.CLOSED) source.close();
+        };
+      }
+
       async function loadKpis() {
         const res = await fetch('/api/stats');
         const data = await res.json();
@@ -492,8 +1084,7 @@ HOME_HTML = """
 
       loadKpis();
       loadAlerts();
-      pollRSSI();
-      setInterval(pollRSSI, 3000);
+      connectRSSI();
     </script>
   </body>
   </html>
@@ -612,24 +1203,38 @@ INSIGHTS_HTML = """
     </div>
 
     <script>
-      async function pollRSSI() {
-        try {
-          const res = await fetch('/api/rssi');
-          const data = await res.json();
+      // The warning banner (and its notify button) is built once per alert episode
+      let shownEpisode = null;
+
+      function renderRSSI(data) {
           const banner = document.getElementById('rssi-banner');
           if (data.status === 'warning') {
+            if (shownEpisode === data.alert_episode) return;
+            shownEpisode = data.alert_episode;
             banner.className = 'alert alert-danger';
             banner.innerHTML = `🚨 Possible out-of-range detected. Latest RSSI: ${data.latest_rssi} dBm (avg ${Math.round((data.average_rssi ?? 0) * 10) / 10}). <button id=\"notifyBtn\" class=\"btn btn-sm btn-light ms-2\">Notify Response Team</button>`;
             banner.classList.remove('d-none');
             const btn = document.getElementById('notifyBtn');
             if (btn) {
               btn.onclick = async () => {
-                await fetch('/api/alert', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({source: 'dashboard', note: 'RSSI warning triggered'})});
-                btn.textContent = 'Notified';
                 btn.disabled = true;
+                const res = await fetch('/api/alert', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({source: 'dashboard', note: 'RSSI warning triggered', episode: data.alert_episode})});
+                const body = await res.json().catch(() => ({}));
+                if (body.alert_id) {
+                  btn.textContent = body.coalesced ? `Already notified (#${body.alert_id})` : `Notified (#${body.alert_id})`;
+                } else {
+                  btn.textContent = 'Try again shortly';
+                  setTimeout(() => { btn.textContent = 'Notify Response Team'; btn.disabled = false; }, (body.retry_after || 5) * 1000);
+                }
               };
             }
+          } else if (data.alert_state === 'suspect') {
+            shownEpisode = null;
+            banner.className = 'alert alert-warning';
+            banner.textContent = `⚠️ Weak signal, watching. Latest RSSI: ${data.latest_rssi} dBm.`;
+            banner.classList.remove('d-none');
           } else if (data.status === 'safe') {
+            shownEpisode = null;
             banner.className = 'alert alert-success';
             banner.textContent = `✅ Safe zone. Latest RSSI: ${data.latest_rssi} dBm (avg ${Math.round((data.average_rssi ?? 0) * 10) / 10}).`;
             banner.classList.remove('d-none');
@@ -638,9 +1243,44 @@ INSIGHTS_HTML = """
             banner.textContent = 'BLE/RSSI monitoring not active or initializing...';
             banner.classList.remove('d-none');
           }
+      }
+
+      async function pollRSSI() {
+        try {
+          const res = await fetch('/api/rssi');
+          renderRSSI(await res.json());
         } catch {}
       }
 
+      // Live RSSI: server push (SSE) with 3-second polling as a fallback
+      let pollTimer = null;
+
+      function startPolling() {
+        if (pollTimer) return;
+        pollRSSI();
+        pollTimer = setInterval(pollRSSI, 3000);
+      }
+
+      function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+      }
+
+      function connectRSSI() {
+        if (!window.EventSource) { startPolling(); return; }
+        const source = new EventSource('/api/rssi/stream');
+        let failures = 0;
+        source.addEventListener('rssi', (e) => {
+          failures = 0;
+          stopPolling();
+          renderRSSI(JSON.parse(e.data));
+        });
+        source.onerror = () => {
+          // EventSource reconnects (resuming via Last-Event-ID) by itself; poll meanwhile
+          startPolling();
+          if (++failures >= 5 || source.readyState === EventSource.CLOSED) source.close();
+        };
+      }
+
       async function loadStats() {
         const res = await fetch('/api/stats');
         const data = await res.json();
@@ -699,8 +1339,7 @@ INSIGHTS_HTML = """
       }
 
       loadStats();
-      pollRSSI();
-      setInterval(pollRSSI, 3000);
+      connectRSSI();
     </script>
   </body>
   </html>
@@ -953,6 +1592,12 @@ REGISTER_HTML = """
                   <input type="number" class="form-control" id="child_age" name="child_age" min="1" max="18" required>
                 </div>
               </div>
+
+              <div class="mb-3">
+                <label for="tag_name" class="form-label">BLE Tag Name</label>
+                <input type="text" class="form-control" id="tag_name" name="tag_name" placeholder="Child-01">
+                <div class="form-text">The name your child's tag advertises; leave blank to use the one shipped with your device.</div>
+              </div>
               
               <div class="card mb-3 border-success">
                 <div class="card-header bg-success text-white">
@@ -1072,12 +1717,13 @@ def register():
         phone = request.form.get("phone")
         child_name = request.form.get("child_name")
         child_age = request.form.get("child_age")
+        tag_name = (request.form.get("tag_name") or "").strip() or None
         
         if not all([name, email, password, phone, child_name, child_age]):
             flash("All fields are required", "error")
             return render_template_string(REGISTER_HTML.replace("{{ navbar|safe }}", get_navbar_html()))
         
-        success, message = register_user(email, password, name, phone, child_name, child_age)
+        success, message = register_user(email, password, name, phone, child_name, child_age, tag_name)
         
         if success:
             flash(f"Registration successful! Your device ID is {message.split('Device ID: ')[1] if 'Device ID:' in message else 'TT0001'}. Please login to access your dashboard.", "success")
@@ -1195,6 +1841,7 @@ def login():
             session['user_email'] = email
             session['user_name'] = "Demo Parent"
             session['user_device_id'] = "TT0001"
+            session['user_tag_name'] = default_tag_name("TT0001")
             flash("Logged in successfully!", "success")
             return redirect(url_for("parent_dashboard"))
         
@@ -1204,6 +1851,7 @@ def login():
             session['user_email'] = email
             session['user_name'] = user_data['name']
             session['user_device_id'] = user_data['device_id']
+            session['user_tag_name'] = user_data.get('tag_name') or default_tag_name(user_data['device_id'])
             flash("Logged in successfully!", "success")
             return redirect(url_for("parent_dashboard"))
         else:
@@ -1264,6 +1912,7 @@ PARENT_DASHBOARD_HTML = """
                 <div>Device ID: <strong>{{ session.user_device_id }}</strong></div>
                 <div>Last Update: <span id="last-update">--</span></div>
                 <div>Signal Strength: <span id="signal-strength">--</span></div>
+                <div>Estimated Distance: <span id="distance-estimate">--</span></div>
               </div>
             </div>
           </div>
@@ -1347,6 +1996,9 @@ PARENT_DASHBOARD_HTML = """
       let signalChart;
       let signalData = [];
       let alertLog = [];
+      let lastEpisode = null;
+      // This parent's BLE tag; the status endpoints otherwise report the default device
+      const DEVICE = encodeURIComponent({{ tag_name|tojson }});
 
       // Initialize signal chart
       function initChart() {
@@ -1384,61 +2036,108 @@ PARENT_DASHBOARD_HTML = """
       }
 
       // Update device status
+      function renderDeviceStatus(data) {
+        const indicator = document.getElementById('status-indicator');
+        const status = document.getElementById('device-status');
+        const lastUpdate = document.getElementById('last-update');
+        const signalStrength = document.getElementById('signal-strength');
+      
+        // Update status indicator
+        indicator.className = 'status-indicator status-' + (data.status || 'unknown');
+      
+        // Update status text
+        const statusText = {
+          'safe': 'Device Connected - Safe Zone',
+          'warning': 'Device Out of Range - Warning',
+          'unknown': 'Device Status Unknown'
+        };
+        status.textContent = statusText[data.status] || 'Device Status Unknown';
+      
+        // Update signal info
+        if (data.distance_m != null) {
+          document.getElementById('distance-estimate').textContent =
+            `~${data.distance_m} m (${data.distance_low_m}–${data.distance_high_m} m)`;
+        }
+
+        if (data.latest_rssi) {
+          signalStrength.textContent = data.latest_rssi + ' dBm';
+        
+          // Add to chart
+          const now = new Date().toLocaleTimeString();
+          signalData.push({time: now, value: data.latest_rssi});
+          while (signalData.length > 60) signalData.shift();
+        
+          signalChart.data.labels = signalData.map(d => d.time);
+          signalChart.data.datasets[0].data = signalData.map(d => d.value);
+          signalChart.update();
+        }
+      
+        lastUpdate.textContent = data.last_update || 'Never';
+      
+        // Record each out-of-range episode once in the activity list
+        if (data.status === 'warning' && data.alert_episode !== lastEpisode) {
+          lastEpisode = data.alert_episode;
+          alertLog.unshift({
+            time: new Date().toLocaleTimeString(),
+            type: 'device',
+            message: 'Device went out of range'
+          });
+          updateAlertsList();
+        }
+
+        // Update banner
+        const banner = document.getElementById('rssi-banner');
+        if (data.status === 'warning') {
+          banner.className = 'alert alert-warning';
+          banner.innerHTML = `⚠️ Your child's device is out of range! Latest signal: ${data.latest_rssi} dBm`;
+          banner.classList.remove('d-none');
+        } else if (data.status === 'safe') {
+          banner.className = 'alert alert-success';
+          banner.innerHTML = `✅ Device connected. Signal strength: ${data.latest_rssi} dBm`;
+          banner.classList.remove('d-none');
+        } else {
+          banner.classList.add('d-none');
+        }
+      }
+
       function updateDeviceStatus() {
-        fetch('/api/rssi')
-          .then(response => response.json())
-          .then(data => {
-            const indicator = document.getElementById('status-indicator');
-            const status = document.getElementById('device-status');
-            const lastUpdate = document.getElementById('last-update');
-            const signalStrength = document.getElementById('signal-strength');
-            
-            // Update status indicator
-            indicator.className = 'status-indicator status-' + (data.status || 'unknown');
-            
-            // Update status text
-            const statusText = {
-              'safe': 'Device Connected - Safe Zone',
-              'warning': 'Device Out of Range - Warning',
-              'unknown': 'Device Status Unknown'
-            };
-            status.textContent = statusText[data.status] || 'Device Status Unknown';
-            
-            // Update signal info
-            if (data.latest_rssi) {
-              signalStrength.textContent = data.latest_rssi + ' dBm';
-              
-              // Add to chart
-              const now = new Date().toLocaleTimeString();
-              signalData.push({time: now, value: data.latest_rssi});
-              if (signalData.length > 20) signalData.shift();
-              
-              signalChart.data.labels = signalData.map(d => d.time);
-              signalChart.data.datasets[0].data = signalData.map(d => d.value);
-              signalChart.update();
-            }
-            
-            lastUpdate.textContent = data.last_update || 'Never';
-            
-            // Update banner
-            const banner = document.getElementById('rssi-banner');
-            if (data.status === 'warning') {
-              banner.className = 'alert alert-warning';
-              banner.innerHTML = `⚠️ Your child's device is out of range! Latest signal: ${data.latest_rssi} dBm`;
-              banner.classList.remove('d-none');
-            } else if (data.status === 'safe') {
-              banner.className = 'alert alert-success';
-              banner.innerHTML = `✅ Device connected. Signal strength: ${data.latest_rssi} dBm`;
-              banner.classList.remove('d-none');
-            } else {
-              banner.classList.add('d-none');
-            }
-          })
+        fetch(`/api/rssi?device=${DEVICE}`)
+          .then(response => response.ok ? response.json() : {status: 'unknown'})
+          .then(renderDeviceStatus)
           .catch(error => {
             console.error('Error fetching RSSI data:', error);
           });
       }
 
+      // Live status: server push (SSE) with 3-second polling as a fallback
+      let pollTimer = null;
+
+      function startPolling() {
+        if (pollTimer) return;
+        updateDeviceStatus();
+        pollTimer = setInterval(updateDeviceStatus, 3000);
+      }
+
+      function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+      }
+
+      function connectDeviceStatus() {
+        if (!window.EventSource) { startPolling(); return; }
+        const source = new EventSource(`/api/rssi/stream?device=${DEVICE}`);
+        let failures = 0;
+        source.addEventListener('rssi', (e) => {
+          failures = 0;
+          stopPolling();
+          renderDeviceStatus(JSON.parse(e.data));
+        });
+        source.onerror = () => {
+          // EventSource reconnects (resuming via Last-Event-ID) by itself; poll meanwhile
+          startPolling();
+          if (++failures >= 5 || source.readyState === EventSource.CLOSED) source.close();
+        };
+      }
+
       // Test alert function
       function testAlert() {
         alertLog.unshift({
@@ -1460,9 +2159,25 @@ PARENT_DASHBOARD_HTML = """
         updateDeviceStatus();
       }
 
+      // Load server-side history into the chart (survives page reloads)
+      function loadHistory(seconds, resolution) {
+        const to = Date.now() / 1000;
+        fetch(`/api/rssi/history?device=${DEVICE}&from=${to - seconds}&to=${to}&resolution=${resolution}`)
+          .then(response => response.ok ? response.json() : null)
+          .then(data => {
+            if (!data) return;
+            const values = data.resolution === 'raw' ? data.rssi : data.avg;
+            signalData = data.ts.map((t, i) => ({time: new Date(t * 1000).toLocaleTimeString(), value: values[i]}));
+            signalChart.data.labels = signalData.map(d => d.time);
+            signalChart.data.datasets[0].data = signalData.map(d => d.value);
+            signalChart.update();
+          })
+          .catch(error => console.error('Error fetching RSSI history:', error));
+      }
+
       // View history
       function viewHistory() {
-        alert('History feature coming soon!');
+        loadHistory(3600, '1m');
       }
 
       // Update contacts
@@ -1492,10 +2207,9 @@ PARENT_DASHBOARD_HTML = """
       // Initialize dashboard
       document.addEventListener('DOMContentLoaded', function() {
         initChart();
+        loadHistory(60, 'raw');
         updateDeviceStatus();
-        
-        // Update every 3 seconds
-        setInterval(updateDeviceStatus, 3000);
+        connectDeviceStatus();
       });
     </script>
   </body>
@@ -1506,7 +2220,10 @@ PARENT_DASHBOARD_HTML = """
 @app.route("/parent-dashboard")
 @login_required
 def parent_dashboard():
-    return render_template_string(PARENT_DASHBOARD_HTML.replace("{{ navbar|safe }}", get_navbar_html()))
+    # Sessions from before tag names were stored only have the device id
+    tag_name = session.get('user_tag_name') or default_tag_name(session.get('user_device_id', 'TT0001'))
+    return render_template_string(PARENT_DASHBOARD_HTML.replace("{{ navbar|safe }}", get_navbar_html()),
+                                  tag_name=tag_name)
 
 
 # ---------------- ADMIN LOGIN PAGE ----------------
@@ -1911,8 +2628,12 @@ def admin_dashboard():
 
 
 if __name__ == "__main__":
-    # Start BLE monitor in background if available
-    start_ble_monitor_background()
+    # debug=True runs this block in the reloader parent too; only the serving child owns the radio and port 5005
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        # Start BLE monitor in background if available
+        start_ble_monitor_background()
+        start_gateway_listener_background()
+        get_escalation()  # subscribe to alerts before the first one can fire
     # Run in development mode
     app.run(host="0.0.0.0", port=5000, debug=True)
 
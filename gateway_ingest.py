@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Multi-gateway RSSI ingestion and zone localisation
+Scanner gateways push compact batches of (gateway_id, tag, rssi, ts) readings
+over HTTP or UDP; GatewayFusion keeps a per-tag "strongest gateway / zone" view
+and, where gateway positions are known, a weighted trilateration fix.
+"""
+
+import argparse
+import json
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from rssi_analyzer import PathLossModel
+
+# Binary batch: header, gateway id, tag table, then packed records
+#   header  <2sBBHId  magic "TT", version, gateway-id length, tag count, record count, base ts
+#   tags    per tag: u8 length + utf-8 name
+#   records <u2 tag, i1 rssi, <u4 ms since base ts  (7 bytes each)
+BATCH_MAGIC = b"TT"
+BATCH_VERSION = 1
+BATCH_HEADER = struct.Struct("<2sBBHId")
+BATCH_RECORD = np.dtype([("tag", "<u2"), ("rssi", "i1"), ("dt_ms", "<u4")])
+
+GATEWAY_UDP_PORT = 5005
+MAX_READING_AGE_SECONDS = 10.0
+
+
+class BatchDecodeError(ValueError):
+    pass
+
+
+def encode_batch(gateway_id, tags, rssi, ts):
+    """Pack readings from one gateway into the binary batch format."""
+    names, tag_idx = np.unique(np.asarray(tags, dtype=object).astype(str), return_inverse=True)
+    ts = np.asarray(ts, dtype=np.float64)
+    base = float(ts.min()) if ts.size else time.time()
+    records = np.zeros(ts.size, dtype=BATCH_RECORD)
+    records["tag"] = tag_idx
+    records["rssi"] = np.asarray(rssi)
+    records["dt_ms"] = np.rint((ts - base) * 1000.0)
+    gw = gateway_id.encode()
+    parts = [BATCH_HEADER.pack(BATCH_MAGIC, BATCH_VERSION, len(gw), len(names), ts.size, base), gw]
+    for name in names:
+        raw = name.encode()
+        parts.append(bytes([len(raw)]) + raw)
+    parts.append(records.tobytes())
+    return b"".join(parts)
+
+
+def decode_batch(data):
+    """Unpack a binary batch; returns (gateway_id, tag_names, tag_idx, rssi, ts)."""
+    if len(data) < BATCH_HEADER.size:
+        raise BatchDecodeError("batch too short")
+    magic, version, gw_len, n_tags, n_records, base = BATCH_HEADER.unpack_from(data)
+    if magic != BATCH_MAGIC or version != BATCH_VERSION:
+        raise BatchDecodeError("unknown batch format")
+    pos = BATCH_HEADER.size
+    if pos + gw_len > len(data):
+        raise BatchDecodeError("truncated gateway id")
+    gateway_id = data[pos:pos + gw_len].decode()
+    pos += gw_len
+    names = []
+    for _ in range(n_tags):
+        if pos >= len(data) or pos + 1 + data[pos] > len(data):
+            raise BatchDecodeError("truncated tag table")
+        n = data[pos]
+        names.append(data[pos + 1:pos + 1 + n].decode())
+        pos += 1 + n
+    if len(data) - pos < n_records * BATCH_RECORD.itemsize:
+        raise BatchDecodeError("truncated records")
+    records = np.frombuffer(data, dtype=BATCH_RECORD, count=n_records, offset=pos)
+    if n_records and records["tag"].max() >= n_tags:
+        raise BatchDecodeError("record references unknown tag")
+    return gateway_id, names, records["tag"].astype(np.int64), records["rssi"].astype(np.float64), base + records["dt_ms"] / 1000.0
+
+
+class GatewayFusion:
+    """Fuse readings from many gateways into a per-tag location view.
+
+    State is a (tags x gateways) matrix of smoothed RSSI and last-heard time,
+    updated per batch with bincount aggregation; the view is computed for all
+    tags in one vectorized pass.
+    """
+
+    def __init__(self, gateways=None, alpha=0.5, max_age=MAX_READING_AGE_SECONDS, path_loss=None, capacity=256):
+        self.alpha = alpha
+        self.max_age = max_age
+        self.path_loss = path_loss or PathLossModel()
+        self.lock = threading.Lock()
+        self.tag_index = {}
+        self.tags = []
+        self.gateway_index = {}
+        self.gateways = []
+        self.positions = np.zeros((0, 2))
+        self.has_position = np.zeros(0, dtype=bool)
+        self.zones = []
+        self.readings_total = 0
+        self.batches_total = 0
+        self.rssi = np.full((capacity, 0), np.nan)
+        self.seen = np.full((capacity, 0), -np.inf)
+        for gateway_id, info in (gateways or {}).items():
+            self.add_gateway(gateway_id, **info)
+
+    def add_gateway(self, gateway_id, x=None, y=None, zone=None):
+        """Register or update a gateway; x/y in metres enable trilateration."""
+        with self.lock:
+            idx = self._gateway(gateway_id)
+            if x is not None and y is not None:
+                self.positions[idx] = (x, y)
+                self.has_position[idx] = True
+            if zone is not None:
+                self.zones[idx] = zone
+            return idx
+
+    def _gateway(self, gateway_id):
+        idx = self.gateway_index.get(gateway_id)
+        if idx is None:
+            idx = len(self.gateways)
+            self.gateway_index[gateway_id] = idx
+            self.gateways.append(gateway_id)
+            self.zones.append(gateway_id)
+            self.positions = np.vstack([self.positions, [0.0, 0.0]])
+            self.has_position = np.append(self.has_position, False)
+            pad = np.full((self.rssi.shape[0], 1), np.nan)
+            self.rssi = np.hstack([self.rssi, pad])
+            self.seen = np.hstack([self.seen, np.full_like(pad, -np.inf)])
+        return idx
+
+    def _tag_rows(self, names):
+        rows = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            row = self.tag_index.get(name)
+            if row is None:
+                row = len(self.tags)
+                self.tag_index[name] = row
+                self.tags.append(name)
+            rows[i] = row
+        needed = len(self.tags)
+        if needed > self.rssi.shape[0]:
+            grow = max(needed, 2 * self.rssi.shape[0]) - self.rssi.shape[0]
+            self.rssi = np.vstack([self.rssi, np.full((grow, self.rssi.shape[1]), np.nan)])
+            self.seen = np.vstack([self.seen, np.full((grow, self.seen.shape[1]), -np.inf)])
+        return rows
+
+    def ingest(self, gateway_id, tag_names, tag_idx, rssi, ts):
+        """Apply one gateway's batch: tag_idx indexes into tag_names."""
+        with self.lock:
+            g = self._gateway(gateway_id)
+            rows = self._tag_rows(tag_names)[np.asarray(tag_idx, dtype=np.int64)]
+            if rows.size == 0:
+                return 0
+            # Average each tag's readings within the batch, then one EMA step per tag
+            n = len(self.tags)
+            counts = np.bincount(rows, minlength=n)
+            sums = np.bincount(rows, weights=rssi, minlength=n)
+            latest = np.full(n, -np.inf)
+            np.maximum.at(latest, rows, ts)
+            hit = np.flatnonzero(counts)
+            mean = sums[hit] / counts[hit]
+            prev = self.rssi[hit, g]
+            self.rssi[hit, g] = np.where(np.isnan(prev), mean, prev + self.alpha * (mean - prev))
+            self.seen[hit, g] = np.maximum(self.seen[hit, g], latest[hit])
+            self.readings_total += int(rows.size)
+            self.batches_total += 1
+            return int(rows.size)
+
+    def ingest_bytes(self, data):
+        gateway_id, names, tag_idx, rssi, ts = decode_batch(data)
+        return self.ingest(gateway_id, names, tag_idx, rssi, ts)
+
+    def ingest_json(self, payload):
+        """{"gateway_id": "...", "readings": [[tag, rssi, ts], ...]}"""
+        gateway_id = str(payload["gateway_id"])
+        readings = payload.get("readings") or []
+        if not readings:
+            return 0
+        tags, rssi, ts = zip(*readings)
+        names, tag_idx = np.unique(np.asarray(tags).astype(str), return_inverse=True)
+        return self.ingest(gateway_id, [str(n) for n in names], tag_idx, np.asarray(rssi, dtype=np.float64), np.asarray(ts, dtype=np.float64))
+
+    def _trilaterate(self, rssi, fresh):
+        """Weighted least squares on -2x*xi - 2y*yi + (x^2+y^2) = d_i^2 - xi^2 - yi^2, per tag."""
+        T = rssi.shape[0]
+        xy = np.full((T, 2), np.nan)
+        usable = fresh & self.has_position[None, :]
+        solvable = usable.sum(axis=1) >= 3
+        if not solvable.any():
+            return xy
+        d = self.path_loss.distance(np.where(usable, rssi, 0.0))
+        w = np.where(usable, 1.0 / np.maximum(d, 0.1) ** 2, 0.0)[solvable]
+        px, py = self.positions[:, 0], self.positions[:, 1]
+        A = np.stack([-2 * px, -2 * py, np.ones_like(px)], axis=1)  # gateways x 3
+        b = d[solvable] ** 2 - (px ** 2 + py ** 2)[None, :]
+        M = np.einsum("tg,gi,gj->tij", w, A, A)
+        v = np.einsum("tg,gi,tg->ti", w, A, b)
+        ok = np.abs(np.linalg.det(M)) > 1e-9
+        sol = np.full((w.shape[0], 3), np.nan)
+        if ok.any():
+            sol[ok] = np.linalg.solve(M[ok], v[ok][..., None])[..., 0]
+        xy[solvable] = sol[:, :2]
+        return xy
+
+    def view(self, now=None, device=None):
+        """Per-tag fused location: strongest gateway, zone, distance and optional x/y."""
+        now = time.time() if now is None else now
+        with self.lock:
+            n = len(self.tags)
+            if n == 0 or not self.gateways:
+                return {}
+            rssi = self.rssi[:n]
+            seen = self.seen[:n]
+            fresh = (now - seen <= self.max_age) & ~np.isnan(rssi)
+            masked = np.where(fresh, rssi, -np.inf)
+            best = np.argmax(masked, axis=1)
+            best_rssi = masked[np.arange(n), best]
+            heard_by = fresh.sum(axis=1)
+            xy = self._trilaterate(rssi, fresh)
+            last_seen = seen.max(axis=1)
+            tags = self.tags
+            gateways, zones = self.gateways, self.zones
+
+        out = {}
+        for i in range(n):
+            if device is not None and tags[i] != device:
+                continue
+            located = heard_by[i] > 0
+            entry = {
+                "gateway": gateways[best[i]] if located else None,
+                "zone": zones[best[i]] if located else None,
+                "rssi": round(float(best_rssi[i]), 1) if located else None,
+                "distance_m": round(float(self.path_loss.distance(best_rssi[i])), 2) if located else None,
+                "gateways_heard": int(heard_by[i]),
+                "last_seen": float(last_seen[i]) if np.isfinite(last_seen[i]) else None,
+            }
+            if not np.isnan(xy[i, 0]):
+                entry["x"], entry["y"] = round(float(xy[i, 0]), 2), round(float(xy[i, 1]), 2)
+            out[tags[i]] = entry
+        return out
+
+    def stats(self):
+        return {
+            "gateways": len(self.gateways),
+            "tags": len(self.tags),
+            "batches_total": self.batches_total,
+            "readings_total": self.readings_total,
+        }
+
+
+class GatewayUDPListener:
+    """Receive one binary batch per UDP datagram and feed it to a GatewayFusion."""
+
+    def __init__(self, fusion, host="0.0.0.0", port=GATEWAY_UDP_PORT):
+        self.fusion = fusion
+        self.host = host
+        self.port = port
+        self.errors = 0
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self._sock.bind((self.host, self.port))
+        self._thread = threading.Thread(target=self._run, name="GatewayUDPListener", daemon=True)
+        self._thread.start()
+        print(f"📡 Gateway UDP listener on {self.host}:{self.port}")
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                data, _ = self._sock.recvfrom(65535)
+            except OSError:
+                break  # socket closed
+            try:
+                self.fusion.ingest_bytes(data)
+            except Exception:
+                self.errors += 1
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+
+
+def load_gateways(path):
+    """Gateway config: {"gateway_id": {"x": 0, "y": 0, "zone": "Main gate"}, ...}"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def benchmark_ingest(num_gateways=20, num_tags=2000, batch_size=500, batches=400, seed=0):
+    """Encode batches up front, then time decode + fuse; returns readings per second."""
+    rng = np.random.default_rng(seed)
+    gateways = {f"GW{g:02d}": {"x": float(g % 5) * 10, "y": float(g // 5) * 10, "zone": f"Zone {g}"} for g in range(num_gateways)}
+    fusion = GatewayFusion(gateways=gateways, capacity=num_tags)
+    now = time.time()
+    payloads = [
+        encode_batch(
+            f"GW{rng.integers(num_gateways):02d}",
+            [f"Child-{t:04d}" for t in rng.integers(0, num_tags, batch_size)],
+            rng.integers(-100, -40, batch_size),
+            now + rng.uniform(0, 1, batch_size),
+        )
+        for _ in range(batches)
+    ]
+    started = time.perf_counter()
+    for data in payloads:
+        fusion.ingest_bytes(data)
+    ingest_s = time.perf_counter() - started
+    started = time.perf_counter()
+    fusion.view(now=now + 1)
+    view_s = time.perf_counter() - started
+    return {
+        "readings": batches * batch_size,
+        "readings_per_s": round(batches * batch_size / ingest_s),
+        "view_ms": round(view_s * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-gateway RSSI ingestion')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('bench', help='Decode + fusion throughput')
+    p.add_argument('--batch-size', type=int, default=500)
+    p.add_argument('--tags', type=int, default=2000)
+    p = sub.add_parser('send', help='Push a synthetic batch to a UDP listener (gateway simulator)')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=GATEWAY_UDP_PORT)
+    p.add_argument('--gateway', default='GW01')
+    p.add_argument('--tag', default='Child-01')
+    p.add_argument('--rssi', type=int, default=-65)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        print(json.dumps(benchmark_ingest(num_tags=args.tags, batch_size=args.batch_size), indent=2))
+    elif args.command == 'send':
+        data = encode_batch(args.gateway, [args.tag], [args.rssi], [time.time()])
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.sendto(data, (args.host, args.port))
+        print(f"Sent {len(data)} bytes to {args.host}:{args.port}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ Simulates CCTV footage processing with real child detection
 
 import os
 import sys
+import json
 import time
+import queue
 import threading
 import requests # type: ignore
 import cv2 # type: ignore
@@ -14,52 +16,900 @@ import numpy as np # type: ignore
 from pathlib import Path
 from ultralytics import YOLO # type: ignore
 import argparse
+from tracker import SortTracker
+from detection_cache import DEFAULT_PATH as DEFAULT_CACHE_PATH, DetectionCache
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_BATCH_LATENCY = 0.25  # seconds a sampled frame may wait for its batch to fill
+DEFAULT_QUEUE_SIZE = 32  # decoded frames buffered between the reader and inference
+DEFAULT_IMGSZ = 640
+DEFAULT_SEEK_STRIDE = 90  # sampling strides this long (frames) seek instead of grabbing through
+FALLBACK_FPS = 30.0
+MOTION_WIDTH = 160         # motion gate works on grayscale frames this wide
+MOTION_PIXEL_DELTA = 25    # grey-level change that counts a pixel as moving
+MOTION_SENSITIVITY = 0.01  # fraction of moving pixels that sends a frame to the detector
+MOTION_KEEPALIVE = 20      # infer at least every N sampled frames even without motion
+CHECKPOINT_INTERVAL_SECONDS = 30  # full scans persist progress at least this often
+SEGMENT_GAP_SECONDS = 2.0         # timeline hits closer than this merge into one segment
+_END = object()  # end-of-stream marker on pipeline queues
+_NO_DETECTIONS = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32))
+
+
+def container_fps(cap):
+    """Frame rate reported by the container, or FALLBACK_FPS when it is missing or bogus."""
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    return fps if fps and 0 < fps < 1000 else FALLBACK_FPS
+
+
+def sampling_step(fps, frame_step=10, target_fps=None, stride_seconds=None):
+    """Frames between samples: from a target sampling FPS, a time stride, or a fixed frame step."""
+    if target_fps:
+        return max(1, round(fps / target_fps))
+    if stride_seconds:
+        return max(1, round(stride_seconds * fps))
+    return max(1, frame_step)
+
+
+def sample_frames(cap, step, max_frames, stats, seek_stride=DEFAULT_SEEK_STRIDE, start=0, skip=None):
+    """Yield (frame_index, frame) for every step-th frame from `start` up to frame max_frames.
+    
+    Only sampled frames are retrieve()d (converted to BGR and copied out);
+    frames in between are grab()bed, or for strides of seek_stride frames or
+    more skipped with a seek, which decodes from the nearest keyframe.
+    Sampled frames whose index is in `skip` (already cached) are yielded as
+    (index, None) without being retrieved. stats counts grabbed, retrieved
+    and seeks.
+    """
+    for key in ("grabbed", "retrieved", "seeks"):
+        stats.setdefault(key, 0)
+    seek = step >= seek_stride
+    index = start
+    if start and cap.set(cv2.CAP_PROP_POS_FRAMES, start):
+        stats["seeks"] += 1
+    elif start:
+        for _ in range(start):
+            if not cap.grab():
+                return
+            stats["grabbed"] += 1
+    while index <= max_frames:
+        if not cap.grab():
+            return
+        stats["grabbed"] += 1
+        if skip and index in skip:
+            yield index, None
+        else:
+            ok, frame = cap.retrieve()
+            if not ok:
+                return
+            stats["retrieved"] += 1
+            yield index, frame
+        
+        next_index = index + step
+        if seek and cap.set(cv2.CAP_PROP_POS_FRAMES, next_index):
+            stats["seeks"] += 1
+        else:
+            seek = False  # backend cannot seek; grab through instead
+            for _ in range(step - 1):
+                if not cap.grab():
+                    return
+                stats["grabbed"] += 1
+        index = next_index
+
+
+def timeline_segments(timeline, gap=SEGMENT_GAP_SECONDS):
+    """Merge time-ordered timeline hits into [{"start_s", "end_s", "hits", "best_confidence", "best_s"}]."""
+    segments = []
+    for hit in timeline:
+        last = segments[-1] if segments else None
+        if last is not None and hit["t_s"] - last["end_s"] <= gap:
+            last["end_s"] = hit["t_s"]
+            last["hits"] += 1
+            if hit["confidence"] > last["best_confidence"]:
+                last["best_confidence"], last["best_s"] = hit["confidence"], hit["t_s"]
+        else:
+            segments.append({"start_s": hit["t_s"], "end_s": hit["t_s"], "hits": 1,
+                             "best_confidence": hit["confidence"], "best_s": hit["t_s"]})
+    return segments
+
+
+def _write_json_atomic(path, data):
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class MotionGate:
+    """Cheap pre-filter: only frames that differ from a running-average background go to YOLO.
+    
+    Frames are shrunk to MOTION_WIDTH grayscale, blurred and compared with the
+    background; a frame passes when at least `sensitivity` of its pixels moved
+    by more than `pixel_delta`. The first frame and every `keepalive`-th
+    skipped frame in a row still pass, so a child standing still in view is
+    not missed after the background absorbs them.
+    """
+    
+    def __init__(self, sensitivity=MOTION_SENSITIVITY, pixel_delta=MOTION_PIXEL_DELTA, keepalive=MOTION_KEEPALIVE,
+                 width=MOTION_WIDTH, learning_rate=0.05):
+        self.sensitivity = sensitivity
+        self.pixel_delta = pixel_delta
+        self.keepalive = keepalive
+        self.width = width
+        self.learning_rate = learning_rate
+        self.background = None
+        self.since_inferred = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.seconds = 0.0
+    
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+    
+    def check(self, frame):
+        """True if the frame should be sent to the detector."""
+        started = time.perf_counter()
+        gray = self._small_gray(frame)
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray
+            moving = 1.0
+        else:
+            moving = float(np.mean(np.abs(gray - self.background) > self.pixel_delta))
+            self.background += self.learning_rate * (gray - self.background)
+        passed = moving >= self.sensitivity or (self.keepalive and self.since_inferred + 1 >= self.keepalive)
+        if passed:
+            self.inferred += 1
+            self.since_inferred = 0
+        else:
+            self.skipped += 1
+            self.since_inferred += 1
+        self.seconds += time.perf_counter() - started
+        return passed
+    
+    def stats(self):
+        checked = self.inferred + self.skipped
+        return {
+            "checked": checked,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / checked, 3) if checked else None,
+            "ms_per_check": round(self.seconds / checked * 1000, 3) if checked else None,
+        }
+
+
+class FrameBatcher:
+    """Collects sampled frames into batches of up to batch_size.
+
+    add() returns a ready batch [(frame_index, frame), ...] once it is full or
+    its oldest frame has waited max_latency seconds; flush() returns the rest.
+    """
+    
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_BATCH_LATENCY):
+        self.batch_size = max(1, batch_size)
+        self.max_latency = max_latency
+        self.items = []
+        self.first_at = None
+    
+    def add(self, frame_index, frame):
+        if not self.items:
+            self.first_at = time.monotonic()
+        self.items.append((frame_index, frame))
+        if len(self.items) >= self.batch_size or time.monotonic() - self.first_at >= self.max_latency:
+            return self.flush()
+        return None
+    
+    def flush(self):
+        items, self.items = self.items, []
+        return items
+
+
+class StageTimer:
+    """Busy time, time blocked on the next stage (backpressure) and time starved by the previous one."""
+    
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.starved = 0.0
+        self.lock = threading.Lock()
+    
+    def add(self, items=0, busy=0.0, blocked=0.0, starved=0.0):
+        with self.lock:
+            self.items += items
+            self.busy += busy
+            self.blocked += blocked
+            self.starved += starved
+    
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy, 3),
+            "blocked_s": round(self.blocked, 3),
+            "starved_s": round(self.starved, 3),
+            "ms_per_item": round(self.busy / self.items * 1000, 2) if self.items else None,
+        }
+
+
+def _put(q, item, stop, timer):
+    """Blocking put that gives up when `stop` is set; blocked time is the stage's backpressure."""
+    started = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            continue
+    timer.add(blocked=time.perf_counter() - started)
+    return not stop.is_set()
+
+
+class FrameReader(threading.Thread):
+    """Decode thread: samples every frame_step-th frame, shrinks it to imgsz and
+    puts (frame_index, frame) on a bounded queue, blocking when inference falls behind."""
+    
+    def __init__(self, video_path, out_queue, stop, frame_step=10, max_frames=100, imgsz=DEFAULT_IMGSZ,
+                 target_fps=None, stride_seconds=None, motion_gate=None, start_frame=0, cached=None):
+        super().__init__(name="CCTVFrameReader", daemon=True)
+        self.start_frame = start_frame
+        self.cached = cached  # frame indexes with cached detections: not decoded, put with frame=None
+        self.video_path = video_path
+        self.out_queue = out_queue
+        self.stop = stop
+        self.frame_step = frame_step
+        self.target_fps = target_fps
+        self.stride_seconds = stride_seconds
+        self.max_frames = max_frames
+        self.imgsz = imgsz
+        self.motion_gate = motion_gate
+        self.timer = StageTimer()
+        self.sampling = {}
+        self.frames_read = 0
+        self.opened = None
+    
+    def _preprocess(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.imgsz / max(h, w) if self.imgsz else 1.0
+        if scale < 1.0:
+            frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+        return frame
+    
+    def run(self):
+        cap = cv2.VideoCapture(str(self.video_path))
+        self.opened = cap.isOpened()
+        try:
+            if not self.opened:
+                return
+            fps = container_fps(cap)
+            step = sampling_step(fps, self.frame_step, self.target_fps, self.stride_seconds)
+            self.sampling.update({"fps": fps, "step": step, "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)})
+            frames = sample_frames(cap, step, self.max_frames, self.sampling, start=self.start_frame,
+                                   skip=self.cached)
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                sample = next(frames, None)
+                if sample is None:
+                    break
+                index, frame = sample
+                self.frames_read = index + 1
+                if frame is not None:
+                    if self.motion_gate is not None and not self.motion_gate.check(frame):
+                        self.timer.add(busy=time.perf_counter() - started)
+                        continue
+                    frame = self._preprocess(frame)
+                self.timer.add(items=1, busy=time.perf_counter() - started)
+                if not _put(self.out_queue, (index, frame, time.monotonic()), self.stop, self.timer):
+                    break
+        finally:
+            cap.release()
+            _put(self.out_queue, _END, self.stop, StageTimer())
+
+
+RUNTIMES = ("auto", "pytorch", "onnx", "openvino")
+
+
+def resolve_model_path(model_path, runtime="auto"):
+    """Pick the exported model for `runtime` next to a .pt (see export_model.py).
+    
+    An INT8 export is preferred over FP32; rejected INT8 exports are renamed
+    *.rejected and never match. "auto" uses the path as given, so the file
+    type decides the backend. Falls back to the .pt if nothing was exported.
+    """
+    path = Path(model_path)
+    if runtime in ("auto", "pytorch") or path.suffix != ".pt":
+        return str(path)
+    if runtime == "onnx":
+        candidates = [path.with_name(f"{path.stem}-int8.onnx"), path.with_suffix(".onnx")]
+    elif runtime == "openvino":
+        candidates = [path.with_name(f"{path.stem}_int8_openvino_model"), path.with_name(f"{path.stem}_openvino_model")]
+    else:
+        raise ValueError(f"unknown runtime {runtime!r}; expected one of {', '.join(RUNTIMES)}")
+    found = next((c for c in candidates if c.exists()), None)
+    if found is None:
+        print(f"No {runtime} export next to {path}, using PyTorch (run export_model.py first)")
+        return str(path)
+    return str(found)
+
 
 class CCTVSIMULATOR:
-    def __init__(self, model_path, backend_url="http://localhost:8000"):
-        self.model_path = model_path
+    def __init__(self, model_path, backend_url="http://localhost:8000", runtime="auto", cache=None):
+        self.model_path = resolve_model_path(model_path, runtime)
         self.backend_url = backend_url
+        self.cache = cache  # optional DetectionCache shared by every FrameReader-based scan
         self.model = None
+        self.load_seconds = None
         self.load_model()
     
     def load_model(self):
-        """Load the trained YOLOv8 model"""
+        """Load the trained YOLOv8 model (.pt, .onnx or OpenVINO directory)"""
         try:
-            self.model = YOLO(self.model_path)
-            print(f"Model loaded successfully: {self.model_path}")
+            started = time.perf_counter()
+            self.model = YOLO(self.model_path, task="detect")
+            self.load_seconds = time.perf_counter() - started
+            print(f"Model loaded successfully: {self.model_path} ({self.load_seconds:.2f}s)")
         except Exception as e:
-            print(f"Error loading model: {e}")
-            sys.exit(1)
+            # RuntimeError, not sys.exit: the Flask scan workers construct simulators too
+            raise RuntimeError(f"Error loading model {self.model_path}: {e}") from e
     
     def process_video_frame(self, frame, conf_threshold=0.5):
         """Process a single video frame for child detection"""
-        if self.model is None:
-            return False, 0.0
+        return self.process_frames([frame], conf_threshold)[0]
+    
+    def process_frames(self, frames, conf_threshold=0.5):
+        """Run a batch of frames through the model in one call.
+
+        Returns [(detected, max_confidence), ...] in the same order as `frames`.
+        """
+        return self._run_batch(self.model, frames, conf_threshold)
+    
+    @staticmethod
+    def _run_batch(model, frames, conf_threshold):
+        return [CCTVSIMULATOR._as_match(d) for d in CCTVSIMULATOR._detect_batch(model, frames, conf_threshold)]
+    
+    @staticmethod
+    def _detect_batch(model, frames, conf_threshold):
+        """Full detections per frame: [(xyxy (N, 4) float32, conf (N,) float32), ...].
+        
+        Boxes come off the device as whole tensors, one transfer per frame
+        instead of one per box. A frame whose inference failed is None, so
+        callers can tell it apart from a frame with no child.
+        """
+        if model is None or not frames:
+            return [None] * len(frames)
         
         try:
-            # Run inference
-            results = self.model(frame, conf=conf_threshold, verbose=False)
-            
-            # Check for detections
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None and len(boxes) > 0:
-                    # Get the highest confidence detection
-                    max_conf = 0.0
-                    for box in boxes:
-                        conf = box.conf[0].cpu().numpy()
-                        max_conf = max(max_conf, conf)
-                    
-                    return True, max_conf
-            
+            results = model(list(frames), conf=conf_threshold, verbose=False)
+        except Exception as e:
+            if len(frames) == 1:
+                print(f"Error processing batch: {e}")
+                return [None]
+            # Static-batch exports (batch 1) reject larger batches: fall back to one frame per call
+            print(f"Batch of {len(frames)} failed ({e}); inferring frame by frame")
+            return [d for frame in frames for d in CCTVSIMULATOR._detect_batch(model, [frame], conf_threshold)]
+        
+        out = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is not None and len(boxes) > 0:
+                out.append((boxes.xyxy.cpu().numpy().astype(np.float32), boxes.conf.cpu().numpy().astype(np.float32)))
+            else:
+                out.append(_NO_DETECTIONS)
+        return out
+    
+    def _cache_scope(self, video_path, conf_threshold, imgsz):
+        """(scope, {frame: detections}) for this video/model/settings, or (None, {}) without a cache."""
+        if self.cache is None or not os.path.isfile(str(video_path)):
+            return None, {}  # live streams have no stable content to key on
+        scope = self.cache.scope(video_path, self.model_path, conf_threshold, imgsz)
+        return scope, self.cache.load(scope)
+    
+    def _infer_items(self, model, items, conf_threshold, scope=None, cached=None):
+        """Detections for FrameReader items [(index, frame or None, ts)]; None frames come from `cached`.
+        
+        Only frames missing from the cache reach the model, and their results
+        are written back in one transaction. Failed frames stay None in the
+        result and are never cached, so a later scan retries them.
+        """
+        todo = [(i, item) for i, item in enumerate(items) if item[1] is not None]
+        out = [cached.get(item[0]) if item[1] is None else None for item in items]
+        if todo:
+            detected = self._detect_batch(model, [item[1] for _, item in todo], conf_threshold)
+            for (i, _), result in zip(todo, detected):
+                out[i] = result
+            if scope is not None:
+                self.cache.put_many(scope, [(item[0], *result) for (_, item), result in zip(todo, detected)
+                                            if result is not None])
+        if self.cache is not None and scope is not None:
+            self.cache.record(hits=len(items) - len(todo), misses=len(todo))
+        return out
+    
+    @staticmethod
+    def _as_match(detections):
+        if detections is None:
             return False, 0.0
+        _, confs = detections
+        return len(confs) > 0, float(confs.max()) if len(confs) else 0.0
+    
+    def track_video(self, video_path, conf_threshold=0.25, batch_size=DEFAULT_BATCH_SIZE, target_fps=5,
+                    frame_step=10, max_frames=None, motion_sensitivity=None, tracker=None, on_event=None):
+        """Scan the whole video and track children across frames.
+        
+        Every sampled frame's boxes go to a SortTracker; each tracked child
+        becomes one event (entry/exit time, best frame) passed to on_event as
+        soon as its track closes. A low conf_threshold is deliberate: weak
+        boxes only extend existing tracks, the tracker's high_conf starts them.
+        Returns {"events", "tracker", "sampling", "fps", ...} or None if the
+        video cannot be opened.
+        """
+        tracker = tracker or SortTracker()
+        frames_q = queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        stop = threading.Event()
+        gate = MotionGate(motion_sensitivity) if motion_sensitivity is not None else None
+        scope, cached = self._cache_scope(video_path, conf_threshold, None)
+        reader = FrameReader(video_path, frames_q, stop, frame_step, max_frames or 10**12, imgsz=None,
+                             target_fps=target_fps, motion_gate=gate, cached=cached)
+        events = []
+        
+        def emit(closed):
+            for event in closed:
+                events.append(event)
+                if on_event is not None:
+                    on_event(event)
+        
+        started = time.perf_counter()
+        reader.start()
+        batch, done, analysed = [], False, 0
+        try:
+            while not done:
+                item = frames_q.get()
+                if item is _END:
+                    done = True
+                else:
+                    batch.append(item)
+                if batch and (done or len(batch) >= batch_size):
+                    detections = self._infer_items(self.model, batch, conf_threshold, scope, cached)
+                    fps = reader.sampling.get("fps") or FALLBACK_FPS
+                    for (index, _, _), found in zip(batch, detections):
+                        emit(tracker.update(index, index / fps, *(found or _NO_DETECTIONS)))
+                    analysed += len(batch)
+                    batch = []
+        finally:
+            stop.set()
+            reader.join(timeout=5)
+        if not reader.opened:
+            print(f"Error: Could not open video {video_path}")
+            return None
+        emit(tracker.flush())
+        elapsed = time.perf_counter() - started
+        return {
+            "events": events,
+            "tracker": tracker.stats(),
+            "frames_analysed": analysed,
+            "sampling": dict(reader.sampling),
+            "motion": gate.stats() if gate else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "seconds": round(elapsed, 3),
+            "fps": round(analysed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+    
+    def scan_video(self, video_path, conf_threshold=0.5, frame_step=10, max_frames=100,
+                   batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_BATCH_LATENCY, stop_on_match=True,
+                   target_fps=None, stride_seconds=None, motion_sensitivity=None):
+        """Scan a video for the child; stops at the first batch with a detection.
+
+        Frames are sampled every frame_step frames, or at target_fps /
+        every stride_seconds using the container's frame rate, and inferred in
+        batches of batch_size (batch_size=1 is the old frame-at-a-time path).
+        With motion_sensitivity set, a MotionGate drops static frames first.
+        Returns a dict with detected, confidence, frame_index, frames_read,
+        frames_inferred, batches, sampling, motion and seconds, or None if the
+        video cannot be opened.
+        """
+        started = time.perf_counter()
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            print(f"Error: Could not open video {video_path}")
+            return None
+        
+        batcher = FrameBatcher(batch_size, max_latency)
+        frame_count = 0
+        frames_inferred = 0
+        batches = 0
+        detection_found = False
+        max_confidence = 0.0
+        detected_frame = None
+        
+        def run(batch):
+            nonlocal frames_inferred, batches, detection_found, max_confidence, detected_frame
+            batches += 1
+            frames_inferred += len(batch)
+            results = self.process_frames([frame for _, frame in batch], conf_threshold)
+            for (index, _), (detected, confidence) in zip(batch, results):
+                if detected:
+                    if not detection_found:
+                        detected_frame = index
+                    detection_found = True
+                    max_confidence = max(max_confidence, confidence)
+                    print(f"Child detected in frame {index} with confidence {confidence:.3f}")
+        
+        fps = container_fps(cap)
+        sampling = {"fps": fps, "step": sampling_step(fps, frame_step, target_fps, stride_seconds)}
+        
+        gate = MotionGate(motion_sensitivity) if motion_sensitivity is not None else None
+        
+        print("Processing video frames...")
+        for index, frame in sample_frames(cap, sampling["step"], max_frames, sampling):
+            frame_count = index + 1
+            if gate is not None and not gate.check(frame):
+                continue
+            batch = batcher.add(index, frame)
+            if batch:
+                run(batch)
             
+            # Stop after finding detection
+            if detection_found and stop_on_match:
+                break
+        
+        remaining = batcher.flush()
+        if remaining and not (detection_found and stop_on_match):
+            run(remaining)
+        
+        cap.release()
+        return {
+            "detected": detection_found,
+            "confidence": float(max_confidence),
+            "frame_index": detected_frame,
+            "frames_read": frame_count,
+            "frames_inferred": frames_inferred,
+            "batches": batches,
+            "sampling": sampling,
+            "motion": gate.stats() if gate is not None else None,
+            "seconds": time.perf_counter() - started,
+        }
+    
+    def _model_for_worker(self, worker):
+        # YOLO predictors keep per-call state, so extra inference workers get their own copy
+        return self.model if worker == 0 else YOLO(self.model_path, task="detect")
+    
+    def scan_video_pipelined(self, video_path, conf_threshold=0.5, frame_step=10, max_frames=100,
+                             batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_BATCH_LATENCY,
+                             queue_size=DEFAULT_QUEUE_SIZE, inference_workers=1, imgsz=DEFAULT_IMGSZ,
+                             stop_on_match=True, target_fps=None, stride_seconds=None, motion_sensitivity=None):
+        """scan_video() with decode, inference and result aggregation overlapped.
+        
+        A FrameReader thread decodes into a bounded queue (blocking when full),
+        inference workers pull batches from it into a bounded result queue, and
+        this thread aggregates detections, stopping the pipeline at the first
+        match. Returns the scan_video() dict plus per-stage timings under "stages".
+        An exception in an inference worker stops the pipeline and is re-raised.
+        """
+        started = time.perf_counter()
+        stop = threading.Event()
+        frames_q = queue.Queue(maxsize=queue_size)
+        results_q = queue.Queue(maxsize=max(2, queue_size // max(1, batch_size)))
+        gate = MotionGate(motion_sensitivity) if motion_sensitivity is not None else None
+        scope, cached = self._cache_scope(video_path, conf_threshold, imgsz)
+        reader = FrameReader(video_path, frames_q, stop, frame_step, max_frames, imgsz, target_fps, stride_seconds,
+                             motion_gate=gate, cached=cached)
+        infer_timer = StageTimer()
+        result_timer = StageTimer()
+        errors = []  # exceptions from inference workers, re-raised here once the pipeline has stopped
+        
+        def infer(worker):
+            try:
+                model = self._model_for_worker(worker)
+                done = False
+                while not done and not stop.is_set():
+                    batch = []
+                    wait_started = time.perf_counter()
+                    deadline = None
+                    while len(batch) < batch_size:
+                        timeout = 0.1 if deadline is None else max(0.0, deadline - time.monotonic())
+                        try:
+                            item = frames_q.get(timeout=timeout)
+                        except queue.Empty:
+                            if deadline is not None or stop.is_set():
+                                break
+                            continue
+                        if item is _END:
+                            frames_q.put(_END)  # let the other workers see it too
+                            done = True
+                            break
+                        batch.append(item)
+                        if deadline is None:
+                            deadline = time.monotonic() + max_latency
+                    infer_timer.add(starved=time.perf_counter() - wait_started)
+                    if not batch:
+                        continue
+                    busy_started = time.perf_counter()
+                    detections = self._infer_items(model, batch, conf_threshold, scope, cached)
+                    results = [self._as_match(d) for d in detections]
+                    infer_timer.add(items=len(batch), busy=time.perf_counter() - busy_started)
+                    _put(results_q, [(item[0], r) for item, r in zip(batch, results)], stop, infer_timer)
+            except Exception as e:
+                # Record it for the caller; the finally still ends this worker's stream
+                errors.append(e)
+                stop.set()
+            finally:
+                _put(results_q, _END, threading.Event(), StageTimer())
+        
+        workers = [threading.Thread(target=infer, args=(i,), name=f"CCTVInfer-{i}", daemon=True)
+                   for i in range(max(1, inference_workers))]
+        reader.start()
+        for w in workers:
+            w.start()
+        
+        detection_found = False
+        max_confidence = 0.0
+        detected_frame = None
+        frames_inferred = 0
+        batches = 0
+        finished_workers = 0
+        while finished_workers < len(workers):
+            wait_started = time.perf_counter()
+            item = results_q.get()
+            result_timer.add(starved=time.perf_counter() - wait_started)
+            if item is _END:
+                finished_workers += 1
+                continue
+            busy_started = time.perf_counter()
+            batches += 1
+            frames_inferred += len(item)
+            for index, (detected, confidence) in item:
+                if detected:
+                    if detected_frame is None or index < detected_frame:
+                        detected_frame = index
+                    detection_found = True
+                    max_confidence = max(max_confidence, confidence)
+                    print(f"Child detected in frame {index} with confidence {confidence:.3f}")
+            result_timer.add(items=len(item), busy=time.perf_counter() - busy_started)
+            if detection_found and stop_on_match:
+                stop.set()
+        
+        stop.set()
+        reader.join()
+        if errors:
+            raise errors[0]
+        if not reader.opened:
+            print(f"Error: Could not open video {video_path}")
+            return None
+        return {
+            "detected": detection_found,
+            "confidence": float(max_confidence),
+            "frame_index": detected_frame,
+            "frames_read": reader.frames_read,
+            "frames_inferred": frames_inferred,
+            "batches": batches,
+            "sampling": reader.sampling,
+            "motion": gate.stats() if gate is not None else None,
+            "seconds": time.perf_counter() - started,
+            "stages": {
+                "decode": reader.timer.as_dict(),
+                "inference": infer_timer.as_dict(),
+                "results": result_timer.as_dict(),
+            },
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+    
+    @staticmethod
+    def benchmark_sampling(video_path, step=10, max_frames=3000):
+        """Decode-only time to sample every step-th frame: read() everything vs grab() vs seek."""
+        rows = []
+        
+        cap = cv2.VideoCapture(str(video_path))
+        started = time.perf_counter()
+        sampled = 0
+        for index in range(max_frames + 1):
+            ret, _ = cap.read()
+            if not ret:
+                break
+            sampled += index % step == 0
+        rows.append({"mode": "read_all", "sampled": sampled, "seconds": round(time.perf_counter() - started, 3)})
+        cap.release()
+        
+        for mode, seek_stride in (("grab", step + 1), ("seek", 1)):
+            cap = cv2.VideoCapture(str(video_path))
+            stats = {}
+            started = time.perf_counter()
+            sampled = sum(1 for _ in sample_frames(cap, step, max_frames, stats, seek_stride=seek_stride))
+            rows.append({"mode": mode, "sampled": sampled, "seconds": round(time.perf_counter() - started, 3),
+                         **stats})
+            cap.release()
+        return rows
+    
+    def benchmark_pipeline(self, video_path, conf_threshold=0.5, frame_step=10, max_frames=300,
+                           batch_size=DEFAULT_BATCH_SIZE, inference_workers=1):
+        """Sampled frames per second of a full scan, serial vs pipelined (no early stop)."""
+        rows = []
+        serial_started = time.perf_counter()
+        serial = self.scan_video(video_path, conf_threshold, frame_step, max_frames, batch_size, stop_on_match=False)
+        serial_seconds = time.perf_counter() - serial_started
+        rows.append({"mode": "serial", "frames": serial["frames_inferred"], "seconds": round(serial_seconds, 3),
+                     "fps": round(serial["frames_inferred"] / serial_seconds, 2)})
+        piped = self.scan_video_pipelined(video_path, conf_threshold, frame_step, max_frames, batch_size,
+                                          inference_workers=inference_workers, stop_on_match=False)
+        rows.append({"mode": "pipelined", "frames": piped["frames_inferred"], "seconds": round(piped["seconds"], 3),
+                     "fps": round(piped["frames_inferred"] / piped["seconds"], 2), "stages": piped["stages"]})
+        return rows
+    
+    def benchmark_batch_sizes(self, video_path, batch_sizes=(1, 2, 4, 8, 16), num_frames=64, frame_step=10,
+                              conf_threshold=0.5, repeats=2):
+        """Frames per second of process_frames() at each batch size.
+
+        Sampled frames are decoded up front so only inference is timed; one
+        warm-up batch runs before each size.
+        """
+        cap = cv2.VideoCapture(str(video_path))
+        frames = []
+        for _, frame in sample_frames(cap, frame_step, num_frames * frame_step, {}):
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise ValueError(f"no frames read from {video_path}")
+        
+        results = []
+        for size in batch_sizes:
+            self.process_frames(frames[:size], conf_threshold)  # warm-up
+            best = None
+            for _ in range(repeats):
+                started = time.perf_counter()
+                for i in range(0, len(frames), size):
+                    self.process_frames(frames[i:i + size], conf_threshold)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                "batch_size": size,
+                "frames": len(frames),
+                "seconds": round(best, 3),
+                "fps": round(len(frames) / best, 2),
+                "ms_per_frame": round(best / len(frames) * 1000, 2),
+            })
+        return results
+    
+    def full_scan(self, video_path, checkpoint_path=None, conf_threshold=0.5, target_fps=2,
+                  batch_size=DEFAULT_BATCH_SIZE, checkpoint_every=CHECKPOINT_INTERVAL_SECONDS,
+                  motion_sensitivity=None, resume=True, on_progress=None, stop=None):
+        """Scan an entire video into a time-indexed detection timeline, resumable.
+        
+        Progress (next frame to read plus the timeline so far) is written to
+        checkpoint_path every checkpoint_every seconds and when the scan ends or
+        is interrupted; a later call with the same video and settings continues
+        from there. on_progress(progress) gets position, throughput and ETA at
+        each checkpoint. Returns the final checkpoint dict or None if the video
+        cannot be opened.
+        """
+        video_path = str(video_path)
+        checkpoint_path = checkpoint_path or video_path + ".scan.json"
+        key = {"video": os.path.abspath(video_path), "size": os.path.getsize(video_path),
+               "conf": conf_threshold, "target_fps": target_fps, "motion": motion_sensitivity}
+        state = None
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                saved = json.load(f)
+            if saved.get("key") == key:
+                state = saved
+                print(f"Resuming {video_path} at frame {state['next_frame']} "
+                      f"({len(state['timeline'])} hits so far)")
+        if state is None:
+            state = {"key": key, "next_frame": 0, "frames_analysed": 0, "elapsed_s": 0.0, "complete": False,
+                     "timeline": []}
+        if state["complete"]:
+            return state
+        
+        frames_q = queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        stop = stop or threading.Event()  # the caller's stop request; never set here
+        halt = threading.Event()          # stops this scan's reader
+        gate = MotionGate(motion_sensitivity) if motion_sensitivity is not None else None
+        scope, cached = self._cache_scope(video_path, conf_threshold, None)
+        reader = FrameReader(video_path, frames_q, halt, max_frames=10**12, imgsz=None, target_fps=target_fps,
+                             motion_gate=gate, start_frame=state["next_frame"], cached=cached)
+        run_started = time.perf_counter()
+        start_frame = state["next_frame"]
+        base_elapsed = state["elapsed_s"]
+        last_checkpoint = run_started
+        
+        def checkpoint():
+            nonlocal last_checkpoint
+            now = time.perf_counter()
+            run_elapsed = now - run_started
+            state["elapsed_s"] = round(base_elapsed + run_elapsed, 3)
+            fps = reader.sampling.get("fps") or FALLBACK_FPS
+            total = reader.sampling.get("frame_count") or 0
+            covered_per_s = (state["next_frame"] - start_frame) / run_elapsed if run_elapsed > 0 else 0.0
+            state["progress"] = {
+                "position_s": round(state["next_frame"] / fps, 1),
+                "duration_s": round(total / fps, 1) if total else None,
+                "percent": round(min(100.0, 100.0 * state["next_frame"] / total), 1) if total else None,
+                "analysed_fps": round(state["frames_analysed"] / state["elapsed_s"], 2) if state["elapsed_s"] else 0.0,
+                "realtime_factor": round(covered_per_s / fps, 1),  # video seconds scanned per wall second
+                "eta_s": (round(max(0, total - state["next_frame"]) / covered_per_s)
+                          if total and covered_per_s > 0 and not state["complete"] else None),
+            }
+            _write_json_atomic(checkpoint_path, state)
+            last_checkpoint = now
+            if on_progress is not None:
+                on_progress(state["progress"])
+        
+        reader.start()
+        batch, done = [], False
+        try:
+            while not done:
+                if stop.is_set():
+                    halt.set()
+                try:
+                    item = frames_q.get(timeout=0.5)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if item is _END:
+                    done = not halt.is_set()
+                    if not done:
+                        break
+                else:
+                    batch.append(item)
+                if batch and (item is _END or len(batch) >= batch_size):
+                    detections = self._infer_items(self.model, batch, conf_threshold, scope, cached)
+                    fps = reader.sampling.get("fps") or FALLBACK_FPS
+                    failed = next((k for k, d in enumerate(detections) if d is None), None)
+                    for (index, _, _), (boxes, confs) in zip(batch[:failed], detections[:failed]):
+                        if len(confs):
+                            state["timeline"].append({"frame": index, "t_s": round(index / fps, 3),
+                                                      "detections": len(confs),
+                                                      "confidence": round(float(confs.max()), 4)})
+                    state["frames_analysed"] += len(batch[:failed])
+                    if failed is not None:
+                        # Keep the failed frame unscanned: the checkpoint resumes at it
+                        state["next_frame"] = batch[failed][0]
+                        print(f"Inference failed at frame {state['next_frame']}; stopping, resume to retry")
+                        done = False
+                        break
+                    # Everything up to the last analysed frame is durable; resume right after it
+                    state["next_frame"] = batch[-1][0] + reader.sampling.get("step", 1)
+                    batch = []
+                    if time.perf_counter() - last_checkpoint >= checkpoint_every:
+                        checkpoint()
+            if done and not reader.opened:
+                print(f"Error: Could not open video {video_path}")
+                return None
+            if done:
+                state["complete"] = True
+                state["next_frame"] = max(state["next_frame"], reader.frames_read)
+        finally:
+            halt.set()
+            reader.join(timeout=5)
+            if reader.opened:
+                checkpoint()
+        state["segments"] = timeline_segments(state["timeline"])
+        _write_json_atomic(checkpoint_path, state)
+        return state
+    
+    def post_track_event(self, incident_id, camera_id, event):
+        """One CCTV match per tracked child, at its best frame."""
+        try:
+            response = requests.post(
+                f"{self.backend_url}/incident/{incident_id}/cctv_match",
+                json={
+                    "camera_id": camera_id,
+                    "confidence": event["best_confidence"],
+                    "frame_ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "track": event,
+                },
+                timeout=10
+            )
+            print(f"Track {event['track_id']} ({event['entry_s']}s-{event['exit_s']}s) posted: {response.status_code}")
         except Exception as e:
-            print(f"Error processing frame: {e}")
-            return False, 0.0
+            print(f"Error posting track {event['track_id']}: {e}")
     
-    def simulate_cctv_processing(self, video_path, incident_id, delay_seconds=5, conf_threshold=0.5):
-        """Simulate CCTV processing with real child detection"""
+    def simulate_cctv_processing(self, video_path, incident_id, delay_seconds=5, conf_threshold=0.5,
+                                 batch_size=DEFAULT_BATCH_SIZE, target_fps=None, motion_sensitivity=None,
+                                 camera_id="CAM_GATE_3", track=False):
+        """Simulate CCTV processing with real child detection.
+        
+        With track=True the whole video is tracked and one match per tracked
+        child (its best frame) is posted instead of the first detection.
+        """
         def worker():
             print(f"Starting CCTV simulation for incident {incident_id}")
             print(f"Processing video: {video_path}")
@@ -81,37 +931,31 @@ class CCTVSIMULATOR:
                 print(f"Error checking incident status: {e}")
                 return
             
-            # Process video
-            cap = cv2.VideoCapture(str(video_path))
-            if not cap.isOpened():
-                print(f"Error: Could not open video {video_path}")
+            if track:
+                result = self.track_video(video_path, conf_threshold=conf_threshold, batch_size=batch_size,
+                                          target_fps=target_fps or 5, motion_sensitivity=motion_sensitivity,
+                                          on_event=lambda event: self.post_track_event(incident_id, camera_id, event))
+                if result is not None:
+                    print(f"Tracked {len(result['events'])} children over {result['frames_analysed']} frames "
+                          f"({result['fps']} FPS)")
                 return
             
-            frame_count = 0
-            detection_found = False
-            max_confidence = 0.0
-            
-            print("Processing video frames...")
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Process every 10th frame for efficiency
-                if frame_count % 10 == 0:
-                    detected, confidence = self.process_video_frame(frame, conf_threshold)
-                    if detected:
-                        detection_found = True
-                        max_confidence = max(max_confidence, confidence)
-                        print(f"Child detected in frame {frame_count} with confidence {confidence:.3f}")
-                
-                frame_count += 1
-                
-                # Stop after processing enough frames or finding detection
-                if frame_count > 100 or detection_found:
-                    break
-            
-            cap.release()
+            # Process video
+            try:
+                result = self.scan_video_pipelined(video_path, conf_threshold, batch_size=batch_size,
+                                                   target_fps=target_fps, motion_sensitivity=motion_sensitivity)
+            except Exception as e:
+                print(f"Error scanning video: {e}")
+                return
+            if result is not None and result["motion"]:
+                print(f"Motion gate: {result['motion']['inferred']} inferred, {result['motion']['skipped']} skipped")
+            if result is not None and result["cache"]:
+                print(f"Detection cache: {result['cache']['hits']} hits, {result['cache']['misses']} misses "
+                      f"(hit rate {result['cache']['hit_rate']})")
+            if result is None:
+                return
+            detection_found = result["detected"]
+            max_confidence = result["confidence"]
             
             # Send CCTV match to backend
             if detection_found:
@@ -119,7 +963,7 @@ class CCTVSIMULATOR:
                     response = requests.post(
                         f"{self.backend_url}/incident/{incident_id}/cctv_match",
                         json={
-                            "camera_id": "CAM_GATE_3",
+                            "camera_id": camera_id,
                             "confidence": float(max_confidence),
                             "frame_ts": time.strftime("%Y-%m-%dT%H:%M:%S")
                         },
@@ -136,6 +980,245 @@ class CCTVSIMULATOR:
         thread.start()
         return thread
 
+def load_camera_registry(path):
+    """Camera config shared with the backend's cameras.json:
+    {"CAM_GATE_3": {"zone": "Main gate", "x": 0, "y": 12, "source": "gate3.mp4", "conf": 0.5}, ...}"""
+    with open(path) as f:
+        return json.load(f)
+
+
+class _CameraFeed:
+    def __init__(self, camera_id, config, reader, frames_q):
+        self.camera_id = camera_id
+        self.config = config
+        self.reader = reader
+        self.queue = frames_q
+        self.weight = 1
+        self.finished = False
+        self.started = None
+        self.inferred = 0
+        self.detections = 0
+        self.best = None          # (confidence, frame_index)
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_position_s = 0.0
+    
+    def stats(self, now):
+        fps = self.reader.sampling.get("fps") or FALLBACK_FPS
+        return {
+            "zone": self.config.get("zone"),
+            "weight": self.weight,
+            "finished": self.finished,
+            "frames_inferred": self.inferred,
+            "detections": self.detections,
+            "best": {"confidence": self.best[0], "frame_index": self.best[1]} if self.best else None,
+            "queue_depth": self.queue.qsize(),
+            "queue_lag_ms_mean": round(self.lag_total / self.inferred * 1000, 1) if self.inferred else None,
+            "queue_lag_ms_max": round(self.lag_max * 1000, 1),
+            # > 0: analysis is behind the video's own clock (matters for live streams)
+            "behind_realtime_s": (round((now - self.started) - self.last_position_s, 2)
+                                  if self.started and not self.finished else None),
+            "fps": fps,
+        }
+
+
+class MultiCameraScheduler:
+    """Scans many cameras concurrently with one shared model (or a small pool).
+    
+    Each camera gets a FrameReader feeding its own small bounded queue, so a
+    slow or stalled camera only backs up itself. Model workers build each batch
+    by weighted round-robin over the camera queues, taking up to `weight`
+    frames per camera per turn, so every camera is interleaved fairly and
+    cameras near an incident (focus()) get proportionally more of the model.
+    """
+    
+    def __init__(self, simulator, cameras, batch_size=DEFAULT_BATCH_SIZE, model_workers=1, frame_step=10,
+                 target_fps=None, max_frames=10**9, motion_sensitivity=None, queue_size=4, on_detection=None):
+        self.simulator = simulator
+        self.batch_size = batch_size
+        self.model_workers = max(1, model_workers)
+        self.on_detection = on_detection
+        self.stop = threading.Event()
+        self.pick_lock = threading.Lock()
+        self.turn = 0
+        self.feeds = {}
+        for camera_id, config in cameras.items():
+            frames_q = queue.Queue(maxsize=queue_size)
+            gate = MotionGate(motion_sensitivity) if motion_sensitivity is not None else None
+            reader = FrameReader(config["source"], frames_q, self.stop, frame_step, max_frames,
+                                 target_fps=target_fps, motion_gate=gate)
+            reader.name = f"CCTVFrameReader-{camera_id}"
+            self.feeds[camera_id] = _CameraFeed(camera_id, config, reader, frames_q)
+        self.started = None
+        self.frames_inferred = 0
+        self.batches = 0
+        self._workers = []
+    
+    def set_weight(self, camera_id, weight):
+        self.feeds[camera_id].weight = max(1, int(weight))
+    
+    def focus(self, zone=None, xy=None, radius=50.0, boost=4):
+        """Give cameras in `zone` or within `radius` of `xy` `boost` times the model share."""
+        for feed in self.feeds.values():
+            c = feed.config
+            near = zone is not None and c.get("zone") == zone
+            if xy is not None and c.get("x") is not None and c.get("y") is not None:
+                near = near or ((c["x"] - xy[0]) ** 2 + (c["y"] - xy[1]) ** 2) ** 0.5 <= radius
+            feed.weight = boost if near else 1
+    
+    def _next_batch(self):
+        """Weighted round-robin across camera queues; returns [(feed, index, frame, decoded_at)]."""
+        batch = []
+        with self.pick_lock:
+            feeds = [f for f in self.feeds.values() if not f.finished]
+            if not feeds:
+                return None
+            start = self.turn % len(feeds)
+            self.turn += 1
+            progress = True
+            while len(batch) < self.batch_size and progress:
+                progress = False
+                for feed in feeds[start:] + feeds[:start]:
+                    for _ in range(feed.weight):
+                        if len(batch) >= self.batch_size:
+                            break
+                        try:
+                            item = feed.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _END:
+                            feed.finished = True
+                            break
+                        batch.append((feed,) + item)
+                        progress = True
+        return batch
+    
+    def _worker(self, worker):
+        model = self.simulator._model_for_worker(worker)
+        while not self.stop.is_set():
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                time.sleep(0.005)
+                continue
+            now = time.monotonic()
+            results = self.simulator._run_batch(model, [frame for _, _, frame, _ in batch], self._conf(batch))
+            hits = []
+            with self.pick_lock:
+                self.frames_inferred += len(batch)
+                self.batches += 1
+                for (feed, index, _, decoded_at), (detected, confidence) in zip(batch, results):
+                    lag = now - decoded_at
+                    feed.inferred += 1
+                    feed.lag_total += lag
+                    feed.lag_max = max(feed.lag_max, lag)
+                    feed.last_position_s = index / (feed.reader.sampling.get("fps") or FALLBACK_FPS)
+                    if detected and confidence >= feed.config.get("conf", 0.0):
+                        feed.detections += 1
+                        if feed.best is None or confidence > feed.best[0]:
+                            feed.best = (confidence, index)
+                        hits.append((feed.camera_id, index, confidence))
+            # The callback may block (e.g. an HTTP post); never hold up the other workers with it
+            if self.on_detection is not None:
+                for hit in hits:
+                    self.on_detection(*hit)
+    
+    def _conf(self, batch):
+        # One model call per batch: use the loosest per-camera threshold, re-checked per frame above
+        return min(feed.config.get("conf", 0.5) for feed, _, _, _ in batch)
+    
+    def start(self):
+        self.started = time.monotonic()
+        for feed in self.feeds.values():
+            feed.started = self.started
+            feed.reader.start()
+        for i in range(self.model_workers):
+            worker = threading.Thread(target=self._worker, args=(i,), name=f"CCTVModelWorker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def run(self, duration=None):
+        """Start, then block until every camera is exhausted, stop() or `duration` seconds."""
+        self.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        while any(w.is_alive() for w in self._workers):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+        self.stop.set()
+        return self.stats()
+    
+    def stats(self):
+        now = time.monotonic()
+        elapsed = (now - self.started) if self.started else 0.0
+        with self.pick_lock:
+            return {
+                "cameras": {cid: feed.stats(now) for cid, feed in self.feeds.items()},
+                "frames_inferred": self.frames_inferred,
+                "batches": self.batches,
+                "aggregate_fps": round(self.frames_inferred / elapsed, 2) if elapsed > 0 else 0.0,
+                "elapsed_s": round(elapsed, 2),
+            }
+
+
+def run_multi_camera(args):
+    """Scan every camera in the registry, focused on the incident's zone, posting each camera's first match."""
+    cameras = load_camera_registry(args.cameras)
+    for config in cameras.values():
+        config.setdefault("conf", args.conf)
+    try:
+        simulator = CCTVSIMULATOR(args.model, args.backend, args.runtime,
+                                  DetectionCache(args.cache) if args.cache else None)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    
+    zone = None
+    if args.incident_id:
+        try:
+            incident = requests.get(f"{args.backend}/api/incidents/{args.incident_id}", timeout=5).json()
+            zone = incident.get("zone")
+        except Exception as e:
+            print(f"Could not fetch incident zone, scanning all cameras equally: {e}")
+    
+    posted = set()
+    posted_lock = threading.Lock()  # model workers call on_detection concurrently
+    def on_detection(camera_id, index, confidence):
+        with posted_lock:
+            if not args.incident_id or camera_id in posted:
+                return
+            posted.add(camera_id)
+        try:
+            response = requests.post(
+                f"{args.backend}/incident/{args.incident_id}/cctv_match",
+                json={"camera_id": camera_id, "confidence": float(confidence),
+                      "frame_ts": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                timeout=10
+            )
+            print(f"CCTV match from {camera_id} posted: {response.status_code}")
+        except Exception as e:
+            print(f"Error posting CCTV match from {camera_id}: {e}")
+    
+    scheduler = MultiCameraScheduler(simulator, cameras, batch_size=args.batch_size, model_workers=args.workers,
+                                     target_fps=args.target_fps, motion_sensitivity=args.motion,
+                                     on_detection=on_detection)
+    if zone:
+        scheduler.focus(zone=zone)
+        print(f"Prioritizing cameras in zone {zone}")
+    print(f"Scanning {len(cameras)} cameras with {args.workers} model worker(s)...")
+    try:
+        stats = scheduler.run(args.duration)
+    except KeyboardInterrupt:
+        scheduler.stop.set()
+        stats = scheduler.stats()
+    print(f"Aggregate: {stats['aggregate_fps']} FPS, {stats['frames_inferred']} frames in {stats['elapsed_s']}s")
+    for camera_id, cam in stats["cameras"].items():
+        best = f"best {cam['best']['confidence']:.2f}" if cam["best"] else "no match"
+        print(f"  {camera_id:>12} (x{cam['weight']}): {cam['frames_inferred']} frames, "
+              f"lag mean {cam['queue_lag_ms_mean']} ms / max {cam['queue_lag_ms_max']} ms, {best}")
+
+
 def main():
     parser = argparse.ArgumentParser(description='CCTV Simulation with YOLOv8')
     parser.add_argument('--model', required=True, help='Path to trained YOLOv8 model (.pt file)')
@@ -144,6 +1227,28 @@ def main():
     parser.add_argument('--backend', default='http://localhost:8000', help='Backend URL')
     parser.add_argument('--delay', type=int, default=5, help='Delay before processing (seconds)')
     parser.add_argument('--conf', type=float, default=0.5, help='Confidence threshold')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Sampled frames per inference call')
+    parser.add_argument('--bench', action='store_true', help='Benchmark FPS at several batch sizes and exit')
+    parser.add_argument('--bench-sizes', default='1,2,4,8,16', help='Comma-separated batch sizes for --bench')
+    parser.add_argument('--bench-pipeline', action='store_true', help='Benchmark serial vs pipelined scanning and exit')
+    parser.add_argument('--workers', type=int, default=1, help='Inference workers for the pipelined scan')
+    parser.add_argument('--target-fps', type=float, help='Sample this many frames per second of video (default: every 10th frame)')
+    parser.add_argument('--bench-decode', action='store_true', help='Benchmark read-all vs grab vs seek sampling and exit')
+    parser.add_argument('--motion', type=float, nargs='?', const=MOTION_SENSITIVITY, default=None,
+                        help=f'Skip static frames; optional sensitivity = fraction of moving pixels (default {MOTION_SENSITIVITY})')
+    parser.add_argument('--runtime', choices=RUNTIMES, default='auto',
+                        help='Inference backend; onnx/openvino use the export_model.py output next to --model')
+    parser.add_argument('--track', action='store_true',
+                        help='Track children over the whole video and post one event per child instead of the first hit')
+    parser.add_argument('--full-scan', action='store_true',
+                        help='Scan the whole video into a detection timeline, checkpointing so it can resume')
+    parser.add_argument('--checkpoint', help='Checkpoint/result file for --full-scan (default: <video>.scan.json)')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing --full-scan checkpoint')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, default=None,
+                        help=f'Reuse detections for footage scanned before (default file {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--camera-id', default='CAM_GATE_3', help='Camera id reported with matches for --video')
+    parser.add_argument('--cameras', help='cameras.json registry: scan every camera concurrently with one shared model')
+    parser.add_argument('--duration', type=float, help='Stop a --cameras run after this many seconds (live streams)')
     
     args = parser.parse_args()
     
@@ -152,6 +1257,10 @@ def main():
         print(f"Error: Model file {args.model} not found!")
         sys.exit(1)
     
+    if args.cameras:
+        run_multi_camera(args)
+        return
+    
     # Use sample video if not provided
     video_path = args.video
     if not video_path:
@@ -167,7 +1276,60 @@ def main():
         sys.exit(1)
     
     # Create simulator
-    simulator = CCTVSIMULATOR(args.model, args.backend)
+    try:
+        simulator = CCTVSIMULATOR(args.model, args.backend, args.runtime,
+                                  DetectionCache(args.cache) if args.cache else None)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    
+    if args.bench_decode:
+        cap = cv2.VideoCapture(str(video_path))
+        fps = container_fps(cap)
+        cap.release()
+        step = sampling_step(fps, target_fps=args.target_fps)
+        print(f"Decode cost sampling every {step} frames of {video_path} ({fps:.1f} FPS container)")
+        for row in CCTVSIMULATOR.benchmark_sampling(video_path, step):
+            print(f"  {row['mode']:>8}: {row['seconds']:.3f}s for {row['sampled']} sampled frames")
+        return
+    
+    if args.bench_pipeline:
+        print(f"Benchmarking serial vs pipelined scan on {video_path}")
+        for row in simulator.benchmark_pipeline(video_path, args.conf, batch_size=args.batch_size,
+                                                inference_workers=args.workers):
+            print(f"  {row['mode']:>9}: {row['fps']:>7.2f} FPS over {row['frames']} sampled frames")
+            for stage, t in row.get("stages", {}).items():
+                print(f"      {stage:>9}: busy {t['busy_s']}s, blocked {t['blocked_s']}s, starved {t['starved_s']}s")
+        return
+    
+    if args.full_scan:
+        def report(p):
+            eta = f", ETA {p['eta_s'] // 60}m{p['eta_s'] % 60:02d}s" if p["eta_s"] is not None else ""
+            done = f" ({p['percent']}%)" if p["percent"] is not None else ""
+            print(f"  {p['position_s']}s{done}: {p['analysed_fps']} FPS, {p['realtime_factor']}x real time{eta}")
+        
+        print(f"Full scan of {video_path}")
+        try:
+            result = simulator.full_scan(video_path, args.checkpoint, args.conf, args.target_fps or 2,
+                                         args.batch_size, motion_sensitivity=args.motion, resume=not args.restart,
+                                         on_progress=report)
+        except KeyboardInterrupt:
+            print("\nInterrupted; run the same command again to resume from the checkpoint")
+            return
+        if result is None:
+            sys.exit(1)
+        print(f"Scanned {result['frames_analysed']} frames in {result['elapsed_s']}s, "
+              f"{len(result['timeline'])} hits in {len(result['segments'])} segments:")
+        for seg in result["segments"]:
+            print(f"  {seg['start_s']:>9.1f}s - {seg['end_s']:>9.1f}s  best {seg['best_confidence']:.2f} at {seg['best_s']}s")
+        return
+    
+    if args.bench:
+        sizes = [int(x) for x in args.bench_sizes.split(',') if x.strip()]
+        print(f"Benchmarking batched inference on {video_path}")
+        for row in simulator.benchmark_batch_sizes(video_path, sizes, conf_threshold=args.conf):
+            print(f"  batch {row['batch_size']:>3}: {row['fps']:>7.2f} FPS  ({row['ms_per_frame']:.2f} ms/frame)")
+        return
     
     # Get incident ID
     incident_id = args.incident_id
@@ -197,7 +1359,8 @@ def main():
     print(f"Confidence threshold: {args.conf}")
     
     thread = simulator.simulate_cctv_processing(
-        video_path, incident_id, args.delay, args.conf
+        video_path, incident_id, args.delay, args.conf, args.batch_size, args.target_fps, args.motion,
+        args.camera_id, args.track
     )
     
     print("CCTV simulation started. Press Ctrl+C to exit.")
@@ -0,0 +1,165 @@
+"""
+Persistent detection cache for CCTV scans
+Detections are stored per (video content hash, model weights hash, conf,
+imgsz) scope and frame index in SQLite, so a second incident pointing at the
+same footage skips both decoding and inference for frames already analysed.
+Total size is bounded; the least recently used rows are evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np # type: ignore
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "detection_cache.sqlite")
+MAX_BYTES = 256 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+HASH_SAMPLES = 16   # chunks hashed across a large file instead of reading all of it
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    scope TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    boxes BLOB NOT NULL,
+    confs BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (scope, frame)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS detections_used ON detections (used);
+"""
+
+
+def content_hash(path):
+    """blake2b over the file size and HASH_SAMPLES evenly spaced 1 MB chunks (whole file if small).
+
+    Sampled chunks plus the size identify footage without reading gigabytes
+    per scan. A directory (OpenVINO model) hashes each file in it.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            h.update(name.encode())
+            h.update(content_hash(os.path.join(path, name)).encode())
+        return h.hexdigest()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= HASH_CHUNK * HASH_SAMPLES:
+            h.update(f.read())
+        else:
+            stride = (size - HASH_CHUNK) // (HASH_SAMPLES - 1)
+            for i in range(HASH_SAMPLES):
+                f.seek(i * stride)
+                h.update(f.read(HASH_CHUNK))
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """Thread-safe; load() and put_many() are one SQL statement per scan/batch."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM detections").fetchone()[0]
+        self._hashes = {}   # (path, size, mtime) -> content hash
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def file_hash(self, path):
+        path = os.path.abspath(str(path))
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            cached = self._hashes.get(key)
+        if cached is None:
+            cached = content_hash(path)
+            with self.lock:
+                self._hashes[key] = cached
+        return cached
+
+    def scope(self, video_path, model_path, conf, imgsz):
+        """Cache namespace for one (footage, weights, conf, imgsz) combination."""
+        return f"{self.file_hash(video_path)}:{self.file_hash(model_path)}:{conf:g}:{imgsz or 0}"
+
+    def load(self, scope):
+        """{frame: (boxes (N, 4) float32, confs (N,) float32)} for every cached frame in scope."""
+        with self.lock:
+            rows = self.db.execute("SELECT frame, boxes, confs FROM detections WHERE scope = ?", (scope,)).fetchall()
+            if rows:
+                self.db.execute("UPDATE detections SET used = ? WHERE scope = ?", (time.time(), scope))
+        return {frame: (np.frombuffer(boxes, np.float32).reshape(-1, 4), np.frombuffer(confs, np.float32))
+                for frame, boxes, confs in rows}
+
+    def put_many(self, scope, items):
+        """items: [(frame, boxes, confs)]; evicts least recently used rows past max_bytes."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for frame, boxes, confs in items:
+            b = np.ascontiguousarray(boxes, np.float32).tobytes()
+            c = np.ascontiguousarray(confs, np.float32).tobytes()
+            rows.append((scope, int(frame), b, c, len(b) + len(c) + 32, now))
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                # Replacing a row must not double count its size
+                old = self.db.execute(
+                    f"SELECT COALESCE(SUM(bytes), 0) FROM detections WHERE scope = ? AND frame IN "
+                    f"({','.join('?' * len(rows))})", (scope, *[r[1] for r in rows])).fetchone()[0]
+                self.db.executemany("INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self.total_bytes += sum(r[4] for r in rows) - old
+                self.stored += len(rows)
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        """Drop the oldest rows until 90% of max_bytes; called under the lock in a transaction."""
+        target = self.max_bytes * 0.9
+        while self.total_bytes > target:
+            victims = self.db.execute("SELECT scope, frame, bytes FROM detections ORDER BY used LIMIT 512").fetchall()
+            if not victims:
+                self.total_bytes = 0
+                return
+            freed, keys = 0, []
+            for scope, frame, size in victims:
+                if self.total_bytes - freed <= target:
+                    break
+                keys.append((scope, frame))
+                freed += size
+            self.db.executemany("DELETE FROM detections WHERE scope = ? AND frame = ?", keys)
+            self.total_bytes -= freed
+            self.evicted += len(keys)
+
+    def record(self, hits=0, misses=0):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "stored": self.stored,
+                "evicted": self.evicted,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
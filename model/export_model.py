@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Export the child detector for CPU inference
+Exports best.pt to ONNX (and optionally OpenVINO), applies static INT8
+quantization calibrated on data/train/images, and gates every quantized model
+on its mAP over data/valid against the FP32 PyTorch model. Models that lose
+more than --max-map-drop are kept as *.rejected so cctv_simulation.py never
+picks them up.
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2 # type: ignore
+import numpy as np # type: ignore
+import yaml # type: ignore
+from ultralytics import YOLO # type: ignore
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_IMGSZ = 640
+MAX_MAP50_DROP = 0.02
+CALIBRATION_IMAGES = 64
+EVAL_BATCH = 8  # cctv_simulation.DEFAULT_BATCH_SIZE: gate models at the batch size they will serve
+FORMATS = ("onnx", "onnx-int8", "openvino", "openvino-int8")
+
+
+def letterbox(image, imgsz=DEFAULT_IMGSZ):
+    """Ultralytics-style preprocessing: resize keeping aspect, pad to imgsz with 114, RGB, NCHW float32 0..1."""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * scale), round(w * scale)
+    resized = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = resized
+    return canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def calibration_images(directory, limit=CALIBRATION_IMAGES):
+    paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(directory, f"*.{ext}")))
+    return paths[:limit]
+
+
+def dataset_yaml(data_dir, val_split="valid"):
+    """Write a data.yaml with absolute paths (the Roboflow one uses ../ paths) and return its path."""
+    with open(data_dir / "data.yaml") as f:
+        config = yaml.safe_load(f)
+    resolved = {
+        "train": str((data_dir / "train" / "images").resolve()),
+        "val": str((data_dir / val_split / "images").resolve()),
+        "nc": config["nc"],
+        "names": config["names"],
+    }
+    fd, path = tempfile.mkstemp(prefix=f"child-{val_split}-", suffix=".yaml")
+    with os.fdopen(fd, "w") as f:
+        yaml.safe_dump(resolved, f)
+    return path
+
+
+def export_onnx(weights, imgsz=DEFAULT_IMGSZ):
+    """FP32 ONNX with a dynamic batch axis so cctv_simulation can keep batching."""
+    return YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+
+def quantize_onnx_int8(onnx_path, calib_dir, imgsz=DEFAULT_IMGSZ, limit=CALIBRATION_IMAGES):
+    """Static (QDQ) INT8 quantization calibrated on real frames; the Detect head stays FP32."""
+    import onnx # type: ignore
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, # type: ignore
+                                          QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process # type: ignore
+
+    images = calibration_images(calib_dir, limit)
+    if not images:
+        raise FileNotFoundError(f"No calibration images in {calib_dir}")
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            return None if path is None else {self.input_name: letterbox(cv2.imread(path), imgsz)}
+
+    src = str(onnx_path)
+    prepared = src.replace(".onnx", "-prep.onnx")
+    quant_pre_process(src, prepared)
+    graph = onnx.load(prepared).graph
+    # Box decoding in the last module (Detect) is very sensitive to INT8 rounding
+    modules = [int(n.name.split("/")[1][len("model."):]) for n in graph.node
+               if n.name.startswith("/model.") and n.name.split("/")[1][len("model."):].isdigit()]
+    head = f"/model.{max(modules)}/" if modules else None
+    exclude = [n.name for n in graph.node if head and n.name.startswith(head)]
+
+    out = src.replace(".onnx", "-int8.onnx")
+    quantize_static(prepared, out, Reader(graph.input[0].name), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+                    calibrate_method=CalibrationMethod.MinMax, nodes_to_exclude=exclude)
+    os.remove(prepared)
+    print(f"Quantized {len(graph.node) - len(exclude)} nodes on {len(images)} images (head {head} kept FP32)")
+    return out
+
+
+def export_openvino(weights, imgsz=DEFAULT_IMGSZ, int8=False):
+    """OpenVINO IR with a dynamic batch axis; INT8 goes through NNCF, calibrated on the train split."""
+    if not int8:
+        return YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=True)
+    # Ultralytics calibrates on the data's val split, so point val at the train images
+    calib_yaml = dataset_yaml(DATA_DIR, val_split="train")
+    try:
+        return YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=True, int8=True, data=calib_yaml)
+    finally:
+        os.remove(calib_yaml)
+
+
+def evaluate(model_path, data_yaml, imgsz=DEFAULT_IMGSZ):
+    """mAP on the valid split plus model load time."""
+    started = time.perf_counter()
+    model = YOLO(str(model_path), task="detect")
+    load_s = time.perf_counter() - started
+    metrics = model.val(data=data_yaml, split="val", imgsz=imgsz, batch=EVAL_BATCH, plots=False, verbose=False)
+    return {"map50": round(float(metrics.box.map50), 4), "map50_95": round(float(metrics.box.map), 4),
+            "load_s": round(load_s, 3), "inference_ms": round(metrics.speed["inference"], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and INT8-quantize the child detector for CPU inference')
+    parser.add_argument('--weights', default='runs/train/child_detection/weights/best.pt', help='Trained .pt model')
+    parser.add_argument('--formats', default='onnx,onnx-int8', help=f'Comma-separated: {", ".join(FORMATS)}')
+    parser.add_argument('--imgsz', type=int, default=DEFAULT_IMGSZ, help='Export/inference image size')
+    parser.add_argument('--calib-images', type=int, default=CALIBRATION_IMAGES, help='Train images used for calibration')
+    parser.add_argument('--max-map-drop', type=float, default=MAX_MAP50_DROP,
+                        help='Reject a quantized model whose mAP50 on valid drops more than this')
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        print(f"Error: unknown formats {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    if not os.path.exists(args.weights):
+        print(f"Error: Model file {args.weights} not found!")
+        sys.exit(1)
+
+    val_yaml = dataset_yaml(DATA_DIR)
+    report = {"weights": args.weights, "imgsz": args.imgsz, "max_map50_drop": args.max_map_drop, "models": {}}
+    try:
+        baseline = evaluate(args.weights, val_yaml, args.imgsz)
+        report["models"]["pytorch"] = {"path": args.weights, **baseline}
+        print(f"📏 PyTorch FP32: mAP50 {baseline['map50']}, {baseline['inference_ms']} ms/img, load {baseline['load_s']}s")
+
+        onnx_path = None
+        rejected = False
+        for fmt in formats:
+            if fmt.startswith("onnx") and onnx_path is None:
+                onnx_path = export_onnx(args.weights, args.imgsz)
+            if fmt == "onnx":
+                path = onnx_path
+            elif fmt == "onnx-int8":
+                path = quantize_onnx_int8(onnx_path, DATA_DIR / "train" / "images", args.imgsz, args.calib_images)
+            else:
+                path = export_openvino(args.weights, args.imgsz, int8=fmt.endswith("int8"))
+
+            result = {"path": str(path), **evaluate(path, val_yaml, args.imgsz)}
+            result["map50_drop"] = round(baseline["map50"] - result["map50"], 4)
+            result["speedup"] = (round(baseline["inference_ms"] / result["inference_ms"], 2)
+                                 if result["inference_ms"] else None)
+            if fmt.endswith("int8"):
+                result["accepted"] = result["map50_drop"] <= args.max_map_drop
+                if not result["accepted"]:
+                    rejected_path = f"{path}.rejected"
+                    shutil.move(str(path), rejected_path)
+                    result["path"] = rejected_path
+                    rejected = True
+            report["models"][fmt] = result
+            status = "" if "accepted" not in result else (" ✅ accepted" if result["accepted"] else " ❌ rejected")
+            print(f"📦 {fmt}: mAP50 {result['map50']} (drop {result['map50_drop']}), "
+                  f"{result['inference_ms']} ms/img ({result['speedup']}x), load {result['load_s']}s{status}")
+    finally:
+        os.remove(val_yaml)
+
+    report_path = Path(args.weights).with_name("export_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+    if rejected:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
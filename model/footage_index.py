@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Offline footage detection index
+A background indexer runs the detector over every camera's recordings ahead of
+time and stores one row per (camera, second) with detections: best confidence
+and box count. Incidents then ask "any child at cameras X, Y between T1 and
+T2?" as a primary-key range scan instead of re-running YOLO on the footage.
+Recordings are listed per camera in cameras.json:
+{"CAM_GATE_3": {"zone": "Main gate", "recordings": "recordings/gate3/*.mp4", ...}, ...}
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "footage_index.sqlite")
+INDEX_FPS = 2             # sampled frames per second of footage
+POLL_INTERVAL_SECONDS = 60
+BUCKET_SECONDS = 1.0
+# 20240131-142500, 20240131_142500 or 20240131T142500 anywhere in the file name
+_STAMP = re.compile(r"(\d{8})[-_T]?(\d{6})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hits (
+    camera TEXT NOT NULL,
+    t INTEGER NOT NULL,            -- bucket start, epoch seconds
+    confidence REAL NOT NULL,
+    boxes INTEGER NOT NULL,
+    recording INTEGER NOT NULL,
+    offset_s REAL NOT NULL,        -- where the best frame is in the recording
+    PRIMARY KEY (camera, t)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hits_recording ON hits (recording);
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    camera TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    start REAL,
+    duration_s REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    camera TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    PRIMARY KEY (camera, start)
+) WITHOUT ROWID;
+"""
+
+
+def recording_start(path, duration_s=None):
+    """Wall-clock start of a recording: a timestamp in its name, else mtime minus its duration."""
+    match = _STAMP.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime("".join(match.groups()), "%Y%m%d%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path) - (duration_s or 0.0)
+
+
+def _merge_spans(spans, t0, t1):
+    """Clip start-sorted (start, end) spans to [t0, t1] and merge overlaps, so shared seconds count once."""
+    merged = []
+    for start, end in spans:
+        start, end = max(start, t0), min(end, t1)
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class FootageIndex:
+    """SQLite index shared by the indexer process and the backend (WAL: readers never block the writer)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def needs_indexing(self, path):
+        st = os.stat(path)
+        with self.lock:
+            row = self.db.execute("SELECT size, mtime, indexed_at FROM recordings WHERE path = ?",
+                                  (os.path.abspath(path),)).fetchone()
+        return row is None or row[2] is None or row[0] != st.st_size or row[1] != st.st_mtime
+
+    def add_recording(self, camera, path, start, duration_s, timeline):
+        """Replace a recording's hits with its scan timeline ([{"t_s", "confidence", "detections"}])."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        buckets = {}
+        for hit in timeline:
+            t = int((start + hit["t_s"]) // BUCKET_SECONDS * BUCKET_SECONDS)
+            best = buckets.get(t)
+            if best is None:
+                buckets[t] = (hit["confidence"], hit["detections"], hit["t_s"])
+            elif hit["confidence"] > best[0]:
+                buckets[t] = (hit["confidence"], max(hit["detections"], best[1]), hit["t_s"])
+            else:
+                buckets[t] = (best[0], max(hit["detections"], best[1]), best[2])
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                old = self.db.execute("SELECT id FROM recordings WHERE path = ?", (path,)).fetchone()
+                if old is not None:
+                    self.db.execute("DELETE FROM hits WHERE recording = ?", (old[0],))
+                    self.db.execute("DELETE FROM recordings WHERE id = ?", (old[0],))
+                rec = self.db.execute(
+                    "INSERT INTO recordings (path, camera, size, mtime, start, duration_s, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, camera, st.st_size, st.st_mtime, start, duration_s, time.time())).lastrowid
+                self.db.executemany("INSERT OR REPLACE INTO hits VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(camera, t, c, n, rec, off) for t, (c, n, off) in buckets.items()])
+                if duration_s:
+                    self.db.execute("INSERT OR REPLACE INTO coverage VALUES (?, ?, ?)",
+                                    (camera, start, start + duration_s))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return len(buckets)
+
+    def query(self, cameras=None, t0=None, t1=None, min_conf=0.0, limit=1000):
+        """Hits for `cameras` (all if None) with t0 <= t <= t1, plus per-camera summaries.
+
+        "covered_s" says how much of [t0, t1] the indexer has already scanned
+        for each camera, so "no hits" can be told apart from "not indexed yet".
+        """
+        started = time.perf_counter()
+        t0 = -1e18 if t0 is None else t0
+        t1 = 1e18 if t1 is None else t1
+        with self.lock:
+            if cameras is None:
+                cameras = [r[0] for r in self.db.execute("SELECT DISTINCT camera FROM recordings")]
+            hits, summary = [], {}
+            for camera in cameras:
+                rows = self.db.execute(
+                    "SELECT t, confidence, boxes, path, offset_s FROM hits JOIN recordings ON recordings.id = recording "
+                    "WHERE hits.camera = ? AND t >= ? AND t <= ? AND confidence >= ? ORDER BY t LIMIT ?",
+                    (camera, t0, t1, min_conf, limit)).fetchall()
+                spans = self.db.execute("SELECT start, end FROM coverage WHERE camera = ? AND end >= ? AND start <= ? "
+                                        "ORDER BY start", (camera, t0, t1)).fetchall()
+                covered = sum(end - start for start, end in _merge_spans(spans, t0, t1))
+                for t, conf, boxes, path, offset in rows:
+                    hits.append({"camera_id": camera, "t": t, "confidence": conf, "boxes": boxes,
+                                 "recording": path, "offset_s": offset})
+                best = max(rows, key=lambda r: r[1]) if rows else None
+                summary[camera] = {
+                    "hits": len(rows),
+                    "first": rows[0][0] if rows else None,
+                    "last": rows[-1][0] if rows else None,
+                    "best": {"t": best[0], "confidence": best[1]} if best else None,
+                    "covered_s": round(covered, 1) if spans else 0.0,
+                }
+        hits.sort(key=lambda h: (h["t"], h["camera_id"]))
+        return {"hits": hits[:limit], "cameras": summary,
+                "query_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def stats(self):
+        with self.lock:
+            recordings, indexed, seconds = self.db.execute(
+                "SELECT COUNT(*), COUNT(indexed_at), COALESCE(SUM(duration_s), 0) FROM recordings").fetchone()
+            hits = self.db.execute("SELECT COUNT(*) FROM hits").fetchone()[0]
+        return {"recordings": recordings, "indexed": indexed, "footage_hours": round(seconds / 3600, 2),
+                "hit_buckets": hits}
+
+
+class FootageIndexer:
+    """Background job: scans every camera's new or changed recordings with full_scan() and indexes them."""
+
+    def __init__(self, simulator, cameras, index, target_fps=INDEX_FPS, conf_threshold=0.5,
+                 poll_interval=POLL_INTERVAL_SECONDS, checkpoint_dir=None):
+        self.simulator = simulator
+        self.cameras = cameras
+        self.index = index
+        self.target_fps = target_fps
+        self.conf_threshold = conf_threshold
+        self.poll_interval = poll_interval
+        self.checkpoint_dir = checkpoint_dir or os.path.join(os.path.dirname(index.path), "footage_checkpoints")
+        self.stop = threading.Event()
+        self.indexed = 0
+        self.current = None
+        self._thread = None
+
+    def pending(self):
+        """(camera_id, path) for recordings not indexed yet, oldest first per camera, cameras interleaved."""
+        queues = []
+        for camera_id, camera in self.cameras.items():
+            pattern = camera.get("recordings")
+            if not pattern:
+                continue
+            paths = sorted(glob.glob(pattern), key=os.path.getmtime)
+            queues.append([(camera_id, p) for p in paths if self.index.needs_indexing(p)])
+        out = []
+        while any(queues):
+            for q in queues:
+                if q:
+                    out.append(q.pop(0))
+        return out
+
+    def index_recording(self, camera_id, path):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        checkpoint = os.path.join(self.checkpoint_dir, f"{camera_id}-{os.path.basename(path)}.scan.json")
+        self.current = path
+        conf = self.cameras[camera_id].get("conf", self.conf_threshold)
+        result = self.simulator.full_scan(path, checkpoint, conf, self.target_fps, stop=self.stop)
+        self.current = None
+        if result is None or not result.get("complete"):
+            return None  # unreadable, or stopped: the checkpoint resumes it next time
+        duration = (result.get("progress") or {}).get("duration_s")
+        start = recording_start(path, duration)
+        buckets = self.index.add_recording(camera_id, path, start, duration, result["timeline"])
+        os.remove(checkpoint)
+        self.indexed += 1
+        print(f"🗂️ Indexed {camera_id} {os.path.basename(path)}: {buckets} seconds with detections")
+        return buckets
+
+    def run_once(self):
+        for camera_id, path in self.pending():
+            if self.stop.is_set():
+                break
+            try:
+                self.index_recording(camera_id, path)
+            except Exception as e:
+                print(f"Indexing {path} failed: {e}")
+
+    def run(self):
+        while not self.stop.is_set():
+            self.run_once()
+            self.stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="FootageIndexer", daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+def _parse_time(value):
+    """Epoch seconds or ISO 8601 (local time) -> epoch seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index recorded CCTV footage ahead of incidents, or query the index')
+    parser.add_argument('--index', default=DEFAULT_PATH, help='Index database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='Index every camera\'s recordings, then keep polling for new ones')
+    run.add_argument('--model', required=True, help='Path to trained YOLOv8 model')
+    run.add_argument('--cameras', required=True, help='cameras.json with a "recordings" glob per camera')
+    run.add_argument('--target-fps', type=float, default=INDEX_FPS, help='Frames analysed per second of footage')
+    run.add_argument('--conf', type=float, default=0.5, help='Confidence threshold')
+    run.add_argument('--runtime', default='auto', help='Inference backend (see cctv_simulation.py --runtime)')
+    run.add_argument('--once', action='store_true', help='Index what is there and exit')
+    query = sub.add_parser('query', help='Detections at some cameras in a time range')
+    query.add_argument('--cameras', help='Comma-separated camera ids (default: all)')
+    query.add_argument('--from', dest='t0', help='Start (epoch seconds or ISO time)')
+    query.add_argument('--to', dest='t1', help='End (epoch seconds or ISO time)')
+    query.add_argument('--min-conf', type=float, default=0.0, help='Minimum confidence')
+    args = parser.parse_args()
+
+    index = FootageIndex(args.index)
+    if args.command == 'query':
+        result = index.query(args.cameras.split(',') if args.cameras else None,
+                             _parse_time(args.t0) if args.t0 else None, _parse_time(args.t1) if args.t1 else None,
+                             args.min_conf)
+        print(json.dumps(result, indent=2))
+        return
+
+    from cctv_simulation import CCTVSIMULATOR, load_camera_registry
+    from detection_cache import DetectionCache
+    try:
+        simulator = CCTVSIMULATOR(args.model, runtime=args.runtime, cache=DetectionCache())
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    indexer = FootageIndexer(simulator, load_camera_registry(args.cameras), index, args.target_fps, args.conf)
+    print(f"Indexing footage into {args.index} at {args.target_fps} FPS...")
+    try:
+        if args.once:
+            indexer.run_once()
+        else:
+            indexer.run()
+    except KeyboardInterrupt:
+        indexer.stop.set()
+        print("\nStopped; partially scanned recordings resume from their checkpoints")
+    print(json.dumps(index.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Lightweight multi-object tracker for CCTV detections
+SORT/ByteTrack-style: constant-velocity box prediction, IoU association done
+as one NumPy matrix per frame, and a second association pass that lets
+low-confidence boxes keep an existing track alive (ByteTrack) without ever
+starting a new one. A track that is not seen for max_age seconds is closed and
+becomes one event with entry/exit times and its best frame.
+"""
+
+import itertools
+
+import numpy as np # type: ignore
+
+IOU_THRESHOLD = 0.3
+MAX_AGE_SECONDS = 2.0
+MIN_HITS = 2
+HIGH_CONF = 0.5
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def greedy_match(iou, threshold):
+    """Highest-IoU-first assignment; returns [(row, col)] with iou >= threshold."""
+    if iou.size == 0:
+        return []
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, c))
+    return pairs
+
+
+class Track:
+    __slots__ = ("id", "box", "velocity", "last_ts", "entry_ts", "entry_frame", "exit_frame", "hits",
+                 "best_conf", "best_frame", "best_ts", "best_box")
+
+    def __init__(self, track_id, box, conf, frame_index, ts):
+        self.id = track_id
+        self.box = box.astype(np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)  # box change per second
+        self.last_ts = ts
+        self.entry_ts = ts
+        self.entry_frame = frame_index
+        self.exit_frame = frame_index
+        self.hits = 1
+        self.best_conf = float(conf)
+        self.best_frame = frame_index
+        self.best_ts = ts
+        self.best_box = self.box.copy()
+
+    def predict(self, ts):
+        return self.box + self.velocity * (ts - self.last_ts)
+
+    def update(self, box, conf, frame_index, ts):
+        dt = ts - self.last_ts
+        if dt > 0:
+            # alpha-beta smoothing stands in for SORT's Kalman filter
+            self.velocity = 0.5 * self.velocity + 0.5 * (box - self.box) / dt
+        self.box = box.astype(np.float32)
+        self.last_ts = ts
+        self.exit_frame = frame_index
+        self.hits += 1
+        if conf > self.best_conf:
+            self.best_conf = float(conf)
+            self.best_frame = frame_index
+            self.best_ts = ts
+            self.best_box = self.box.copy()
+
+    def as_event(self):
+        return {
+            "track_id": self.id,
+            "entry_s": round(self.entry_ts, 3),
+            "exit_s": round(self.last_ts, 3),
+            "duration_s": round(self.last_ts - self.entry_ts, 3),
+            "entry_frame": self.entry_frame,
+            "exit_frame": self.exit_frame,
+            "hits": self.hits,
+            "best_confidence": round(self.best_conf, 4),
+            "best_frame": self.best_frame,
+            "best_s": round(self.best_ts, 3),
+            "best_box": [round(float(v), 1) for v in self.best_box],
+        }
+
+
+class SortTracker:
+    """update() once per analysed frame (in frame order); it returns tracks that just closed."""
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_age=MAX_AGE_SECONDS, min_hits=MIN_HITS,
+                 high_conf=HIGH_CONF):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.high_conf = high_conf
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self.frames = 0
+        self.detections = 0
+        self.events = 0
+        self.dropped = 0   # tracks closed with fewer than min_hits (flicker)
+
+    def update(self, frame_index, ts, boxes, confs):
+        """boxes: (N, 4) xyxy, confs: (N,), ts: seconds into the video."""
+        self.frames += 1
+        self.detections += len(boxes)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+        high = confs >= self.high_conf
+
+        predicted = np.array([t.predict(ts) for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        unmatched_tracks = list(range(len(self.tracks)))
+        for mask, may_start in ((high, True), (~high, False)):
+            det_idx = np.nonzero(mask)[0]
+            pairs = greedy_match(iou_matrix(predicted[unmatched_tracks], boxes[det_idx]), self.iou_threshold)
+            matched = set()
+            for r, c in pairs:
+                d = det_idx[c]
+                self.tracks[unmatched_tracks[r]].update(boxes[d], confs[d], frame_index, ts)
+                matched.add(r)
+            new_dets = [det_idx[c] for c in set(range(len(det_idx))) - {c for _, c in pairs}] if may_start else []
+            unmatched_tracks = [t for r, t in enumerate(unmatched_tracks) if r not in matched]
+            for d in sorted(new_dets):
+                self.tracks.append(Track(next(self._ids), boxes[d], confs[d], frame_index, ts))
+        return self._expire(ts)
+
+    def _expire(self, ts):
+        closed, alive = [], []
+        for track in self.tracks:
+            (closed if ts - track.last_ts > self.max_age else alive).append(track)
+        self.tracks = alive
+        return self._events(closed)
+
+    def flush(self):
+        """Close every open track (end of video)."""
+        closed, self.tracks = self.tracks, []
+        return self._events(closed)
+
+    def _events(self, closed):
+        events = []
+        for track in closed:
+            if track.hits >= self.min_hits:
+                events.append(track.as_event())
+            else:
+                self.dropped += 1
+        self.events += len(events)
+        return events
+
+    def stats(self):
+        return {"frames": self.frames, "detections": self.detections, "open_tracks": len(self.tracks),
+                "events": self.events, "dropped_tracks": self.dropped}
@@ -0,0 +1,367 @@
+"""
+Notification fan-out
+Alerts are handed to Notifier.submit() (an in-memory append, so request threads
+never wait), expanded into one notification per channel and recipient, and
+stored in a SQLite outbox in one transaction per batch. Each channel has its own
+pool of worker threads that claim batches from the outbox, deliver them, and
+retry failures with exponential backoff until max_attempts.
+"""
+
+import json
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import urllib.request
+from collections import deque
+from email.message import EmailMessage
+
+RETRY_BACKOFF_INITIAL = 2.0
+RETRY_BACKOFF_MAX = 300.0
+LATENCY_SAMPLES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    next_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (channel, state, next_at);
+"""
+
+
+def format_alert(alert):
+    device = alert.get("device") or "tag"
+    return (f"Tiny Traces alert #{alert.get('id')}: {device} {alert.get('note') or alert.get('status')}",
+            f"{alert.get('ts')}: {device} is {alert.get('alert_state') or alert.get('status')} "
+            f"(RSSI {alert.get('rssi')} dBm). Source: {alert.get('source')}.")
+
+
+# ---------------- Channels ----------------
+
+class Channel:
+    """Base channel. `contact` names the contact field a notification is addressed to
+    (e.g. "phone"); None sends one notification per alert with no recipient."""
+
+    contact = None
+
+    def __init__(self, name, concurrency=2, batch_size=20, max_attempts=5, timeout=10.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def notifications(self, alert, contacts):
+        subject, body = format_alert(alert)
+        base = {"alert_id": alert.get("id"), "device": alert.get("device"), "subject": subject, "body": body}
+        if self.contact is None:
+            return [{**base, "to": None, "alert": alert}]
+        seen = set()
+        out = []
+        for c in contacts:
+            to = c.get(self.contact)
+            if to and to not in seen:
+                seen.add(to)
+                out.append({**base, "to": to, "name": c.get("name")})
+        return out
+
+    def send(self, batch):
+        """Deliver a list of notifications; raise to retry the whole batch."""
+        raise NotImplementedError
+
+
+class StubChannel(Channel):
+    """Local sink for tests and development; can inject latency and failures."""
+
+    def __init__(self, name="stub", contact=None, latency=0.0, fail_every=0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.contact = contact
+        self.latency = latency
+        self.fail_every = fail_every
+        self.sent = deque(maxlen=1000)
+        self.calls = 0
+
+    def send(self, batch):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError("stub failure")
+        self.sent.extend(batch)
+
+
+def _post_json(url, payload, timeout, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), headers=headers, method="POST")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        if resp.status >= 300:
+            raise RuntimeError(f"HTTP {resp.status}")
+
+
+class WebhookChannel(Channel):
+    """POSTs {"alerts": [...]} with the whole batch in one request."""
+
+    def __init__(self, name, url, token=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.token = token
+
+    def send(self, batch):
+        _post_json(self.url, {"alerts": [n["alert"] for n in batch]}, self.timeout, self.token)
+
+
+class SMSChannel(Channel):
+    """HTTP SMS gateway taking {"messages": [{"to": .., "body": ..}]} in one request."""
+
+    contact = "phone"
+
+    def __init__(self, name, url, token=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.token = token
+
+    def send(self, batch):
+        _post_json(self.url, {"messages": [{"to": n["to"], "body": n["body"]} for n in batch]},
+                   self.timeout, self.token)
+
+
+class EmailChannel(Channel):
+    """SMTP; one connection per batch."""
+
+    contact = "email"
+
+    def __init__(self, name, host, port=587, sender="alerts@tinytraces.local", username=None, password=None,
+                 starttls=True, **kwargs):
+        super().__init__(name, **kwargs)
+        self.host, self.port, self.sender = host, port, sender
+        self.username, self.password, self.starttls = username, password, starttls
+
+    def send(self, batch):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for n in batch:
+                msg = EmailMessage()
+                msg["From"], msg["To"], msg["Subject"] = self.sender, n["to"], n["subject"]
+                msg.set_content(n["body"])
+                smtp.send_message(msg)
+
+
+CHANNEL_TYPES = {"stub": StubChannel, "webhook": WebhookChannel, "sms": SMSChannel, "email": EmailChannel}
+
+
+def make_channels(config):
+    """{"name": {"type": "sms", "url": ..., "concurrency": 4}, ...} -> [Channel]"""
+    channels = []
+    for name, spec in config.items():
+        spec = dict(spec)
+        kind = spec.pop("type", name)
+        if kind not in CHANNEL_TYPES:
+            raise ValueError(f"unknown channel type {kind!r}; choose from {', '.join(CHANNEL_TYPES)}")
+        channels.append(CHANNEL_TYPES[kind](name=name, **spec))
+    return channels
+
+
+# ---------------- Dispatcher ----------------
+
+class _ChannelMetrics:
+    """Counters for one channel; its worker threads update them under self.lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead = 0
+        self.inflight = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.send_seconds = 0.0
+
+    def as_dict(self, uptime):
+        with self.lock:
+            return self._as_dict(uptime)
+
+    def _as_dict(self, uptime):
+        lat = sorted(self.latencies)
+        pick = (lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1)) if lat else (lambda q: None)
+        return {
+            "sent": self.sent,
+            "batches": self.batches,
+            "failed_attempts": self.failures,
+            "dead": self.dead,
+            "inflight": self.inflight,
+            "throughput_per_s": round(self.sent / uptime, 3) if uptime > 0 else 0.0,
+            "mean_send_ms": round(self.send_seconds / self.batches * 1000, 1) if self.batches else None,
+            "latency_p50_ms": pick(0.5),
+            "latency_p95_ms": pick(0.95),
+            "latency_max_ms": round(lat[-1] * 1000, 1) if lat else None,
+        }
+
+
+class Notifier:
+    def __init__(self, path, channels, resolve_contacts=None, poll_interval=1.0):
+        self.path = path
+        self.channels = {c.name: c for c in channels}
+        self.resolve_contacts = resolve_contacts or (lambda device: [])
+        self.poll_interval = poll_interval
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        # Anything claimed before a crash is delivered again (at-least-once)
+        self.db.execute("UPDATE outbox SET state = 'pending' WHERE state = 'inflight'")
+        self.db_lock = threading.Lock()
+        self.incoming = deque()
+        self._incoming_ready = threading.Event()
+        self._due = {name: threading.Event() for name in self.channels}
+        self.metrics = {name: _ChannelMetrics() for name in self.channels}
+        self.submitted = 0
+        self._submitted_lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self._threads = []
+
+    def submit(self, alert):
+        """Queue an alert for fan-out; O(1), never touches the disk."""
+        self.incoming.append((time.time(), alert))
+        with self._submitted_lock:
+            self.submitted += 1
+        self._incoming_ready.set()
+
+    def start(self):
+        if self._threads:
+            return
+        self._spawn(self._ingest_loop, "NotifierIngest")
+        for name, channel in self.channels.items():
+            for i in range(channel.concurrency):
+                self._spawn(lambda c=channel: self._channel_loop(c), f"Notifier-{name}-{i}")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _ingest_loop(self):
+        while True:
+            self._incoming_ready.wait()
+            self._incoming_ready.clear()
+            try:
+                self.ingest_pending()
+            except Exception as e:
+                print(f"Notifier ingest failed: {e}")
+
+    def ingest_pending(self):
+        """Expand queued alerts into outbox rows, one transaction for the whole batch."""
+        rows, contacts_cache = [], {}
+        while self.incoming:
+            created, alert = self.incoming.popleft()
+            device = alert.get("device")
+            if device not in contacts_cache:
+                contacts_cache[device] = self.resolve_contacts(device)
+            for channel in self.channels.values():
+                for n in channel.notifications(alert, contacts_cache[device]):
+                    rows.append((channel.name, json.dumps(n), created, created))
+        if not rows:
+            return 0
+        with self.db_lock:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany("INSERT INTO outbox (channel, payload, created, next_at) VALUES (?, ?, ?, ?)", rows)
+        for name in {r[0] for r in rows}:
+            self._due[name].set()
+        return len(rows)
+
+    def _claim(self, channel):
+        now = time.time()
+        with self.db_lock:
+            with self.db:
+                self.db.execute("BEGIN IMMEDIATE")
+                rows = self.db.execute(
+                    "SELECT id, payload, created, attempts FROM outbox WHERE channel = ? AND state = 'pending' "
+                    "AND next_at <= ? ORDER BY next_at LIMIT ?", (channel.name, now, channel.batch_size)).fetchall()
+                if rows:
+                    self.db.executemany("UPDATE outbox SET state = 'inflight' WHERE id = ?", [(r[0],) for r in rows])
+        return rows
+
+    def _channel_loop(self, channel):
+        due = self._due[channel.name]
+        while True:
+            try:
+                rows = self._claim(channel)
+            except Exception as e:
+                print(f"Notifier claim failed ({channel.name}): {e}")
+                rows = []
+            if not rows:
+                due.wait(self.poll_interval)
+                due.clear()
+                continue
+            if len(rows) == channel.batch_size:
+                due.set()  # more may be waiting; let an idle worker take the next batch
+            self._deliver(channel, rows)
+
+    def _deliver(self, channel, rows):
+        m = self.metrics[channel.name]
+        with m.lock:
+            m.inflight += len(rows)
+        started = time.perf_counter()
+        try:
+            channel.send([json.loads(r[1]) for r in rows])
+        except Exception as e:
+            with m.lock:
+                m.inflight -= len(rows)
+                m.failures += 1
+            self._retry(channel, rows, str(e))
+            return
+        finally:
+            with m.lock:
+                m.batches += 1
+                m.send_seconds += time.perf_counter() - started
+        now = time.time()
+        with m.lock:
+            m.inflight -= len(rows)
+            m.sent += len(rows)
+            m.latencies.extend(now - r[2] for r in rows)
+        with self.db_lock:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany("DELETE FROM outbox WHERE id = ?", [(r[0],) for r in rows])
+
+    def _retry(self, channel, rows, error):
+        now, updates, dead = time.time(), [], 0
+        for row_id, _, _, attempts in rows:
+            attempts += 1
+            if attempts >= channel.max_attempts:
+                updates.append(("dead", now, attempts, error, row_id))
+                dead += 1
+            else:
+                delay = min(RETRY_BACKOFF_INITIAL * 2 ** (attempts - 1), RETRY_BACKOFF_MAX)
+                updates.append(("pending", now + delay * random.uniform(0.8, 1.2), attempts, error, row_id))
+        m = self.metrics[channel.name]
+        with m.lock:
+            m.dead += dead
+        with self.db_lock:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany("UPDATE outbox SET state = ?, next_at = ?, attempts = ?, error = ? WHERE id = ?",
+                                    updates)
+
+    def stats(self):
+        with self.db_lock:
+            counts = self.db.execute("SELECT channel, state, COUNT(*) FROM outbox GROUP BY channel, state").fetchall()
+        uptime = time.monotonic() - self.started_at
+        channels = {name: {**m.as_dict(uptime), "pending": 0, "dead_stored": 0} for name, m in self.metrics.items()}
+        for name, state, count in counts:
+            if name in channels:
+                channels[name]["pending" if state != "dead" else "dead_stored"] += count
+        with self._submitted_lock:
+            submitted = self.submitted
+        return {"submitted": submitted, "incoming": len(self.incoming), "channels": channels}
@@ -1,26 +1,518 @@
 import asyncio
-from ble_scanner import RSSIStream 
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from ble_scanner import RSSIStream
 
 class MissingChildIdentification(Exception):
     pass
 
+def batch_ranks(idx, num_tags):
+    """Group a batch of row indices by tag, preserving arrival order.
+
+    Returns (order, sorted_idx, rank, group_tags, group_sizes) where rank is the
+    position of each sorted reading within its tag (0, 1, 2...).
+    """
+    # Stable sorts of 16-bit keys use radix sort, ~10x faster than int64.
+    keys = idx.astype(np.uint16) if num_tags <= 0xFFFF else idx
+    order = np.argsort(keys, kind="stable")
+    sorted_idx = idx[order]
+    starts = np.flatnonzero(np.r_[True, sorted_idx[1:] != sorted_idx[:-1]])
+    group_sizes = np.diff(np.r_[starts, sorted_idx.size])
+    rank = np.arange(sorted_idx.size) - np.repeat(starts, group_sizes)
+    return order, sorted_idx, rank, sorted_idx[starts], group_sizes
+
+
+class _TagFilter:
+    """Base for per-tag recursive filters; state is one array slot per tag."""
+
+    name = "none"
+
+    def __init__(self, capacity=1):
+        self.state = np.full(capacity, np.nan)
+
+    def resize(self, capacity):
+        old = self.state
+        self.state = np.full(capacity, np.nan)
+        self.state[:len(old)] = old
+
+    def update_indices(self, idx, values, ranks=None):
+        """Feed a batch; multiple readings for one tag are applied in order."""
+        idx = np.asarray(idx, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if idx.size == 0:
+            return
+        if ranks is None:
+            order, sorted_idx, rank, _, _ = batch_ranks(idx, len(self.state))
+        else:
+            order, sorted_idx, rank = ranks
+        # Regroup by rank: round r holds each tag's r-th reading, so every round
+        # touches a tag at most once and is a plain vector step
+        by_round = np.argsort(rank.astype(np.uint16) if rank.max() <= 0xFFFF else rank, kind="stable")
+        rows = sorted_idx[by_round]
+        round_values = values[order][by_round]
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            self._step(rows[lo:hi], round_values[lo:hi])
+
+    def _step(self, rows, values):
+        raise NotImplementedError
+
+    def values(self, n=None):
+        return self.state[:n]
+
+
+class EMAFilter(_TagFilter):
+    """Exponential moving average: s = s + alpha * (x - s)."""
+
+    name = "ema"
+
+    def __init__(self, alpha=0.3, capacity=1):
+        super().__init__(capacity)
+        self.alpha = alpha
+
+    def _step(self, rows, values):
+        prev = self.state[rows]
+        self.state[rows] = np.where(np.isnan(prev), values, prev + self.alpha * (values - prev))
+
+
+class KalmanFilter(_TagFilter):
+    """1-D random-walk Kalman filter per tag.
+
+    process_noise (q) is how fast the true RSSI may drift per reading and
+    measurement_noise (r) is the per-advertisement variance in dBm^2.
+    """
+
+    name = "kalman"
+
+    def __init__(self, process_noise=0.5, measurement_noise=16.0, capacity=1):
+        super().__init__(capacity)
+        self.q = process_noise
+        self.r = measurement_noise
+        self.variance = np.full(capacity, np.nan)
+
+    def resize(self, capacity):
+        old = self.variance
+        super().resize(capacity)
+        self.variance = np.full(capacity, np.nan)
+        self.variance[:len(old)] = old
+
+    def _step(self, rows, values):
+        x = self.state[rows]
+        p = self.variance[rows]
+        fresh = np.isnan(x)
+        p = np.where(fresh, self.r, p + self.q)
+        gain = p / (p + self.r)
+        x = np.where(fresh, values, x + gain * (values - x))
+        p = np.where(fresh, self.r, (1.0 - gain) * p)
+        self.state[rows] = x
+        self.variance[rows] = p
+
+
+FILTERS = {"ema": EMAFilter, "kalman": KalmanFilter}
+
+
+def make_filter(spec, capacity=1):
+    """Build a filter from a name ("ema", "kalman"), an instance, or None."""
+    if spec is None or spec == "none":
+        return None
+    if isinstance(spec, _TagFilter):
+        spec.resize(max(capacity, len(spec.state)))
+        return spec
+    return FILTERS[spec](capacity=capacity)
+
+
+class PathLossModel:
+    """Log-distance path loss: rssi = tx_power - 10 * n * log10(d).
+
+    tx_power is the RSSI measured at 1 m, n the path-loss exponent (2 in free
+    space, 2.5-4 indoors) and sigma the shadowing std-dev in dB, which sets the
+    confidence band (k sigma, ~68% for k=1).
+    """
+
+    def __init__(self, tx_power=-59.0, exponent=2.0, sigma=4.0, k=1.0):
+        self.tx_power = tx_power
+        self.exponent = exponent
+        self.sigma = sigma
+        self.k = k
+
+    @classmethod
+    def calibrate(cls, distances_m, rssi, k=1.0):
+        """Least-squares fit of tx_power and exponent from (distance, RSSI) samples."""
+        x = -10.0 * np.log10(np.asarray(distances_m, dtype=np.float64))
+        y = np.asarray(rssi, dtype=np.float64)
+        exponent, tx_power = np.polyfit(x, y, 1)
+        residuals = y - (tx_power + exponent * x)
+        sigma = float(np.std(residuals, ddof=2)) if y.size > 2 else 0.0
+        return cls(tx_power=float(tx_power), exponent=float(exponent), sigma=sigma, k=k)
+
+    def distance(self, rssi):
+        """Estimated distance in metres (vectorized)."""
+        rssi = np.asarray(rssi, dtype=np.float64)
+        return 10.0 ** ((self.tx_power - rssi) / (10.0 * self.exponent))
+
+    def distance_band(self, rssi):
+        """(estimate, low, high) in metres; a stronger signal than expected means closer."""
+        rssi = np.asarray(rssi, dtype=np.float64)
+        margin = self.k * self.sigma
+        return self.distance(rssi), self.distance(rssi + margin), self.distance(rssi - margin)
+
+    def as_dict(self):
+        return {"tx_power": self.tx_power, "exponent": self.exponent, "sigma": self.sigma, "k": self.k}
+
+
+# Alert states
+SAFE, SUSPECT, OUT_OF_RANGE, RECOVERED = 0, 1, 2, 3
+STATE_NAMES = ("safe", "suspect", "out_of_range", "recovered")
+
+
+class AlertStateMachine:
+    """Per-tag hysteresis / debounce state machine for out-of-range alerts.
+
+        safe -> suspect        signal drops below enter_threshold
+        suspect -> safe        signal climbs back above exit_threshold
+        suspect -> out_of_range  below enter_threshold for suspect_dwell seconds
+        out_of_range -> recovered  above exit_threshold for recover_dwell seconds
+        recovered -> suspect   signal drops below enter_threshold again
+        recovered -> safe      not below enter_threshold for recovered_dwell seconds
+
+    A tag not heard for signal_lost_after seconds counts as below the threshold.
+    step() returns only the transitions, so each alert fires exactly once.
+    """
+
+    def __init__(self, enter_threshold=-80, exit_threshold=-75, suspect_dwell=3.0,
+                 recover_dwell=5.0, recovered_dwell=10.0, signal_lost_after=15.0, capacity=1):
+        if exit_threshold < enter_threshold:
+            raise ValueError("exit_threshold must be >= enter_threshold")
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.signal_lost_after = signal_lost_after
+        self.dwell = np.array([0.0, suspect_dwell, recover_dwell, recovered_dwell])
+        self.target = np.array([SUSPECT, OUT_OF_RANGE, RECOVERED, SAFE], dtype=np.int8)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.pending = np.full(capacity, np.nan)
+        self.episodes = np.zeros(capacity, dtype=np.int64)
+
+    def resize(self, capacity):
+        n = len(self.state)
+        state, pending, episodes = self.state, self.pending, self.episodes
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.pending = np.full(capacity, np.nan)
+        self.episodes = np.zeros(capacity, dtype=np.int64)
+        self.state[:n], self.pending[:n], self.episodes[:n] = state, pending, episodes
+
+    def _conditions(self, state, below, above):
+        # What must hold (for its dwell time) to leave each state
+        return np.select(
+            [state == SAFE, state == SUSPECT, state == OUT_OF_RANGE],
+            [below, below, above],
+            default=~below,
+        )
+
+    def step(self, values, now, last_seen=None):
+        """Advance every tag; returns (rows, old_states, new_states) of the tags that changed."""
+        n = len(values)
+        values = np.asarray(values, dtype=np.float64)
+        state = self.state[:n]
+        heard = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            below = values < self.enter_threshold
+            above = values > self.exit_threshold
+        if last_seen is not None and self.signal_lost_after:
+            lost = heard & (now - last_seen[:n] > self.signal_lost_after)
+            below |= lost
+            above &= ~lost
+
+        cond = self._conditions(state, below, above) & heard
+        pending = np.where(cond, np.where(np.isnan(self.pending[:n]), now, self.pending[:n]), np.nan)
+        with np.errstate(invalid="ignore"):
+            fire = cond & (now - pending >= self.dwell[state])
+        new_state = np.where(fire, self.target[state], state).astype(np.int8)
+        # Immediate cancels back across the hysteresis band
+        new_state[(state == SUSPECT) & above & heard] = SAFE
+        new_state[(state == RECOVERED) & below & heard] = SUSPECT
+
+        changed = np.flatnonzero(new_state != state)
+        if changed.size:
+            # The next state's timer starts now if its condition already holds
+            next_cond = self._conditions(new_state[changed], below[changed], above[changed])
+            pending[changed] = np.where(next_cond, now, np.nan)
+            entered = changed[new_state[changed] == OUT_OF_RANGE]
+            self.episodes[entered] += 1
+        old = state[changed].copy()
+        self.state[:n] = new_state
+        self.pending[:n] = pending
+        return changed, old, new_state[changed]
+
+
 class RSSIAnalyzer:
-    def __init__(self, threshold=-80, window_size=10):
+    def __init__(self, threshold=-80, window_size=10, filter=None, path_loss=None,
+                 exit_threshold=None, suspect_dwell=3.0, recover_dwell=5.0,
+                 recovered_dwell=10.0, signal_lost_after=15.0):
         self.threshold = threshold
         self.window_size = window_size
-        self.rssi_history = []
+        self.rssi_history = deque(maxlen=window_size)
+        self._sum = 0.0
+        self.filter = make_filter(filter)
+        self.path_loss = path_loss
+        self.machine = AlertStateMachine(
+            enter_threshold=threshold,
+            exit_threshold=threshold + 5 if exit_threshold is None else exit_threshold,
+            suspect_dwell=suspect_dwell,
+            recover_dwell=recover_dwell,
+            recovered_dwell=recovered_dwell,
+            signal_lost_after=signal_lost_after,
+        )
+        self.last_seen = np.full(1, np.nan)
+
+    @property
+    def state(self):
+        """Alert state name: safe | suspect | out_of_range | recovered."""
+        return STATE_NAMES[self.machine.state[0]]
+
+    @property
+    def episode(self):
+        """Number of times this tag has gone out of range (the current alert episode)."""
+        return int(self.machine.episodes[0])
+
+    @property
+    def average(self):
+        """Moving average over the current window, or None before the first reading."""
+        if not self.rssi_history:
+            return None
+        return self._sum / len(self.rssi_history)
+
+    @property
+    def filtered(self):
+        """Smoothed RSSI from the configured filter (falls back to the moving average)."""
+        if self.filter is None:
+            return self.average
+        value = self.filter.state[0]
+        return None if np.isnan(value) else float(value)
 
-    def analyze(self, rssi):
+    def distance(self):
+        """Estimated distance {distance_m, distance_low_m, distance_high_m}, or None."""
+        rssi = self.filtered
+        if self.path_loss is None or rssi is None:
+            return None
+        d, lo, hi = self.path_loss.distance_band(rssi)
+        return {"distance_m": round(float(d), 2), "distance_low_m": round(float(lo), 2), "distance_high_m": round(float(hi), 2)}
+
+    def analyze(self, rssi, now=None):
+        """Feed one reading and advance the alert state machine.
+
+        Returns the alert state name. MissingChildIdentification is raised once,
+        on the transition into out_of_range, not on every low reading.
+        """
+        now = time.monotonic() if now is None else now
+        if len(self.rssi_history) == self.window_size:
+            self._sum -= self.rssi_history[0]
         self.rssi_history.append(rssi)
-        if len(self.rssi_history) > self.window_size:
-            self.rssi_history.pop(0)
+        self._sum += rssi
+        if self.filter is not None:
+            self.filter.update_indices([0], [rssi])
+        self.last_seen[0] = now
+        return self.tick(now)
 
-        avg_rssi = sum(self.rssi_history) / len(self.rssi_history)
+    def tick(self, now=None):
+        """Advance the state machine without a new reading (detects a silent tag)."""
+        now = time.monotonic() if now is None else now
+        value = self.filtered
+        values = np.array([np.nan if value is None else value])
+        changed, old, new = self.machine.step(values, now, self.last_seen)
+        if changed.size:
+            if new[0] == OUT_OF_RANGE:
+                raise MissingChildIdentification("🚨 Child possibly out of range!")
+            elif new[0] in (SAFE, RECOVERED):
+                print(f"✅ Safe zone ({STATE_NAMES[new[0]]})\n")
+            else:
+                print(f"⚠️ Signal weak, watching ({STATE_NAMES[old[0]]} -> {STATE_NAMES[new[0]]})")
+        return self.state
 
-        if avg_rssi < self.threshold:
-            raise MissingChildIdentification("🚨 Child possibly out of range!")
-        else:
-            print("✅ Safe zone\n")
+
+class MultiTagRSSIAnalyzer:
+    """Moving-average analyzer for many tags at once.
+
+    Readings live in a (tags x window) ring-buffer matrix with a running sum per
+    tag, so a batch update and the threshold check are a handful of vectorized
+    NumPy operations regardless of how many tags are tracked. RSSI values are
+    whole dBm, so float64 running sums stay exact and never need re-summing.
+
+    With a filter ("ema", "kalman") the threshold is checked against the
+    smoothed value, which reacts per reading instead of after a full window.
+    Pass an AlertStateMachine as `alerts` to get debounced transitions from
+    step_alerts() instead of a raw below-threshold mask.
+    """
+
+    def __init__(self, threshold=-80, window_size=10, capacity=1024, filter=None, path_loss=None, alerts=None):
+        self.threshold = threshold
+        self.window_size = window_size
+        self.tag_index = {}
+        self.tags = []
+        self.filter = make_filter(filter, capacity)
+        self.path_loss = path_loss
+        self.alerts = alerts
+        self._alloc(capacity)
+        if alerts is not None:
+            alerts.resize(capacity)
+
+    def _alloc(self, capacity):
+        self.buffer = np.zeros((capacity, self.window_size), dtype=np.float64)
+        self.sums = np.zeros(capacity, dtype=np.float64)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.heads = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.full(capacity, np.nan)
+
+    def _grow(self, needed):
+        capacity = len(self.sums)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        old = (self.buffer, self.sums, self.counts, self.heads, self.last_seen)
+        self._alloc(new_capacity)
+        self.buffer[:capacity] = old[0]
+        self.sums[:capacity] = old[1]
+        self.counts[:capacity] = old[2]
+        self.heads[:capacity] = old[3]
+        self.last_seen[:capacity] = old[4]
+        if self.filter is not None:
+            self.filter.resize(new_capacity)
+        if self.alerts is not None:
+            self.alerts.resize(new_capacity)
+
+    @property
+    def num_tags(self):
+        return len(self.tags)
+
+    def register(self, tag):
+        """Return the row index for tag, allocating a row the first time it is seen."""
+        idx = self.tag_index.get(tag)
+        if idx is None:
+            idx = len(self.tags)
+            self._grow(idx + 1)
+            self.tag_index[tag] = idx
+            self.tags.append(tag)
+        return idx
+
+    def indices(self, tags):
+        """Map a sequence of tag keys to row indices (registering unknown tags)."""
+        return np.fromiter(
+            (self.register(t) for t in tags),
+            dtype=np.int64,
+            count=len(tags),
+        )
+
+    def update(self, tags, rssi, now=None):
+        """Add a batch of readings keyed by tag name/address."""
+        return self.update_indices(self.indices(tags), rssi, now)
+
+    def update_indices(self, idx, rssi, now=None):
+        """Add a batch of readings for already-registered rows.
+
+        Readings for the same tag are applied in batch order, exactly as if they
+        had been fed one at a time.
+        """
+        idx = np.asarray(idx, dtype=np.int64)
+        rssi = np.asarray(rssi, dtype=np.float64)
+        if idx.size == 0:
+            return
+        w = self.window_size
+
+        order, sorted_idx, rank, group_tags, group_sizes = batch_ranks(idx, self.num_tags)
+        per_reading_size = np.repeat(group_sizes, group_sizes)
+
+        # Only the last `window` readings of a tag in this batch can survive;
+        # reading number r of a tag lands in slot (head + r) % window
+        keep = rank >= per_reading_size - w
+        rows = sorted_idx[keep]
+        values = rssi[order][keep]
+        slots = (self.heads[rows] + rank[keep]) % w
+
+        old = self.buffer[rows, slots]
+        self.buffer[rows, slots] = values
+        # Slots never written hold 0, so subtracting `old` is correct while filling
+        n = self.num_tags
+        self.sums[:n] += np.bincount(rows, weights=values - old, minlength=n)
+
+        self.heads[group_tags] = (self.heads[group_tags] + group_sizes) % w
+        self.counts[group_tags] = np.minimum(self.counts[group_tags] + group_sizes, w)
+
+        self.last_seen[group_tags] = time.monotonic() if now is None else now
+        if self.filter is not None:
+            self.filter.update_indices(idx, rssi, ranks=(order, sorted_idx, rank))
+
+    def averages(self):
+        """Moving average per registered tag (NaN for tags without readings)."""
+        n = self.num_tags
+        counts = self.counts[:n]
+        out = np.full(n, np.nan)
+        np.divide(self.sums[:n], counts, out=out, where=counts > 0)
+        return out
+
+    def filtered(self):
+        """Smoothed RSSI per tag (the moving average when no filter is configured)."""
+        if self.filter is None:
+            return self.averages()
+        return self.filter.values(self.num_tags)
+
+    def distances(self):
+        """(estimate, low, high) distance arrays in metres, from the smoothed RSSI."""
+        if self.path_loss is None:
+            raise ValueError("no path_loss model configured")
+        return self.path_loss.distance_band(self.filtered())
+
+    def evaluate(self):
+        """Boolean mask of tags whose smoothed RSSI is below the threshold."""
+        values = self.filtered()
+        with np.errstate(invalid="ignore"):
+            return values < self.threshold
+
+    def step_alerts(self, now=None):
+        """Advance the alert state machine for every tag; returns transition events."""
+        if self.alerts is None:
+            raise ValueError("no AlertStateMachine configured")
+        now = time.monotonic() if now is None else now
+        rows, old, new = self.alerts.step(self.filtered(), now, self.last_seen)
+        return [
+            {
+                "tag": self.tags[r],
+                "from": STATE_NAMES[o],
+                "to": STATE_NAMES[t],
+                "episode": int(self.alerts.episodes[r]),
+                "alert": bool(t == OUT_OF_RANGE),
+            }
+            for r, o, t in zip(rows.tolist(), old.tolist(), new.tolist())
+        ]
+
+    def out_of_range(self):
+        """Tag keys currently below the threshold."""
+        return [self.tags[i] for i in np.flatnonzero(self.evaluate())]
+
+    def average(self, tag):
+        idx = self.tag_index.get(tag)
+        if idx is None or self.counts[idx] == 0:
+            return None
+        return float(self.sums[idx] / self.counts[idx])
+
+
+def benchmark_multi_tag(num_tags=10000, batch_size=10000, batches=200, window_size=10, seed=0, filter=None):
+    """Time update_indices() + evaluate() on random batches; returns mean ms per batch."""
+    rng = np.random.default_rng(seed)
+    analyzer = MultiTagRSSIAnalyzer(window_size=window_size, capacity=num_tags, filter=filter)
+    for i in range(num_tags):
+        analyzer.register(f"tag-{i}")
+    idx = rng.integers(0, num_tags, size=(batches, batch_size))
+    rssi = rng.integers(-100, -40, size=(batches, batch_size))
+
+    start = time.perf_counter()
+    for b in range(batches):
+        analyzer.update_indices(idx[b], rssi[b])
+        analyzer.evaluate()
+    elapsed = time.perf_counter() - start
+    return elapsed / batches * 1000.0
 
 
 async def main():
@@ -40,4 +532,10 @@ def handle_rssi(rssi, analyzer):
         print(e)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if "--bench" in sys.argv:
+        for filter_name in (None, "ema", "kalman"):
+            for batch_size in (100, 1000, 10000):
+                ms = benchmark_multi_tag(batch_size=batch_size, filter=filter_name)
+                print(f"10k tags, filter={filter_name}, batch of {batch_size}: {ms:.3f} ms/batch")
+    else:
+        asyncio.run(main())
@@ -0,0 +1,238 @@
+"""
+Per-tag RSSI time-series store
+Fixed-memory history for each tag: a raw ring buffer plus 10s / 1m / 10m
+min/avg/max rollups, with optional persistence to a single .npz file.
+"""
+
+import os
+import threading
+import time
+from urllib.parse import unquote
+
+import numpy as np
+
+# Rollup resolutions (seconds) and how many buckets each keeps per tag
+ROLLUPS = {"10s": 10, "1m": 60, "10m": 600}
+# raw is the last 3600 readings (1h only for a 1 Hz tag); rollups keep 6h, 48h and 14d
+DEFAULT_CAPACITY = {"raw": 3600, "10s": 2160, "1m": 2880, "10m": 2016}
+
+
+class _Ring:
+    """Fixed-capacity columnar ring buffer, appended in time order."""
+
+    def __init__(self, capacity, fields):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in fields}
+        self.head = 0   # next write position
+        self.count = 0
+
+    def append(self, **values):
+        for name, value in values.items():
+            self.columns[name][self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _segments(self):
+        """Chronological (start, stop) slices of the underlying arrays."""
+        if self.count < self.capacity:
+            return [(0, self.count)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def query(self, t0, t1):
+        """Columns for rows with t0 <= ts <= t1; binary search per segment, O(log n + k)."""
+        ts = self.columns["ts"]
+        picks = []
+        for lo, hi in self._segments():
+            a = lo + np.searchsorted(ts[lo:hi], t0, side="left")
+            b = lo + np.searchsorted(ts[lo:hi], t1, side="right")
+            if b > a:
+                picks.append((a, b))
+        return {
+            name: np.concatenate([col[a:b] for a, b in picks]) if picks else col[:0]
+            for name, col in self.columns.items()
+        }
+
+    def last_ts(self):
+        if self.count == 0:
+            return None
+        return float(self.columns["ts"][(self.head - 1) % self.capacity])
+
+
+RAW_FIELDS = [("ts", np.float64), ("rssi", np.float32)]
+ROLLUP_FIELDS = [("ts", np.float64), ("min", np.float32), ("max", np.float32), ("sum", np.float32), ("count", np.int32)]
+
+
+class TagHistory:
+    """Raw readings plus rollups for one tag; memory is fixed at construction."""
+
+    def __init__(self, capacity=None):
+        capacity = {**DEFAULT_CAPACITY, **(capacity or {})}
+        self.raw = _Ring(capacity["raw"], RAW_FIELDS)
+        self.rollups = {name: _Ring(capacity[name], ROLLUP_FIELDS) for name in ROLLUPS}
+        # Open (not yet closed) bucket per resolution: [start, min, max, sum, count]
+        self.open = {name: None for name in ROLLUPS}
+
+    def append(self, ts, rssi):
+        last = self.raw.last_ts()
+        if last is not None and ts < last:
+            ts = last  # keep rings sorted if a clock steps backwards
+        self.raw.append(ts=ts, rssi=rssi)
+        for name, width in ROLLUPS.items():
+            start = ts - ts % width
+            bucket = self.open[name]
+            if bucket is not None and bucket[0] != start:
+                self._close(name)
+                bucket = None
+            if bucket is None:
+                self.open[name] = [start, rssi, rssi, rssi, 1]
+            else:
+                bucket[1] = min(bucket[1], rssi)
+                bucket[2] = max(bucket[2], rssi)
+                bucket[3] += rssi
+                bucket[4] += 1
+
+    def _close(self, name):
+        start, lo, hi, total, count = self.open[name]
+        self.rollups[name].append(ts=start, min=lo, max=hi, sum=total, count=count)
+        self.open[name] = None
+
+    def query(self, t0, t1, resolution="raw"):
+        """Columnar points between t0 and t1 at the given resolution."""
+        if resolution == "raw":
+            cols = self.raw.query(t0, t1)
+            return {"resolution": "raw", "ts": cols["ts"].tolist(), "rssi": cols["rssi"].round(1).tolist()}
+        if resolution not in ROLLUPS:
+            raise ValueError(f"unknown resolution {resolution!r}")
+        cols = self.rollups[resolution].query(t0, t1)
+        ts, lo, hi, total, count = cols["ts"], cols["min"], cols["max"], cols["sum"], cols["count"]
+        bucket = self.open[resolution]
+        if bucket is not None and t0 <= bucket[0] <= t1:
+            ts = np.append(ts, bucket[0])
+            lo, hi = np.append(lo, bucket[1]), np.append(hi, bucket[2])
+            total, count = np.append(total, bucket[3]), np.append(count, bucket[4])
+        return {
+            "resolution": resolution,
+            "ts": ts.tolist(),
+            "min": lo.round(1).tolist(),
+            "avg": (total / np.maximum(count, 1)).round(1).tolist(),
+            "max": hi.round(1).tolist(),
+            "count": count.tolist(),
+        }
+
+
+def pick_resolution(t0, t1, max_points=500):
+    """Finest resolution that returns at most max_points for the span."""
+    span = max(t1 - t0, 0.0)
+    if span <= max_points:  # raw is ~1 reading per second or less after smoothing
+        return "raw"
+    for name, width in ROLLUPS.items():
+        if span / width <= max_points:
+            return name
+    return "10m"
+
+
+def _key_name(device):
+    """Device name safe to use in "device|ring|column" .npz keys."""
+    return device.replace("%", "%25").replace("|", "%7C")
+
+
+class RSSIHistoryStore:
+    """Thread-safe map of device -> TagHistory with optional .npz persistence."""
+
+    def __init__(self, path=None, capacity=None):
+        self.path = path
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.tags = {}
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Could not load RSSI history from {path}: {e}")
+
+    def append(self, device, rssi, ts=None):
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            history = self.tags.get(device)
+            if history is None:
+                history = self.tags[device] = TagHistory(self.capacity)
+            history.append(ts, rssi)
+
+    def query(self, device, t0=None, t1=None, resolution="auto"):
+        t1 = time.time() if t1 is None else t1
+        t0 = t1 - 600 if t0 is None else t0
+        if resolution == "auto":
+            resolution = pick_resolution(t0, t1)
+        with self.lock:
+            history = self.tags.get(device)
+            if history is None:
+                return None
+            result = history.query(t0, t1, resolution)
+        result.update({"device": device, "from": t0, "to": t1})
+        return result
+
+    def devices(self):
+        with self.lock:
+            return sorted(self.tags)
+
+    def save(self, path=None):
+        """Write every ring (and open buckets) to one .npz, replacing the old file atomically."""
+        path = path or self.path
+        arrays = {}
+        with self.lock:
+            for device, history in self.tags.items():
+                name = _key_name(device)
+                rings = {"raw": history.raw, **history.rollups}
+                for ring_name, ring in rings.items():
+                    prefix = f"{name}|{ring_name}|"
+                    for col, values in ring.columns.items():
+                        arrays[prefix + col] = values.copy()
+                    arrays[prefix + "_pos"] = np.array([ring.head, ring.count])
+                for rollup, bucket in history.open.items():
+                    if bucket is not None:
+                        arrays[f"{name}|{rollup}|_open"] = np.array(bucket, dtype=np.float64)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        tags = {}
+        with np.load(path) as data:
+            for key in data.files:
+                name, ring_name, col = key.split("|")
+                device = unquote(name)
+                history = tags.get(device)
+                if history is None:
+                    history = tags[device] = TagHistory(self.capacity)
+                if col == "_open":
+                    start, lo, hi, total, count = data[key].tolist()
+                    history.open[ring_name] = [start, lo, hi, total, int(count)]
+                    continue
+                ring = history.raw if ring_name == "raw" else history.rollups[ring_name]
+                if col == "_pos":
+                    ring.head, ring.count = (int(v) for v in data[key])
+                elif len(data[key]) == ring.capacity:
+                    ring.columns[col][:] = data[key]
+                else:
+                    raise ValueError(f"capacity of {device}/{ring_name} changed; not loading {path}")
+        with self.lock:
+            self.tags = tags
+
+    def start_autosave(self, interval=60.0):
+        """Persist to self.path every `interval` seconds from a daemon thread."""
+        if not self.path:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"RSSI history autosave failed: {e}")
+
+        thread = threading.Thread(target=loop, name="RSSIHistoryAutosave", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "model"))
+
+CHILD_FRAMES = range(40, 60)  # frames of the test video with a "child" (white square) in view
+
+
+def write_video(path, frames=100, fps=10.0, child_frames=CHILD_FRAMES):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        frame = np.full((48, 64, 3), 40, np.uint8)
+        if i in child_frames:
+            frame[10:30, 20 + (i % 5):36 + (i % 5)] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def small_video(tmp_path):
+    return write_video(tmp_path / "gate.avi")
+
+
+class _Array:
+    def __init__(self, values):
+        self.values = np.asarray(values, np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy, self.conf = _Array(xyxy), _Array(conf)
+
+    def __len__(self):
+        return len(self.conf.values)
+
+
+class FakeYOLO:
+    """Stands in for ultralytics.YOLO: one 0.9-confidence box around any white pixels."""
+
+    def __init__(self, path=None, task=None):
+        self.path = path
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, frames, conf=0.25, verbose=False):
+        self.calls.append(len(frames))
+        if self.fail:
+            raise RuntimeError("inference failed")
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame.max(axis=2) > 200)
+            if len(xs):
+                boxes = _Boxes([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], [0.9])
+            else:
+                boxes = _Boxes(np.zeros((0, 4)), np.zeros(0))
+            results.append(type("Result", (), {"boxes": boxes})())
+        return results
+
+
+@pytest.fixture
+def fake_yolo(monkeypatch):
+    import cctv_simulation
+    monkeypatch.setattr(cctv_simulation, "YOLO", FakeYOLO)
+    return FakeYOLO
+
+
+@pytest.fixture
+def simulator(fake_yolo, tmp_path):
+    import cctv_simulation
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"weights")
+    return cctv_simulation.CCTVSIMULATOR(str(weights))
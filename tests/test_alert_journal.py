@@ -0,0 +1,54 @@
+import pytest
+
+from alert_journal import AlertJournal
+
+
+def fill(journal, n, devices=("a", "b")):
+    return [journal.append({"device": devices[i % len(devices)], "note": str(i)}) for i in range(n)]
+
+
+def test_paging_across_segments_returns_every_alert_once(tmp_path):
+    journal = AlertJournal(str(tmp_path), max_bytes=300)
+    stored = fill(journal, 25)
+    journal.flush()
+    assert len(journal.segments) > 2
+    seen, cursor = [], None
+    while True:
+        page, cursor = journal.query(cursor=cursor, limit=4)
+        assert len(page) <= 4
+        seen += [a["id"] for a in page]
+        if cursor is None:
+            break
+    assert seen == [a["id"] for a in stored]
+
+
+def test_query_filters_device_and_time(tmp_path):
+    journal = AlertJournal(str(tmp_path))
+    stored = fill(journal, 10)
+    t0, t1 = stored[4]["epoch"], stored[8]["epoch"]
+    alerts, cursor = journal.query(device="b", t0=t0, t1=t1)
+    assert cursor is None
+    assert alerts == [a for a in stored if a["device"] == "b" and t0 <= a["epoch"] <= t1]
+
+
+def test_reload_keeps_ids(tmp_path):
+    journal = AlertJournal(str(tmp_path))
+    fill(journal, 3)
+    journal.close()
+    reopened = AlertJournal(str(tmp_path))
+    assert reopened.append({"device": "a"})["id"] == 4
+    assert len(reopened.query()[0]) == 4
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_non_positive_limit_is_rejected(tmp_path, limit):
+    journal = AlertJournal(str(tmp_path))
+    fill(journal, 2)
+    with pytest.raises(ValueError):
+        journal.query(limit=limit)
+
+
+def test_alerts_endpoint_rejects_zero_limit():
+    import flask_app
+    response = flask_app.app.test_client().get("/api/alerts?limit=0")
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+import flask_app
+from alert_journal import AlertJournal
+from alert_policy import AlertPolicy, TokenBucket
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+    assert [bucket.take(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0.0
+
+
+def test_policy_coalesces_repeats_and_limits_new_alerts():
+    policy = AlertPolicy(rate=0.001, burst=2)
+    created = []
+
+    def create():
+        created.append(len(created) + 1)
+        return {"id": created[-1]}
+
+    first = policy.submit(("a", 1), "web", create)
+    assert policy.submit(("a", 1), "web", create) == (first[0], True, 0.0)
+    policy.submit(("b", 1), "web", create)
+    alert, coalesced, retry_after = policy.submit(("c", 1), "web", create)
+    assert alert is None and retry_after > 0
+    assert created == [1, 2]
+    assert policy.stats()["rate_limited"] == 1
+
+
+def test_changing_source_does_not_bypass_rate_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(flask_app, "_ALERT_POLICY", AlertPolicy(rate=0.001, burst=1))
+    journal = AlertJournal(str(tmp_path))
+    monkeypatch.setattr(flask_app, "get_alert_journal", lambda: journal)
+    monkeypatch.setattr(flask_app, "get_notifier", lambda: SimpleNamespace(submit=lambda alert: None))
+    statuses = []
+    client = flask_app.app.test_client()
+    for i in range(3):
+        # distinct (server-side) episodes so nothing coalesces
+        monkeypatch.setattr(flask_app, "_rssi_state",
+                            lambda device=None, i=i: {**flask_app._RSSI_DEFAULTS, "alert_episode": 10_000 + i})
+        response = client.post("/api/alert", json={"source": f"spoof-{i}"})
+        statuses.append(response.status_code)
+    assert statuses[1:] == [429, 429]
+
+
+def test_client_episode_cannot_bypass_coalescing(monkeypatch, tmp_path):
+    monkeypatch.setattr(flask_app, "_ALERT_POLICY", AlertPolicy())
+    journal = AlertJournal(str(tmp_path))
+    monkeypatch.setattr(flask_app, "get_alert_journal", lambda: journal)
+    monkeypatch.setattr(flask_app, "get_notifier", lambda: SimpleNamespace(submit=lambda alert: None))
+    client = flask_app.app.test_client()
+    responses = [client.post("/api/alert", json={"episode": 20_000 + i}) for i in range(3)]
+    assert [r.status_code for r in responses] == [201, 200, 200]
+    assert len({r.get_json()["alert_id"] for r in responses}) == 1
+
+
+def test_monitor_alerts_are_never_rate_limited():
+    policy = AlertPolicy(rate=0.001, burst=1)
+    created = [policy.submit((f"Child-{i:02d}", 1), None, lambda i=i: {"id": i})[0] for i in range(10)]
+    assert [a["id"] for a in created] == list(range(10))
+    assert policy.submit(("Child-00", 1), None, lambda: None) == (created[0], True, 0.0)
+    assert policy.stats()["rate_limited"] == 0 and policy.stats()["sources"] == 0
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from rssi_analyzer import (OUT_OF_RANGE, RECOVERED, SAFE, SUSPECT, AlertStateMachine,
+                           MissingChildIdentification, RSSIAnalyzer)
+
+
+def run(machine, values, times):
+    states = []
+    for value, t in zip(values, times):
+        machine.step(np.array([value], dtype=float), t)
+        states.append(int(machine.state[0]))
+    return states
+
+
+def test_brief_dip_does_not_alert():
+    m = AlertStateMachine(enter_threshold=-80, exit_threshold=-75, suspect_dwell=3.0)
+    assert run(m, [-85, -85, -70], [0, 1, 2]) == [SUSPECT, SUSPECT, SAFE]
+    assert m.episodes[0] == 0
+
+
+def test_sustained_loss_alerts_once_then_recovers():
+    m = AlertStateMachine(enter_threshold=-80, exit_threshold=-75, suspect_dwell=3.0, recover_dwell=2.0,
+                          recovered_dwell=5.0)
+    states = run(m, [-85] * 6 + [-70] * 4 + [-70] * 6, list(range(16)))
+    assert states[:3] == [SUSPECT] * 3
+    assert states[3:6] == [OUT_OF_RANGE] * 3
+    assert RECOVERED in states and states[-1] == SAFE
+    assert m.episodes[0] == 1
+
+
+def test_values_inside_hysteresis_band_hold_state():
+    m = AlertStateMachine(enter_threshold=-80, exit_threshold=-75, suspect_dwell=1.0)
+    run(m, [-85, -85], [0, 1])
+    assert run(m, [-78, -78, -78], [2, 3, 4]) == [OUT_OF_RANGE] * 3
+
+
+def test_exit_below_enter_rejected():
+    with pytest.raises(ValueError):
+        AlertStateMachine(enter_threshold=-75, exit_threshold=-80)
+
+
+def test_analyzer_raises_only_on_transition():
+    analyzer = RSSIAnalyzer(threshold=-80, window_size=1, suspect_dwell=1.0)
+    analyzer.analyze(-90, now=0.0)
+    with pytest.raises(MissingChildIdentification):
+        analyzer.analyze(-90, now=1.5)
+    assert analyzer.analyze(-90, now=2.0) == "out_of_range"
+    assert analyzer.episode == 1
+
+
+def test_silent_tag_counts_as_lost():
+    analyzer = RSSIAnalyzer(threshold=-80, window_size=1, suspect_dwell=1.0, signal_lost_after=5.0)
+    analyzer.analyze(-60, now=0.0)
+    assert analyzer.tick(now=6.0) == "suspect"
+    with pytest.raises(MissingChildIdentification):
+        analyzer.tick(now=7.5)
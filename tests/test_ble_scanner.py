@@ -0,0 +1,103 @@
+import asyncio
+import time
+import types
+
+import ble_scanner
+from ble_scanner import ReadingDispatcher, RSSIStream, ScanStats
+
+
+def test_scan_stats_tracks_target_gaps():
+    stats = ScanStats()
+    stats.session_started()
+    for t in (stats.session_started_at + 0.5, stats.session_started_at + 1.5, stats.session_started_at + 4.5):
+        stats.advert(True, now=t)
+    stats.advert(False, now=stats.session_started_at + 5.0)
+    d = stats.as_dict()
+    assert d["target_adverts"] == 3
+    assert d["adverts_total"] == 4
+    assert d["first_detection_latency_s"] == 0.5
+    assert d["max_gap_s"] == 3.0
+    assert d["mean_gap_s"] == 2.0
+
+
+class FlakyScanner:
+    """Fails to start once, then scans without ever stopping on its own."""
+    starts = 0
+
+    def __init__(self, callback, **kwargs):
+        self.callback = callback
+
+    async def start(self):
+        FlakyScanner.starts += 1
+        if FlakyScanner.starts == 1:
+            raise OSError("adapter busy")
+
+    async def stop(self):
+        pass
+
+
+def test_continuous_mode_restarts_after_error(monkeypatch):
+    monkeypatch.setattr(ble_scanner, "RESTART_BACKOFF_INITIAL", 0.01)
+    FlakyScanner.starts = 0
+    stream = RSSIStream(scanner_factory=FlakyScanner, verbose=False, stall_timeout=0)
+
+    async def run():
+        try:
+            await asyncio.wait_for(stream.start_stream(), timeout=0.3)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert FlakyScanner.starts == 2
+    assert stream.stats.errors == 1
+    assert stream.stats.restarts == 1
+    assert "adapter busy" in stream.stats.last_error
+
+
+def test_target_readings_reach_subscribers():
+    stream = RSSIStream(verbose=False)
+    seen, batches = [], []
+    stream.subscribe(seen.append)
+    stream.subscribe_batch(batches.append)
+    stream.dispatcher.start()
+    try:
+        device = types.SimpleNamespace(name="Child-01", address="AA:BB")
+        other = types.SimpleNamespace(name="Phone", address="CC:DD")
+        stream.detection_callback(device, types.SimpleNamespace(rssi=-60, local_name="Child-01"))
+        stream.detection_callback(other, types.SimpleNamespace(rssi=-40, local_name="Phone"))
+    finally:
+        stream.dispatcher.stop(timeout=2)
+    assert seen == [-60]
+    assert [r[1:] for b in batches for r in b] == [("Child-01", "AA:BB", -60)]
+    assert stream.stats.target_adverts == 1
+
+
+def test_dispatcher_drops_oldest_when_full():
+    batches = []
+    dispatcher = ReadingDispatcher(batches.append, maxsize=3, batch_size=2)
+    for i in range(5):
+        dispatcher.put((time.monotonic(), i))
+    dispatcher.start()
+    dispatcher.stop(timeout=2.0)
+    assert [item for batch in batches for _, item in batch] == [2, 3, 4]
+    stats = dispatcher.stats()
+    assert stats["dropped"] == 2
+    assert stats["dispatched"] == 3
+    assert stats["batches"] == 2
+    assert stats["queue_max_depth"] == 3
+
+
+def test_dispatcher_survives_subscriber_errors():
+    seen = []
+
+    def handler(batch):
+        seen.extend(batch)
+        raise RuntimeError("boom")
+
+    dispatcher = ReadingDispatcher(handler, batch_size=1)
+    dispatcher.start()
+    dispatcher.put((time.monotonic(), "a"))
+    dispatcher.put((time.monotonic(), "b"))
+    dispatcher.stop(timeout=2.0)
+    assert len(seen) == 2
+    assert dispatcher.stats()["subscriber_errors"] == 2
@@ -0,0 +1,34 @@
+import time
+
+from cctv_simulation import FrameBatcher
+from conftest import CHILD_FRAMES
+
+
+def test_batcher_releases_full_batches_then_flushes_rest():
+    batcher = FrameBatcher(batch_size=3, max_latency=60)
+    ready = [batcher.add(i, None) for i in range(7)]
+    assert [b and [i for i, _ in b] for b in ready] == [None, None, [0, 1, 2], None, None, [3, 4, 5], None]
+    assert [i for i, _ in batcher.flush()] == [6]
+    assert batcher.flush() == []
+
+
+def test_batcher_releases_partial_batch_after_max_latency():
+    batcher = FrameBatcher(batch_size=8, max_latency=0.01)
+    assert batcher.add(0, None) is None
+    time.sleep(0.02)
+    assert [i for i, _ in batcher.add(1, None)] == [0, 1]
+
+
+def test_scan_batches_frames_and_reports_first_match(simulator, small_video):
+    result = simulator.scan_video(small_video, frame_step=5, max_frames=99, batch_size=4)
+    assert result["detected"]
+    assert result["frame_index"] == min(CHILD_FRAMES)
+    assert max(simulator.model.calls) == 4
+    assert result["batches"] == len(simulator.model.calls)
+
+
+def test_batch_size_one_matches_batched_scan(simulator, small_video):
+    batched = simulator.scan_video(small_video, frame_step=5, max_frames=99, batch_size=8, stop_on_match=False)
+    single = simulator.scan_video(small_video, frame_step=5, max_frames=99, batch_size=1, stop_on_match=False)
+    assert (batched["frame_index"], batched["frames_inferred"]) == (single["frame_index"], single["frames_inferred"])
+    assert single["batches"] == single["frames_inferred"] == 20
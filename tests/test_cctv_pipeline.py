@@ -0,0 +1,79 @@
+import queue
+import sqlite3
+import threading
+
+from cctv_simulation import _END, FrameReader
+
+
+def test_reader_blocks_on_full_queue_and_stops_cleanly(small_video):
+    frames_q, stop = queue.Queue(maxsize=2), threading.Event()
+    reader = FrameReader(small_video, frames_q, stop, frame_step=1, max_frames=99, imgsz=32)
+    reader.start()
+    first = frames_q.get(timeout=5)
+    assert first[0] == 0 and max(first[1].shape[:2]) == 32
+    stop.set()
+    reader.join(timeout=5)
+    assert not reader.is_alive()
+    assert reader.frames_read < 100
+
+
+def test_reader_ends_with_marker(small_video):
+    frames_q = queue.Queue()
+    reader = FrameReader(small_video, frames_q, threading.Event(), frame_step=10, max_frames=99)
+    reader.run()
+    items = [frames_q.get_nowait() for _ in range(frames_q.qsize())]
+    assert items[-1] is _END
+    assert [index for index, _, _ in items[:-1]] == list(range(0, 100, 10))
+
+
+def test_pipelined_scan_matches_sequential_scan(simulator, small_video):
+    sequential = simulator.scan_video(small_video, frame_step=5, max_frames=99, stop_on_match=False)
+    pipelined = simulator.scan_video_pipelined(small_video, frame_step=5, max_frames=99, batch_size=4,
+                                               queue_size=4, stop_on_match=False)
+    for key in ("detected", "confidence", "frame_index", "frames_inferred"):
+        assert pipelined[key] == sequential[key]
+    assert set(pipelined["stages"]) == {"decode", "inference", "results"}
+
+
+def test_pipelined_scan_of_missing_video_returns_none(simulator, tmp_path):
+    assert simulator.scan_video_pipelined(tmp_path / "missing.avi") is None
+
+
+def run_with_timeout(fn, timeout=10):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline hung"
+    return outcome
+
+
+def test_worker_model_load_failure_is_raised_not_hung(simulator, small_video, monkeypatch):
+    def model_for_worker(worker):
+        if worker == 1:
+            raise RuntimeError("could not load model copy")
+        return simulator.model
+
+    monkeypatch.setattr(simulator, "_model_for_worker", model_for_worker)
+    outcome = run_with_timeout(lambda: simulator.scan_video_pipelined(
+        small_video, frame_step=1, max_frames=99, batch_size=4, inference_workers=2, stop_on_match=False))
+    assert "could not load model copy" in str(outcome["error"])
+
+
+def test_cache_write_failure_is_raised_not_hung(simulator, small_video, tmp_path, monkeypatch):
+    from detection_cache import DetectionCache
+    simulator.cache = DetectionCache(str(tmp_path / "cache.sqlite"))
+
+    def broken_put_many(scope, items):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(simulator.cache, "put_many", broken_put_many)
+    outcome = run_with_timeout(lambda: simulator.scan_video_pipelined(small_video, frame_step=5, max_frames=99))
+    assert isinstance(outcome["error"], sqlite3.OperationalError)
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import pytest
+
+from cctv_simulation import sample_frames, sampling_step
+
+
+@pytest.mark.parametrize("args,expected", [
+    ((30.0, 10, None, None), 10),
+    ((30.0, 10, 5, None), 6),
+    ((30.0, 10, 60, None), 1),
+    ((25.0, 10, None, 2.0), 50),
+    ((30.0, 0, None, None), 1),
+])
+def test_sampling_step(args, expected):
+    assert sampling_step(*args) == expected
+
+
+@pytest.mark.parametrize("step,seek_stride", [(7, 1000), (7, 5), (1, 1000)])
+def test_sample_frames_yields_the_same_frames_as_read(small_video, step, seek_stride):
+    cap = cv2.VideoCapture(str(small_video))
+    reference = {}
+    index = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        reference[index] = frame
+        index += 1
+    cap.release()
+
+    cap = cv2.VideoCapture(str(small_video))
+    stats = {}
+    sampled = list(sample_frames(cap, step, 80, stats, seek_stride=seek_stride))
+    cap.release()
+    assert [i for i, _ in sampled] == list(range(0, 81, step))
+    for i, frame in sampled:
+        np.testing.assert_array_equal(frame, reference[i])
+    assert stats["retrieved"] == len(sampled)
+    assert (stats["seeks"] > 0) == (step >= seek_stride)
+
+
+def test_sample_frames_resumes_and_skips_cached(small_video):
+    cap = cv2.VideoCapture(str(small_video))
+    stats = {}
+    sampled = list(sample_frames(cap, 10, 99, stats, start=30, skip={40, 60}))
+    cap.release()
+    assert [i for i, _ in sampled] == [30, 40, 50, 60, 70, 80, 90]
+    assert [i for i, f in sampled if f is None] == [40, 60]
+    assert stats["retrieved"] == 5
@@ -0,0 +1,60 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import detection_cache
+from detection_cache import DetectionCache
+
+ROW_BYTES = 32  # an empty detection row: no boxes, no confs, fixed overhead
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1)
+    monkeypatch.setattr(detection_cache.time, "time", lambda: float(next(ticks)))
+
+
+def empty(frame):
+    return frame, np.zeros((0, 4)), np.zeros(0)
+
+
+def test_round_trip_and_replace_keeps_byte_count(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("s", [(3, [[1, 2, 3, 4]], [0.9]), empty(4)])
+    assert cache.total_bytes == (16 + 4 + ROW_BYTES) + ROW_BYTES
+
+    cache.put_many("s", [empty(3)])
+    assert cache.total_bytes == 2 * ROW_BYTES
+    loaded = cache.load("s")
+    assert sorted(loaded) == [3, 4] and loaded[3][0].shape == (0, 4)
+    assert DetectionCache(cache.path).total_bytes == cache.total_bytes
+
+
+def test_eviction_drops_least_recently_used_rows(tmp_path, clock):
+    cache = DetectionCache(str(tmp_path / "cache.sqlite"), max_bytes=10 * ROW_BYTES)
+    for scope in "ab":
+        cache.put_many(scope, [empty(f) for f in range(5)])
+    cache.load("a")  # touch scope a so b is the older one
+    cache.put_many("c", [empty(0)])
+
+    # 11 rows > 10: evict down to 90% of max_bytes, oldest scope first
+    assert cache.total_bytes == 9 * ROW_BYTES
+    assert cache.evicted == 2
+    assert len(cache.load("a")) == 5 and len(cache.load("b")) == 3
+    assert cache.stats()["bytes"] == 9 * ROW_BYTES
+
+
+def test_failed_inference_is_not_cached(simulator, small_video, tmp_path):
+    simulator.cache = DetectionCache(str(tmp_path / "cache.sqlite"))
+    scope, _ = simulator._cache_scope(str(small_video), 0.5, None)
+    simulator.model.fail = True
+    failed = simulator.full_scan(small_video, tmp_path / "scan.json", target_fps=5, batch_size=4)
+    assert not failed["complete"]
+    assert failed["next_frame"] == 0 and failed["frames_analysed"] == 0
+    assert simulator.cache.load(scope) == {}
+
+    simulator.model.fail = False
+    resumed = simulator.full_scan(small_video, tmp_path / "scan.json", target_fps=5, batch_size=4)
+    assert resumed["complete"] and resumed["timeline"]
+    assert len(simulator.cache.load(scope)) == resumed["frames_analysed"]
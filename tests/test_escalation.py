@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+import cctv_simulation
+from escalation import EscalationPipeline
+from event_bus import EventBus
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def broken_yolo(*args, **kwargs):
+    raise ValueError("corrupt weights")
+
+
+def test_model_load_failure_raises_runtime_error(monkeypatch):
+    monkeypatch.setattr(cctv_simulation, "YOLO", broken_yolo)
+    with pytest.raises(RuntimeError, match="corrupt weights"):
+        cctv_simulation.CCTVSIMULATOR("best.pt")
+
+
+def test_failed_model_load_is_recorded_and_worker_keeps_going(monkeypatch):
+    monkeypatch.setattr(cctv_simulation, "YOLO", broken_yolo)
+    calls = []
+
+    def scan(incident, camera_id, camera):
+        calls.append(incident.id)
+        if len(calls) == 1:
+            cctv_simulation.CCTVSIMULATOR("missing.pt")
+        return {"confidence": 0.9}
+
+    pipeline = EscalationPipeline(EventBus(), {"CAM_1": {}}, scan, workers=1)
+    pipeline.start()
+    first = pipeline.open_incident("Child-01", 1)
+    second = pipeline.open_incident("Child-02", 1)
+    wait_for(lambda: pipeline.snapshot(second.id)["status"] == "matched")
+    failed = pipeline.snapshot(first.id)["scans"][0]
+    assert failed["status"] == "error"
+    assert "missing.pt" in failed["error"]
+
+
+def test_snapshots_are_consistent_while_scans_update():
+    release = threading.Event()
+    pipeline = EscalationPipeline(EventBus(), {f"CAM_{i}": {} for i in range(20)},
+                                  lambda incident, cam, camera: release.wait(5) and None, workers=4)
+    pipeline.start()
+    incident = pipeline.open_incident("Child-01", 1)
+    for _ in range(200):
+        assert len(pipeline.list()[0]["scans"]) == 20
+    release.set()
+    wait_for(lambda: all(s["status"] == "no_match" for s in pipeline.snapshot(incident.id)["scans"]))
+    assert pipeline.resolve(incident.id).status == "resolved"
+
+
+def test_each_scan_worker_gets_its_own_model(monkeypatch, tmp_path, fake_yolo):
+    import flask_app
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"weights")
+    monkeypatch.setattr(flask_app, "CCTV_MODEL_PATHS", [str(weights)])
+    monkeypatch.setattr(flask_app, "DETECTION_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(flask_app, "_CCTV_LOCAL", threading.local())
+    monkeypatch.setattr(flask_app, "_DETECTION_CACHE", None)
+
+    simulators = []
+    threads = [threading.Thread(target=lambda: simulators.extend([flask_app._get_cctv_simulator()] * 2))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    first, again, second, _ = simulators
+    assert first is again and first is not second
+    assert first.model is not second.model
+    assert first.cache is second.cache is flask_app._DETECTION_CACHE
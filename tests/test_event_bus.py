@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from event_bus import EventBus
+
+
+def test_snapshot_and_dedupe():
+    bus = EventBus()
+    first = bus.publish("rssi", {"rssi": -60}, key="a")
+    assert bus.publish("rssi", {"rssi": -60}, key="a", dedupe=True) is first
+    second = bus.publish("rssi", {"rssi": -61}, key="a", dedupe=True)
+    assert second.seq == first.seq + 1
+    assert bus.snapshot("rssi", "a") is second
+    assert bus.stats()["topics"]["rssi"]["deduplicated"] == 1
+
+
+def test_subscription_filters_by_key_and_drops_oldest():
+    bus = EventBus()
+    with bus.subscribe("rssi", key="a", maxsize=2) as sub:
+        bus.publish("rssi", {"v": 1}, key="b")
+        for v in range(3):
+            bus.publish("rssi", {"v": v}, key="a")
+        events = sub.get(timeout=0)
+        assert [e.data["v"] for e in events] == [1, 2]
+        assert sub.dropped == 1
+    assert bus.stats()["subscribers"] == []
+
+
+def test_get_wakes_on_publish():
+    bus = EventBus()
+    sub = bus.subscribe(["alert"])
+    threading.Timer(0.05, bus.publish, args=("alert", {"x": 1})).start()
+    events = sub.get(timeout=2.0)
+    assert [e.topic for e in events] == ["alert"]
+    sub.close()
+    assert sub.get(timeout=2.0) == []
+
+
+def test_snapshot_is_read_only():
+    bus = EventBus()
+    event = bus.publish("rssi", {"rssi": -60})
+    with pytest.raises(TypeError):
+        event.data["rssi"] = 0
+    assert bus.snapshot("rssi").data["rssi"] == -60
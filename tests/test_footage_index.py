@@ -0,0 +1,55 @@
+import pytest
+
+from footage_index import FootageIndex
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FootageIndex(str(tmp_path / "index.sqlite"))
+
+
+def recording(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"footage")
+    return str(path)
+
+
+def hit(t_s, confidence, detections=1):
+    return {"t_s": t_s, "confidence": confidence, "detections": detections}
+
+
+def test_query_filters_by_camera_time_and_confidence(index, tmp_path):
+    index.add_recording("gate", recording(tmp_path, "gate.mp4"), START, 60,
+                        [hit(5.2, 0.4), hit(5.7, 0.8, 2), hit(30.0, 0.6), hit(50.0, 0.9)])
+    index.add_recording("yard", recording(tmp_path, "yard.mp4"), START, 60, [hit(10.0, 0.7)])
+
+    found = index.query(["gate"], START, START + 40, min_conf=0.5)
+    assert [(h["t"] - START, h["confidence"], h["boxes"]) for h in found["hits"]] == [(5, 0.8, 2), (30, 0.6, 1)]
+    assert found["hits"][0]["offset_s"] == 5.7
+    assert found["cameras"]["gate"]["best"] == {"t": START + 5, "confidence": 0.8}
+    assert found["cameras"]["gate"]["covered_s"] == 40.0
+
+    everything = index.query()
+    assert set(everything["cameras"]) == {"gate", "yard"}
+    assert len(everything["hits"]) == 4
+
+
+def test_reindexing_replaces_a_recordings_hits(index, tmp_path):
+    path = recording(tmp_path, "gate.mp4")
+    index.add_recording("gate", path, START, 60, [hit(5.0, 0.9), hit(20.0, 0.9)])
+    index.add_recording("gate", path, START, 60, [hit(40.0, 0.7)])
+    assert [h["t"] - START for h in index.query(["gate"])["hits"]] == [40]
+    assert index.stats()["recordings"] == 1
+
+
+def test_overlapping_recordings_count_covered_seconds_once(index, tmp_path):
+    index.add_recording("gate", recording(tmp_path, "a.mp4"), START, 60, [])
+    index.add_recording("gate", recording(tmp_path, "b.mp4"), START + 30, 60, [])
+    index.add_recording("gate", recording(tmp_path, "c.mp4"), START + 200, 10, [])
+
+    summary = index.query(["gate"], START, START + 300)["cameras"]["gate"]
+    assert summary["covered_s"] == 100.0
+    assert summary["hits"] == 0 and summary["best"] is None
+    assert index.query(["gate"], START + 20, START + 70)["cameras"]["gate"]["covered_s"] == 50.0
@@ -0,0 +1,52 @@
+import json
+import threading
+
+from cctv_simulation import timeline_segments
+from conftest import CHILD_FRAMES
+
+
+def hit(t, conf=0.5):
+    return {"t_s": t, "confidence": conf}
+
+
+def test_timeline_segments_merge_close_hits():
+    segments = timeline_segments([hit(0.0), hit(1.0, 0.9), hit(2.5), hit(10.0)], gap=2.0)
+    assert segments == [
+        {"start_s": 0.0, "end_s": 2.5, "hits": 3, "best_confidence": 0.9, "best_s": 1.0},
+        {"start_s": 10.0, "end_s": 10.0, "hits": 1, "best_confidence": 0.5, "best_s": 10.0},
+    ]
+    assert timeline_segments([]) == []
+
+
+def test_full_scan_builds_timeline(simulator, small_video, tmp_path):
+    state = simulator.full_scan(small_video, tmp_path / "scan.json", target_fps=5, batch_size=4)
+    assert state["complete"]
+    assert [h["frame"] for h in state["timeline"]] == [f for f in range(0, 100, 2) if f in CHILD_FRAMES]
+    assert len(state["segments"]) == 1
+    assert json.loads((tmp_path / "scan.json").read_text())["complete"]
+
+
+def test_interrupted_scan_resumes_where_it_stopped(simulator, small_video, tmp_path):
+    reference = simulator.full_scan(small_video, tmp_path / "ref.json", target_fps=5, batch_size=4)
+
+    stop = threading.Event()
+    checkpoint = tmp_path / "scan.json"
+    partial = simulator.full_scan(small_video, checkpoint, target_fps=5, batch_size=4, checkpoint_every=0,
+                                  on_progress=lambda progress: progress["position_s"] >= 4 and stop.set(),
+                                  stop=stop)
+    assert not partial["complete"]
+    assert 0 < partial["next_frame"] < 100
+    calls_before = len(simulator.model.calls)
+
+    resumed = simulator.full_scan(small_video, checkpoint, target_fps=5, batch_size=4)
+    assert resumed["complete"]
+    assert resumed["timeline"] == reference["timeline"]
+    assert resumed["frames_analysed"] == reference["frames_analysed"]
+    assert sum(simulator.model.calls[calls_before:]) == reference["frames_analysed"] - partial["frames_analysed"]
+
+
+def test_changed_settings_start_over(simulator, small_video, tmp_path):
+    checkpoint = tmp_path / "scan.json"
+    simulator.full_scan(small_video, checkpoint, target_fps=5)
+    again = simulator.full_scan(small_video, checkpoint, target_fps=2)
+    assert again["key"]["target_fps"] == 2 and again["complete"]
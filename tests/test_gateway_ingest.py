@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from gateway_ingest import BATCH_HEADER, BatchDecodeError, GatewayFusion, decode_batch, encode_batch
+
+
+def sample_batch():
+    return encode_batch("gw-1", ["Child-A", "Child-B", "Child-A"], [-60, -70, -65], [100.0, 100.5, 101.0])
+
+
+def test_round_trip():
+    gateway_id, names, tag_idx, rssi, ts = decode_batch(sample_batch())
+    assert gateway_id == "gw-1"
+    assert [names[i] for i in tag_idx] == ["Child-A", "Child-B", "Child-A"]
+    np.testing.assert_allclose(rssi, [-60, -70, -65])
+    np.testing.assert_allclose(ts, [100.0, 100.5, 101.0])
+
+
+def test_every_truncation_raises_decode_error():
+    data = sample_batch()
+    for cut in range(len(data)):
+        with pytest.raises(BatchDecodeError):
+            decode_batch(data[:cut])
+
+
+def test_tag_length_past_end_is_rejected():
+    data = bytearray(sample_batch())
+    data[BATCH_HEADER.size + len(b"gw-1")] = 255  # first tag name claims 255 bytes
+    with pytest.raises(BatchDecodeError):
+        decode_batch(bytes(data))
+
+
+def test_fusion_ingests_bytes():
+    fusion = GatewayFusion()
+    assert fusion.ingest_bytes(sample_batch()) == 3
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import export_model
+from cctv_simulation import CCTVSIMULATOR, resolve_model_path
+from conftest import FakeYOLO
+
+
+def test_resolve_prefers_int8_then_fp32_then_pytorch(tmp_path):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"")
+    assert resolve_model_path(weights, "onnx") == str(weights)
+    (tmp_path / "best.onnx").write_bytes(b"")
+    assert resolve_model_path(weights, "onnx") == str(tmp_path / "best.onnx")
+    (tmp_path / "best-int8.onnx.rejected").write_bytes(b"")
+    assert resolve_model_path(weights, "onnx") == str(tmp_path / "best.onnx")
+    (tmp_path / "best_int8_openvino_model").mkdir()
+    assert resolve_model_path(weights, "openvino") == str(tmp_path / "best_int8_openvino_model")
+    assert resolve_model_path(weights, "auto") == str(weights)
+    with pytest.raises(ValueError):
+        resolve_model_path(weights, "tensorrt")
+
+
+class StaticBatchYOLO(FakeYOLO):
+    def __call__(self, frames, conf=0.25, verbose=False):
+        if len(frames) > 1:
+            raise RuntimeError("Got invalid dimensions for input: images index: 0 Got: 8 Expected: 1")
+        return super().__call__(frames, conf, verbose)
+
+
+def test_static_batch_model_falls_back_to_single_frames():
+    frames = [np.zeros((48, 64, 3), np.uint8) for _ in range(3)]
+    frames[1][10:20, 10:20] = 255
+    model = StaticBatchYOLO()
+    detections = CCTVSIMULATOR._detect_batch(model, frames, 0.5)
+    assert [len(confs) for _, confs in detections] == [0, 1, 0]
+    assert model.calls == [1, 1, 1]
+
+
+def test_openvino_exports_use_a_dynamic_batch(monkeypatch, tmp_path):
+    exports = []
+
+    class RecordingYOLO:
+        def __init__(self, weights):
+            pass
+
+        def export(self, **kwargs):
+            exports.append(kwargs)
+            return "exported"
+
+    calib = tmp_path / "calib.yaml"
+    calib.write_text("")
+    monkeypatch.setattr(export_model, "YOLO", RecordingYOLO)
+    monkeypatch.setattr(export_model, "dataset_yaml", lambda data_dir, val_split="valid": str(calib))
+    export_model.export_openvino("best.pt", int8=False)
+    export_model.export_openvino("best.pt", int8=True)
+    assert [e["dynamic"] for e in exports] == [True, True]
+    assert exports[1]["int8"] and not calib.exists()
@@ -0,0 +1,32 @@
+import numpy as np
+
+from cctv_simulation import MotionGate
+from conftest import CHILD_FRAMES
+
+
+def still(value=40):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def test_static_scene_is_skipped_except_keepalive():
+    gate = MotionGate(keepalive=5)
+    passed = [gate.check(still()) for _ in range(12)]
+    assert passed == [True, False, False, False, False, True, False, False, False, False, True, False]
+    assert gate.stats()["skipped"] == 9
+
+
+def test_motion_passes():
+    gate = MotionGate(keepalive=0)
+    gate.check(still())
+    moving = still()
+    moving[10:30, 20:36] = 255
+    assert gate.check(moving)
+
+
+def test_gated_scan_still_finds_the_child_with_fewer_inferences(simulator, small_video):
+    full = simulator.scan_video(small_video, frame_step=2, max_frames=99, stop_on_match=False)
+    gated = simulator.scan_video(small_video, frame_step=2, max_frames=99, stop_on_match=False,
+                                 motion_sensitivity=0.01)
+    assert gated["detected"] and gated["frame_index"] == min(CHILD_FRAMES)
+    assert gated["frames_inferred"] < full["frames_inferred"]
+    assert gated["motion"]["skipped"] > 0
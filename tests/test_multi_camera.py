@@ -0,0 +1,37 @@
+import threading
+
+from cctv_simulation import MultiCameraScheduler
+from conftest import CHILD_FRAMES, write_video
+
+
+def cameras(tmp_path, n):
+    return {f"CAM_{i}": {"source": str(write_video(tmp_path / f"cam{i}.avi")), "conf": 0.5} for i in range(n)}
+
+
+def test_every_camera_is_scanned_to_the_end(simulator, tmp_path):
+    scheduler = MultiCameraScheduler(simulator, cameras(tmp_path, 3), batch_size=4, frame_step=5)
+    stats = scheduler.run(duration=30)
+    assert stats["frames_inferred"] == 3 * 20
+    for cam in stats["cameras"].values():
+        assert cam["finished"]
+        assert cam["best"]["frame_index"] in CHILD_FRAMES
+
+
+def test_slow_detection_callback_does_not_hold_the_scheduler_lock(simulator, tmp_path):
+    entered, release = threading.Event(), threading.Event()
+
+    def on_detection(camera_id, index, confidence):
+        if not entered.is_set():
+            entered.set()
+            release.wait(5)
+
+    scheduler = MultiCameraScheduler(simulator, cameras(tmp_path, 2), batch_size=2, model_workers=2,
+                                     frame_step=5, on_detection=on_detection)
+    scheduler.start()
+    assert entered.wait(10)
+    acquired = scheduler.pick_lock.acquire(timeout=1)
+    if acquired:
+        scheduler.pick_lock.release()
+    release.set()
+    scheduler.stop.set()
+    assert acquired
@@ -0,0 +1,65 @@
+import json
+import sys
+import threading
+
+import flask_app
+from notifier import Notifier, StubChannel
+
+
+def sms_notifier(tmp_path, guards=()):
+    channel = StubChannel("sms", contact="phone")
+    notifier = Notifier(str(tmp_path / "outbox.sqlite"), [channel],
+                        resolve_contacts=lambda device: flask_app._alert_contacts(device, list(guards)))
+    return notifier, channel
+
+
+def test_alert_for_registered_tag_reaches_parent(tmp_path, monkeypatch):
+    monkeypatch.setattr(flask_app, "USERS_DB_PATH", str(tmp_path / "users.json"))
+    flask_app.register_user("a@example.com", "pw", "Asha", "555-0001", "Mia", "6", tag_name="Mia-Tag")
+    flask_app.register_user("b@example.com", "pw", "Ben", "555-0002", "Leo", "7")
+    notifier, channel = sms_notifier(tmp_path, guards=[{"name": "Gate", "phone": "555-9999"}])
+
+    notifier.submit({"id": 1, "device": "Mia-Tag", "status": "warning"})
+    notifier.submit({"id": 2, "device": "Child-02", "status": "warning"})
+    notifier.submit({"id": 3, "device": "TT0001", "status": "warning"})
+    notifier.ingest_pending()
+    for row in notifier._claim(channel):
+        notifier._deliver(channel, [row])
+
+    sent = sorted((n["alert_id"], n["to"]) for n in channel.sent)
+    assert sent == [(1, "555-0001"), (1, "555-9999"), (2, "555-0002"), (2, "555-9999"),
+                    (3, "555-0001"), (3, "555-9999")]
+
+
+def test_existing_accounts_are_backfilled_with_tag_name(tmp_path, monkeypatch):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps({"old@example.com": {"name": "Old", "phone": "1", "device_id": "TT0003"}}))
+    monkeypatch.setattr(flask_app, "USERS_DB_PATH", str(path))
+    assert flask_app.load_users()["old@example.com"]["tag_name"] == "Child-03"
+    assert [c["phone"] for c in flask_app._alert_contacts("Child-03", [])] == ["1"]
+
+
+def test_concurrent_deliveries_are_all_counted(tmp_path):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often so unguarded += would lose updates
+    notifier, channel = sms_notifier(tmp_path)
+    rows = [(i, json.dumps({"to": "1"}), 0.0, 0) for i in range(8)]
+
+    def worker():
+        for _ in range(200):
+            notifier._deliver(channel, rows)
+            notifier.submit({"device": None})
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    stats = notifier.stats()
+    assert stats["submitted"] == 8 * 200
+    assert stats["channels"]["sms"]["sent"] == 8 * 200 * len(rows)
+    assert stats["channels"]["sms"]["batches"] == 8 * 200
+    assert stats["channels"]["sms"]["inflight"] == 0
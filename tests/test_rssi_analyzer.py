@@ -0,0 +1,36 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from rssi_analyzer import MultiTagRSSIAnalyzer
+
+
+def reference_averages(tags, rssi, window):
+    history = {}
+    for tag, value in zip(tags, rssi):
+        history.setdefault(tag, deque(maxlen=window)).append(value)
+    return {tag: sum(h) / len(h) for tag, h in history.items()}
+
+
+@pytest.mark.parametrize("window", [1, 3, 10])
+def test_batched_updates_match_one_at_a_time(window):
+    rng = np.random.default_rng(1)
+    analyzer = MultiTagRSSIAnalyzer(window_size=window, capacity=4)  # forces _grow
+    all_tags, all_rssi = [], []
+    for _ in range(20):
+        tags = [f"tag-{i}" for i in rng.integers(0, 12, size=25)]
+        rssi = rng.integers(-100, -40, size=25)
+        analyzer.update(tags, rssi, now=0.0)
+        all_tags += tags
+        all_rssi += rssi.tolist()
+    expected = reference_averages(all_tags, all_rssi, window)
+    for tag, avg in expected.items():
+        assert analyzer.average(tag) == pytest.approx(avg)
+
+
+def test_evaluate_flags_tags_below_threshold():
+    analyzer = MultiTagRSSIAnalyzer(threshold=-80, window_size=2)
+    analyzer.update(["near", "far", "far"], [-50, -85, -90], now=0.0)
+    assert analyzer.out_of_range() == ["far"]
+    assert analyzer.average("unknown") is None
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from rssi_analyzer import EMAFilter, KalmanFilter, PathLossModel, RSSIAnalyzer
+
+
+def test_ema_batch_applies_readings_in_order():
+    batched = EMAFilter(alpha=0.5, capacity=2)
+    batched.update_indices([0, 1, 0, 0], [-60, -70, -80, -90])
+    single = EMAFilter(alpha=0.5, capacity=2)
+    for idx, value in zip([0, 1, 0, 0], [-60, -70, -80, -90]):
+        single.update_indices([idx], [value])
+    np.testing.assert_allclose(batched.values(), single.values())
+    assert batched.values()[0] == pytest.approx(-80.0)
+
+
+def test_kalman_smooths_noise():
+    rng = np.random.default_rng(0)
+    noisy = -70 + rng.normal(0, 4, size=200)
+    f = KalmanFilter(capacity=1)
+    for value in noisy:
+        f.update_indices([0], [value])
+    assert abs(f.values()[0] + 70) < 2.0
+
+
+def test_path_loss_calibration_round_trip():
+    truth = PathLossModel(tx_power=-59, exponent=2.5)
+    distances = np.array([1, 2, 4, 8, 16], dtype=float)
+    fitted = PathLossModel.calibrate(distances, -59 - 25 * np.log10(distances))
+    assert fitted.tx_power == pytest.approx(-59)
+    assert fitted.exponent == pytest.approx(2.5)
+    np.testing.assert_allclose(truth.distance(truth.tx_power - 25 * np.log10(distances)), distances)
+    d, lo, hi = PathLossModel(sigma=4).distance_band(-70)
+    assert lo < d < hi
+
+
+def test_analyzer_distance_uses_filtered_rssi():
+    analyzer = RSSIAnalyzer(filter="ema", path_loss=PathLossModel(tx_power=-59, exponent=2.0, sigma=0))
+    analyzer.analyze(-79, now=0.0)
+    assert analyzer.distance()["distance_m"] == pytest.approx(10.0)
@@ -0,0 +1,58 @@
+import pytest
+
+from rssi_history import RSSIHistoryStore, TagHistory, pick_resolution
+
+
+def test_raw_ring_wraps_and_queries_in_order():
+    history = TagHistory(capacity={"raw": 5})
+    for t in range(8):
+        history.append(float(t), -50.0 - t)
+    result = history.query(0, 100)
+    assert result["ts"] == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert history.query(4.5, 6.0)["rssi"] == [-55.0, -56.0]
+
+
+def test_rollups_include_open_bucket():
+    history = TagHistory()
+    for t, rssi in [(0, -60), (5, -70), (12, -80)]:
+        history.append(float(t), rssi)
+    result = history.query(0, 20, "10s")
+    assert result["ts"] == [0.0, 10.0]
+    assert result["min"] == [-70.0, -80.0]
+    assert result["avg"] == [-65.0, -80.0]
+    assert result["count"] == [2, 1]
+    with pytest.raises(ValueError):
+        history.query(0, 20, "1h")
+
+
+def test_pick_resolution():
+    assert pick_resolution(0, 300) == "raw"
+    assert pick_resolution(0, 3600) == "10s"
+    assert pick_resolution(0, 14 * 86400) == "10m"
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "history.npz")
+    store = RSSIHistoryStore(path, capacity={"raw": 4})
+    for t in range(6):
+        store.append("Child-1", -60.0 - t, ts=1000.0 + t)
+    store.save()
+    restored = RSSIHistoryStore(path, capacity={"raw": 4})
+    assert restored.devices() == ["Child-1"]
+    for resolution in ("raw", "10s"):
+        assert (restored.query("Child-1", 0, 2000, resolution)
+                == store.query("Child-1", 0, 2000, resolution))
+    assert restored.query("unknown", 0, 1) is None
+
+
+def test_device_names_with_separators_survive_save(tmp_path):
+    path = str(tmp_path / "history.npz")
+    store = RSSIHistoryStore(path)
+    names = ["Tag|A", "Tag%7CA", "AA:BB:CC:DD:EE:FF"]
+    for i, name in enumerate(names):
+        store.append(name, -60.0 - i, ts=1000.0)
+    store.save()
+    restored = RSSIHistoryStore(path)
+    assert restored.devices() == sorted(names)
+    for i, name in enumerate(names):
+        assert restored.query(name, 0, 2000, "raw")["rssi"] == [-60.0 - i]
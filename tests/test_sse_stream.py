@@ -0,0 +1,40 @@
+import flask_app
+
+
+def first_event(headers):
+    client = flask_app.app.test_client()
+    response = client.get("/api/rssi/stream?device=Child-SSE", headers=headers, buffered=False)
+    chunks = iter(response.response)
+    try:
+        assert next(chunks).startswith(b"retry:")
+        return next(chunks).decode()
+    finally:
+        response.close()
+
+
+def test_resume_id_from_previous_process_gets_snapshot():
+    event = flask_app.BUS.publish("rssi", {"status": "safe", "latest_rssi": -60}, key="Child-SSE")
+    expected_id = f"id: {flask_app.BUS.epoch}-{event.seq}\n"
+
+    # A restarted server has a new epoch and a lower seq; the old, larger id must not hide the snapshot
+    assert first_event({"Last-Event-ID": f"0-{event.seq + 1000}"}).startswith(expected_id)
+    assert first_event({"Last-Event-ID": str(event.seq + 1000)}).startswith(expected_id)
+
+
+def test_resume_id_from_this_process_skips_seen_snapshot(monkeypatch):
+    event = flask_app.BUS.publish("rssi", {"status": "safe", "latest_rssi": -61}, key="Child-SSE")
+    monkeypatch.setattr(flask_app, "SSE_HEARTBEAT_SECONDS", 0.01)
+    assert first_event({"Last-Event-ID": f"{flask_app.BUS.epoch}-{event.seq}"}) == ": heartbeat\n\n"
+
+
+def test_parent_dashboard_follows_the_parents_tag():
+    client = flask_app.app.test_client()
+    with client.session_transaction() as session:
+        session.update({"user_email": "p@example.com", "user_device_id": "TT0007", "user_tag_name": "Tag|7"})
+    page = client.get("/parent-dashboard").get_data(as_text=True)
+    assert 'const DEVICE = encodeURIComponent("Tag|7");' in page
+    assert "/api/rssi?device=${DEVICE}" in page and "/api/rssi/stream?device=${DEVICE}" in page
+
+    with client.session_transaction() as session:
+        del session["user_tag_name"]
+    assert 'encodeURIComponent("Child-07")' in client.get("/parent-dashboard").get_data(as_text=True)
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import flask_app
+from alert_journal import AlertJournal
+from alert_policy import AlertPolicy
+from rssi_analyzer import MissingChildIdentification, RSSIAnalyzer
+
+
+class FakeHistory:
+    def __init__(self):
+        self.appended = []
+
+    def append(self, device, rssi):
+        self.appended.append((device, rssi))
+
+
+def test_each_tag_gets_its_own_analyzer_history_and_alert(monkeypatch):
+    alerts = []
+    monkeypatch.setattr(flask_app, "_log_alert", lambda *a, **kw: (alerts.append(kw["device"]), False, 0.0))
+    history = FakeHistory()
+    on_readings, tick_all, analyzer_for = flask_app._build_tag_monitor(
+        lambda: RSSIAnalyzer(threshold=-80, window_size=1, suspect_dwell=0.0), history, MissingChildIdentification)
+
+    primary = flask_app.RSSI_STATE["device"]
+    for _ in range(3):
+        on_readings([(0.0, primary, "AA:01", -55), (0.0, None, "AA:02", -95)])
+        tick_all()
+
+    assert analyzer_for(primary) is not analyzer_for("AA:02")
+    assert {d for d, _ in history.appended} == {primary, "AA:02"}
+    assert alerts == ["AA:02"]
+    assert flask_app.RSSI_STATE["alert_state"] == "safe"
+    assert flask_app.RSSI_STATE["latest_rssi"] == -55
+    other = flask_app._rssi_state("AA:02")
+    assert other["alert_state"] == "out_of_range"
+    assert other["latest_rssi"] == -95
+    assert other["error"] is None
+    assert flask_app.BUS.snapshot("rssi", "AA:02").data is other
+
+
+def test_burst_of_tags_leaving_range_is_never_rate_limited(monkeypatch, tmp_path):
+    monkeypatch.setattr(flask_app, "_ALERT_POLICY", AlertPolicy(rate=0.001, burst=1))
+    journal = AlertJournal(str(tmp_path))
+    monkeypatch.setattr(flask_app, "get_alert_journal", lambda: journal)
+    monkeypatch.setattr(flask_app, "get_notifier", lambda: SimpleNamespace(submit=lambda alert: None))
+    on_readings, tick_all, _ = flask_app._build_tag_monitor(
+        lambda: RSSIAnalyzer(threshold=-80, window_size=1, suspect_dwell=0.0), FakeHistory(),
+        MissingChildIdentification)
+
+    tags = [f"Burst-{i:02d}" for i in range(8)]
+    for _ in range(3):
+        on_readings([(0.0, tag, None, -95) for tag in tags])
+        tick_all()
+
+    alerts, _ = journal.query(None, None, None, None, 100)
+    assert sorted(a["device"] for a in alerts) == tags
+    assert flask_app.get_alert_policy().stats()["rate_limited"] == 0
@@ -0,0 +1,75 @@
+import numpy as np
+
+from conftest import CHILD_FRAMES
+from tracker import SortTracker, greedy_match, iou_matrix
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150], [0.0, 0.0]], rtol=1e-6)
+    assert iou_matrix(a, np.zeros((0, 4), np.float32)).shape == (2, 0)
+
+
+def test_greedy_match_takes_best_pairs_first():
+    iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+    assert greedy_match(iou, 0.3) == [(0, 0)]
+    assert sorted(greedy_match(np.array([[0.9, 0.8], [0.85, 0.4]]), 0.3)) == [(0, 0), (1, 1)]
+
+
+def moving_box(t):
+    return [10 + 5 * t, 10, 30 + 5 * t, 40]
+
+
+def test_one_event_per_child_with_entry_exit_and_best_frame():
+    tracker = SortTracker(max_age=1.0, min_hits=2)
+    events = []
+    for frame in range(10):
+        t = frame * 0.2
+        boxes = [moving_box(t), [200, 200, 220, 240]] if frame < 6 else []
+        confs = [0.6 + 0.05 * (frame == 3), 0.9] if frame < 6 else []
+        events += tracker.update(frame, t, boxes, confs)
+    events += tracker.flush()
+    assert len(events) == 2
+    walker = next(e for e in events if e["best_box"][0] < 200)
+    assert (walker["entry_frame"], walker["exit_frame"], walker["hits"]) == (0, 5, 6)
+    assert walker["best_frame"] == 3
+    assert tracker.stats()["events"] == 2
+
+
+def test_low_confidence_boxes_extend_but_never_start_tracks():
+    tracker = SortTracker(max_age=0.5, min_hits=1)
+    tracker.update(0, 0.0, [moving_box(0)], [0.9])
+    tracker.update(1, 0.4, [moving_box(0.4)], [0.2])   # keeps the track alive
+    tracker.update(2, 0.8, [[300, 300, 320, 340]], [0.2])  # unmatched, low confidence: ignored
+    assert len(tracker.tracks) == 1
+    events = tracker.update(3, 2.0, [], [])
+    assert [(e["entry_frame"], e["exit_frame"]) for e in events] == [(0, 1)]
+
+
+def test_flicker_below_min_hits_is_dropped():
+    tracker = SortTracker(min_hits=3)
+    tracker.update(0, 0.0, [moving_box(0)], [0.9])
+    assert tracker.flush() == []
+    assert tracker.stats()["dropped_tracks"] == 1
+
+
+def test_tracked_scan_reports_one_event_for_the_test_video(simulator, small_video):
+    posted = []
+    result = simulator.track_video(small_video, conf_threshold=0.5, target_fps=5, on_event=posted.append)
+    assert len(result["events"]) == 1 == len(posted)
+    event = result["events"][0]
+    assert min(CHILD_FRAMES) <= event["entry_frame"] <= event["exit_frame"] <= max(CHILD_FRAMES)
+
+
+def test_tracked_incident_run_uses_the_cli_confidence(simulator, small_video, monkeypatch):
+    import cctv_simulation
+    incidents = [{"id": "INC-00001", "status": "open"}]
+    monkeypatch.setattr(cctv_simulation.requests, "get",
+                        lambda url, timeout: type("Response", (), {"json": lambda self: incidents})())
+    calls = []
+    monkeypatch.setattr(simulator, "track_video", lambda video_path, **kwargs: calls.append(kwargs))
+
+    simulator.simulate_cctv_processing(small_video, "INC-00001", delay_seconds=0, conf_threshold=0.7,
+                                       track=True).join(timeout=5)
+    assert calls and calls[0]["conf_threshold"] == 0.7